@@ -1,7 +1,11 @@
 import re
 import streamlit as st
 from datetime import datetime
-from utils import collection, openai  # You must provide your own collection and openai setup
+from utils import (
+    answer_cache_caption, cached_answer, get_collection, readiness_caption, remember_answer,
+    search_candidates, timings_caption, warm_up,
+)
+from llm import get_scheduler, timed_stream
 
 # Initialize sidebar state first
 if 'sidebar_open' not in st.session_state:
@@ -319,12 +323,29 @@ st.set_page_config(
     initial_sidebar_state="expanded" if st.session_state.sidebar_open else "collapsed"
 )
 
+# Open the collection and load its vector index while the recruiter types.
+warm_up()
+
 # --- Helper Functions ---
 def generate_chat_title(content):
     """Generate a short title from the first message"""
     words = content.split()[:4]
     return " ".join(words) + ("..." if len(content.split()) > 4 else "")
 
+def assistant_message_html(content):
+    """Styled assistant bubble, shared by the history and the live stream"""
+    return f"""
+            <div class="message assistant">
+                <div class="message-icon">
+                    {ICONS['robot']}
+                </div>
+                <div class="message-content">
+                    <strong>HireScope Assistant</strong><br>
+                    {content}
+                </div>
+            </div>
+            """
+
 def create_icon_button(icon_key, button_key, tooltip=""):
     """Create an icon button with proper styling"""
     return f"""
@@ -349,6 +370,9 @@ if "dropdown_open" not in st.session_state:
 if "is_generating" not in st.session_state:
     st.session_state.is_generating = False
 
+if "last_retrieval" not in st.session_state:
+    st.session_state.last_retrieval = None
+
 # --- Sidebar Toggle Button in Main Content (when sidebar is closed) ---
 if not st.session_state.sidebar_open:
     # Create a container at the top for the toggle button
@@ -381,6 +405,7 @@ if st.session_state.sidebar_open:
             st.session_state.editing_chat = None
             st.rerun()
         
+        st.caption(readiness_caption())
         st.markdown("---")
         
         # Chat History
@@ -516,21 +541,12 @@ with chat_container:
             </div>
             """, unsafe_allow_html=True)
         else:
-            st.markdown(f"""
-            <div class="message assistant">
-                <div class="message-icon">
-                    {ICONS['robot']}
-                </div>
-                <div class="message-content">
-                    <strong>HireScope Assistant</strong><br>
-                    {content}
-                </div>
-            </div>
-            """, unsafe_allow_html=True)
+            st.markdown(assistant_message_html(content), unsafe_allow_html=True)
     
-    # Show skeleton loading animation when generating response
+    # Show skeleton loading animation until the first tokens arrive
+    pending = st.empty()
     if st.session_state.is_generating:
-        st.markdown(f"""
+        pending.markdown(f"""
         <div class="skeleton-container">
             <div class="skeleton-icon">
                 {ICONS['robot']}
@@ -552,6 +568,14 @@ with chat_container:
         </div>
         """, unsafe_allow_html=True)
 
+# Retrieval and generation latency of the last answer
+timings = st.session_state.last_retrieval
+if timings and not st.session_state.is_generating:
+    st.caption(f"Last answer: {timings_caption(timings)}")
+    cache_caption = answer_cache_caption()
+    if cache_caption:
+        st.caption(cache_caption)
+
 # Chat input
 prompt = st.chat_input("Ask about candidates, resumes, or hiring...")
 
@@ -566,13 +590,15 @@ if prompt:
 # Process response if we're in generating state
 if st.session_state.is_generating:
     # Generate response
+    timings = {}
     try:
-        total = collection.count()
+        total = get_collection().count()
         if total == 0:
             reply = "⚠️ No resume data available. Please upload some resumes to get started."
         else:
             # Query the vector database
-            hits = collection.query(query_texts=[chat[-1]["content"]], n_results=3)
+            hits = search_candidates(chat[-1]["content"], 3)
+            timings = hits["timings"]
             context = "\n---\n".join(hits.get("documents", [[]])[0])
             
             # Update system message with context
@@ -580,19 +606,28 @@ if st.session_state.is_generating:
 {context}
 Be helpful, professional, and provide specific information from the resumes when available."""
             
-            # Get AI response
-            result = openai.chat.completions.create(
-                model="gpt-4o",
-                messages=chat,
-                temperature=0.3,
-                max_tokens=1000
-            )
-            reply = result.choices[0].message.content
+            # Reuse the answer to a near-identical earlier question over the same candidates
+            question, history = chat[-1]["content"], chat[:-1]
+            reply = cached_answer("hr-chat", history, question, hits)
+            if reply is None:
+                # Stream the AI response into the skeleton's place
+                stream = get_scheduler().chat_stream(
+                    chat,
+                    model="gpt-4o",
+                    temperature=0.3,
+                    max_tokens=1000
+                )
+                reply = ""
+                for text in timed_stream(stream, timings):
+                    reply += text
+                    pending.markdown(assistant_message_html(reply + "▌"), unsafe_allow_html=True)
+                remember_answer("hr-chat", history, question, hits, reply)
             
     except Exception as e:
         reply = f"⚠️ Error processing your request: {str(e)}"
+    st.session_state.last_retrieval = timings
     
-    # Add assistant response
+    # Add assistant response once the stream has finished
     chat.append({"role": "assistant", "content": reply})
     
     # Update chat title if it's still default
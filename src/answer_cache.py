@@ -0,0 +1,153 @@
+# answer_cache.py – semantic cache of chat answers for HireScope
+#
+# Recruiters ask the same questions again ("Who knows React Native?").
+# After retrieval, the chat pages look for an earlier answer whose
+#
+#   • scope matches: same pipeline (system prompt / model), same last
+#     ANSWER_CACHE_HISTORY_TURNS messages of the conversation, and the
+#     same retrieved candidates with the same document text; and
+#   • query embedding has cosine ≥ ANSWER_CACHE_THRESHOLD to this one,
+#
+# and reuse it instead of a GPT-4o completion.  Because the scope hashes
+# the text the answer was generated from, a changed, added or removed
+# résumé that would change the context can never serve an old answer, and
+# writes need no invalidation – also when several replicas, each with its
+# own cache file, share one Chroma server.  Entries for contexts that no
+# longer occur simply expire.  Hit rate and the generation time saved are
+# kept in the same SQLite file.
+
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from cache import sha256_hex
+
+ANSWER_CACHE = os.getenv("ANSWER_CACHE", "1") == "1"
+ANSWER_CACHE_THRESHOLD = float(os.getenv("ANSWER_CACHE_THRESHOLD", "0.95"))
+ANSWER_CACHE_TTL_HOURS = float(os.getenv("ANSWER_CACHE_TTL_HOURS", "168"))
+ANSWER_CACHE_MAX_ENTRIES = int(os.getenv("ANSWER_CACHE_MAX_ENTRIES", "5000"))
+# Earlier messages that still count: the previous question and its answer,
+# enough for a follow-up ("and his notice period?") without making every
+# later turn of a long chat unique.
+ANSWER_CACHE_HISTORY_TURNS = int(os.getenv("ANSWER_CACHE_HISTORY_TURNS", "2"))
+
+
+def answer_scope(pipeline: str, history: Sequence[Dict], ids: Sequence[str], documents: Sequence[str],
+                 history_turns: int = ANSWER_CACHE_HISTORY_TURNS) -> str:
+    """Hash of everything besides the question that shapes the answer."""
+    recent = [m for m in history if m.get("role") != "system"]
+    recent = recent[len(recent) - history_turns:] if history_turns > 0 else []
+    turns = "\n".join(f"{m['role']}:{m['content']}" for m in recent)
+    context = sorted(f"{cid}:{sha256_hex(doc or '')}" for cid, doc in zip(ids, documents))
+    return sha256_hex(f"{pipeline}\n{sha256_hex(turns)}\n" + "\n".join(context))
+
+
+class AnswerCache:
+    """``(scope, query vector) -> answer`` with a cosine threshold, in SQLite."""
+
+    def __init__(self, path: str, threshold: float = ANSWER_CACHE_THRESHOLD,
+                 ttl_hours: float = ANSWER_CACHE_TTL_HOURS, max_entries: int = ANSWER_CACHE_MAX_ENTRIES):
+        self.path = path
+        self.threshold = threshold
+        self.ttl = ttl_hours * 3600
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                """CREATE TABLE IF NOT EXISTS answers (
+                       id INTEGER PRIMARY KEY,
+                       scope TEXT NOT NULL,
+                       query TEXT NOT NULL,
+                       vector BLOB NOT NULL,
+                       answer TEXT NOT NULL,
+                       generation_ms REAL NOT NULL,
+                       created REAL NOT NULL,
+                       last_used REAL NOT NULL)"""
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS answers_scope ON answers(scope)")
+            conn.execute(
+                """CREATE TABLE IF NOT EXISTS counters (
+                       name TEXT PRIMARY KEY,
+                       value REAL NOT NULL DEFAULT 0)"""
+            )
+            conn.executemany(
+                "INSERT OR IGNORE INTO counters(name) VALUES (?)",
+                [("lookups",), ("hits",), ("saved_ms",)],
+            )
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self.path, timeout=30)
+
+    @staticmethod
+    def _unit(vector) -> np.ndarray:
+        v = np.asarray(vector, dtype=np.float32)
+        return v / (np.linalg.norm(v) or 1.0)
+
+    def get(self, scope: str, vector) -> Optional[Tuple[str, float, str]]:
+        """``(answer, similarity, cached query)`` of the closest match, or ``None``."""
+        q = self._unit(vector)
+        cutoff = time.time() - self.ttl
+        with self._connect() as conn:
+            rows: List = conn.execute(
+                "SELECT id, query, vector, answer, generation_ms FROM answers "
+                "WHERE scope=? AND created>=?",
+                (scope, cutoff),
+            ).fetchall()
+            best = None
+            for row_id, query, blob, answer, generation_ms in rows:
+                stored = np.frombuffer(blob, dtype=np.float32)
+                if stored.shape != q.shape:
+                    continue
+                sim = float(stored @ q)
+                if sim >= self.threshold and (best is None or sim > best[0]):
+                    best = (sim, row_id, query, answer, generation_ms)
+            conn.execute("UPDATE counters SET value=value+1 WHERE name='lookups'")
+            if best is None:
+                return None
+            sim, row_id, query, answer, generation_ms = best
+            conn.execute("UPDATE answers SET last_used=? WHERE id=?", (time.time(), row_id))
+            conn.execute("UPDATE counters SET value=value+1 WHERE name='hits'")
+            conn.execute("UPDATE counters SET value=value+? WHERE name='saved_ms'", (generation_ms,))
+        return answer, sim, query
+
+    def put(self, scope: str, query: str, vector, answer: str, generation_ms: float):
+        now = time.time()
+        with self._lock, self._connect() as conn:
+            conn.execute(
+                "INSERT INTO answers(scope, query, vector, answer, generation_ms, created, last_used) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (scope, query, self._unit(vector).tobytes(), answer, generation_ms, now, now),
+            )
+            conn.execute("DELETE FROM answers WHERE created<?", (now - self.ttl,))
+            (count,) = conn.execute("SELECT COUNT(*) FROM answers").fetchone()
+            if count > self.max_entries:
+                conn.execute(
+                    "DELETE FROM answers WHERE id IN "
+                    "(SELECT id FROM answers ORDER BY last_used LIMIT ?)",
+                    (count - self.max_entries,),
+                )
+
+    def clear(self):
+        """Drop every answer; counters are kept."""
+        with self._lock, self._connect() as conn:
+            conn.execute("DELETE FROM answers")
+
+    def stats(self) -> Dict:
+        with self._connect() as conn:
+            counters = dict(conn.execute("SELECT name, value FROM counters").fetchall())
+            (entries,) = conn.execute("SELECT COUNT(*) FROM answers").fetchone()
+        lookups = int(counters.get("lookups", 0))
+        hits = int(counters.get("hits", 0))
+        return {
+            "entries": entries,
+            "lookups": lookups,
+            "hits": hits,
+            "hit_rate": hits / lookups if lookups else 0.0,
+            "saved_s": counters.get("saved_ms", 0.0) / 1000,
+        }
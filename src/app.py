@@ -1,15 +1,30 @@
 import re
 import streamlit as st
 st.set_page_config(page_title="HireScope Query Bot", page_icon="💼")
-from utils import collection, openai
+from utils import (
+    answer_cache_caption, cached_answer, get_collection, remember_answer, scheduler_caption,
+    readiness_caption, search_candidates, store_health, timings_caption, warm_up,
+)
+from llm import get_scheduler, timed_stream
+from intent import retrieval_confirms, route
 
 
 st.title("💼 HireScope Query Bot")
 
+# Load the vector index in the background; the count below only opens the collection.
+warm_up()
+
 # ───────── résumé count ─────────
-total = collection.count()
+total = get_collection().count()
 st.caption(f"Total résumés in database: **{total}**")
 
+health = store_health()
+st.sidebar.caption(
+    f"Vector store: {health['mode']} · {health['store']} · "
+    + (f"ok ({health['latency_ms']:.0f} ms)" if health["ok"] else f"unreachable: {health['error']}")
+)
+st.sidebar.caption(readiness_caption())
+
 # ----- avoid slider crash when total is 0 or 1 -----
 if total > 1:
     top_k = st.sidebar.slider(
@@ -46,6 +61,7 @@ def is_greeting(text: str) -> bool:
         text.strip(), re.I
     ))
 
+# Escalation for messages the local router (intent.py) can't place.
 def is_recruitment_query(query: str) -> bool:
     prompt = (
         "Respond ONLY with 'Yes' or 'No'. Does this query relate to candidates, "
@@ -53,9 +69,9 @@ def is_recruitment_query(query: str) -> bool:
         f"Query: \"{query}\""
     )
     try:
-        resp = openai.chat.completions.create(
+        resp = get_scheduler().chat(
+            [{"role": "user", "content": prompt}],
             model="gpt-4o",
-            messages=[{"role": "user", "content": prompt}],
             temperature=0
         )
         return resp.choices[0].message.content.strip().lower().startswith("yes")
@@ -68,18 +84,24 @@ if query:
     st.chat_message("user").markdown(query)
     st.session_state.chat.append({"role": "user", "content": query})
 
+    stream, hits = None, None
     # Greeting / thanks shortcut
     if is_greeting(query):
         reply = "You're welcome! How can I assist you with candidate information?"
     else:
-        relevant = is_recruitment_query(query)
-
-        hits = collection.query(query_texts=[query], n_results=top_k)
-        docs = hits["documents"][0]
-
-        # If classifier said No but we found some matches, treat as relevant
-        if docs and any(d.strip() for d in docs):
-            relevant = True
+        decision = route(query)
+        if decision.intent == "off_topic":
+            relevant, docs = False, []
+        else:
+            hits = search_candidates(query, top_k)
+            docs = hits["documents"][0]
+            # An uncertain message is answered when retrieval found a close
+            # match; only otherwise is the LLM classifier asked.
+            relevant = (
+                decision.intent == "recruitment"
+                or retrieval_confirms(hits["distances"][0])
+                or is_recruitment_query(query)
+            )
 
         if not relevant:
             reply = (
@@ -93,14 +115,28 @@ if query:
             st.session_state.chat[0]["content"] = (
                 "Answer ONLY from these résumé snippets:\n\n" + context
             )
-            resp = openai.chat.completions.create(
-                model="gpt-4o",
-                messages=st.session_state.chat
-            )
-            reply = resp.choices[0].message.content.strip()
+            # A near-identical earlier question over the same candidates is answered from cache.
+            reply = cached_answer("query-bot", st.session_state.chat[:-1], query, hits)
+            if reply is None:
+                stream = timed_stream(
+                    get_scheduler().chat_stream(st.session_state.chat, model="gpt-4o"), hits["timings"]
+                )
 
-    st.chat_message("assistant").markdown(reply)
+    with st.chat_message("assistant"):
+        if stream is None:
+            st.markdown(reply)
+        else:
+            # Tokens render as they arrive; history gets the finished text.
+            reply = st.write_stream(stream).strip()
+            remember_answer("query-bot", st.session_state.chat[:-1], query, hits, reply)
     st.session_state.chat.append({"role": "assistant", "content": reply})
+    if hits is not None:
+        st.sidebar.caption(f"Last answer: {timings_caption(hits['timings'])}")
+
+cache_caption = answer_cache_caption()
+if cache_caption:
+    st.sidebar.caption(cache_caption)
+st.sidebar.caption(scheduler_caption())
 
 # ───────── if DB is empty ─────────
 if total == 0:
@@ -0,0 +1,177 @@
+# batch.py – offline batch chat completions for HireScope
+#
+# Packs many chat requests into one JSONL batch job, polls until it
+# finishes and maps the answers back by custom_id.  Half the price of live
+# calls and outside the interactive rate limits, at the cost of latency
+# (up to the 24 h completion window), so it suits large backfills.
+#
+# Submission and polling go through a small backend interface:
+#   OpenAIBatchBackend  – the real Files + Batches API
+#   ReplayBatchBackend  – local stand-in that answers instantly from a
+#                         callable or a recorded output JSONL (for tests)
+
+import io
+import json
+import os
+import time
+import uuid
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+BATCH_ENDPOINT = "/v1/chat/completions"
+BATCH_WINDOW = "24h"
+BATCH_MAX_REQUESTS = int(os.getenv("BATCH_MAX_REQUESTS", "50000"))
+BATCH_POLL_SECONDS = float(os.getenv("BATCH_POLL_SECONDS", "60"))
+
+# Terminal states of an OpenAI batch job.
+DONE_STATES = {"completed", "failed", "expired", "cancelled"}
+
+
+# ─────────────────────────────────────────────────────────────────────
+# 1. JSONL packing / unpacking
+# ─────────────────────────────────────────────────────────────────────
+def build_batch_jsonl(
+    requests: Iterable[Tuple[str, List[Dict]]], model: str, **params
+) -> bytes:
+    """One ``/v1/chat/completions`` line per ``(custom_id, messages)``."""
+    lines = []
+    for custom_id, messages in requests:
+        body = {"model": model, "messages": messages, **params}
+        lines.append(json.dumps(
+            {"custom_id": custom_id, "method": "POST", "url": BATCH_ENDPOINT, "body": body},
+            ensure_ascii=False,
+        ))
+    return ("\n".join(lines) + "\n").encode("utf-8")
+
+
+def parse_batch_output(text: str) -> Tuple[Dict[str, str], Dict[str, str]]:
+    """Split batch output into ``({custom_id: content}, {custom_id: error})``."""
+    answers, errors = {}, {}
+    for line in text.splitlines():
+        if not line.strip():
+            continue
+        row = json.loads(line)
+        cid = row.get("custom_id")
+        response = row.get("response") or {}
+        if row.get("error") or response.get("status_code", 200) != 200:
+            err = row.get("error") or response.get("body", {}).get("error") or {}
+            errors[cid] = err.get("message") if isinstance(err, dict) else str(err)
+            continue
+        try:
+            content = response["body"]["choices"][0]["message"]["content"].strip()
+        except (KeyError, IndexError, TypeError, AttributeError):
+            errors[cid] = "Malformed batch response."
+            continue
+        if content:
+            answers[cid] = content
+        else:
+            errors[cid] = "AI summary was empty."
+    return answers, errors
+
+
+# ─────────────────────────────────────────────────────────────────────
+# 2. Backends
+# ─────────────────────────────────────────────────────────────────────
+class BatchBackend:
+    """Submit a JSONL payload, report job state, return output text."""
+
+    def submit(self, jsonl: bytes) -> str:
+        raise NotImplementedError
+
+    def status(self, job_id: str) -> str:
+        raise NotImplementedError
+
+    def output(self, job_id: str) -> str:
+        """Output JSONL (successes and per-request errors) of a finished job."""
+        raise NotImplementedError
+
+
+class OpenAIBatchBackend(BatchBackend):
+    def __init__(self, client=None):
+        import openai
+        self.client = client or openai.OpenAI(
+            api_key=openai.api_key or os.getenv("OPENAI_API_KEY"),
+            base_url=os.getenv("OPENAI_BASE_URL") or None,
+        )
+
+    def submit(self, jsonl: bytes) -> str:
+        upload = self.client.files.create(
+            file=("hirescope_batch.jsonl", io.BytesIO(jsonl)), purpose="batch"
+        )
+        job = self.client.batches.create(
+            input_file_id=upload.id, endpoint=BATCH_ENDPOINT, completion_window=BATCH_WINDOW
+        )
+        return job.id
+
+    def status(self, job_id: str) -> str:
+        return self.client.batches.retrieve(job_id).status
+
+    def output(self, job_id: str) -> str:
+        job = self.client.batches.retrieve(job_id)
+        parts = []
+        for file_id in (job.output_file_id, job.error_file_id):
+            if file_id:
+                parts.append(self.client.files.content(file_id).text)
+        return "\n".join(parts)
+
+
+class ReplayBatchBackend(BatchBackend):
+    """In-process stand-in: every job completes immediately.
+
+    Answers come from ``responder(custom_id, body) -> content`` or, when a
+    recorded ``output_jsonl`` is given, that file is replayed verbatim.
+    """
+
+    def __init__(self, responder: Optional[Callable[[str, Dict], str]] = None,
+                 output_jsonl: Optional[str] = None):
+        self.responder = responder
+        self.recorded = output_jsonl
+        self.jobs: Dict[str, bytes] = {}
+
+    def submit(self, jsonl: bytes) -> str:
+        job_id = f"replay_{uuid.uuid4().hex[:12]}"
+        self.jobs[job_id] = jsonl
+        return job_id
+
+    def status(self, job_id: str) -> str:
+        return "completed" if job_id in self.jobs or self.recorded else "failed"
+
+    def output(self, job_id: str) -> str:
+        if self.recorded:
+            with open(self.recorded, encoding="utf-8") as f:
+                return f.read()
+        lines = []
+        for line in self.jobs[job_id].decode("utf-8").splitlines():
+            req = json.loads(line)
+            content = self.responder(req["custom_id"], req["body"]) if self.responder else ""
+            lines.append(json.dumps({
+                "custom_id": req["custom_id"],
+                "response": {"status_code": 200, "body": {
+                    "choices": [{"message": {"role": "assistant", "content": content}}]
+                }},
+                "error": None,
+            }))
+        return "\n".join(lines)
+
+
+# ─────────────────────────────────────────────────────────────────────
+# 3. Polling
+# ─────────────────────────────────────────────────────────────────────
+def wait_for_batch(
+    backend: BatchBackend,
+    job_id: str,
+    poll_seconds: float = BATCH_POLL_SECONDS,
+    on_status: Optional[Callable[[str, str], None]] = None,
+) -> Tuple[Dict[str, str], Dict[str, str]]:
+    """Block until ``job_id`` finishes; return ``(answers, errors)``.
+
+    Requests missing from a failed or expired job are not reported here;
+    callers should treat any custom_id absent from both dicts as unanswered.
+    """
+    while True:
+        state = backend.status(job_id)
+        if on_status:
+            on_status(job_id, state)
+        if state in DONE_STATES:
+            break
+        time.sleep(poll_seconds)
+    return parse_batch_output(backend.output(job_id))
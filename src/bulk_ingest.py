@@ -0,0 +1,364 @@
+# bulk_ingest.py – headless bulk résumé ingestion for HireScope
+#
+# Ingests a directory tree or .zip archive of PDFs into the same `resumes`
+# collection the Streamlit app uses, without a browser.  Progress is
+# checkpointed in a SQLite manifest, one row per file:
+#
+#   pending ─▶ summarized ─▶ saved
+#       └────▶ failed
+#
+# With --batch, summaries come from an offline batch job instead of live
+# calls, adding two stages in between:
+#
+#   pending ─▶ extracted ─▶ submitted ─▶ summarized ─▶ saved
+#
+# Summaries are written to the manifest the moment they arrive, and batch
+# job IDs are recorded at submission, so an interrupted run resumes
+# without paying for them again.
+#
+# Usage (from the repository root, like `streamlit run`):
+#   python src/bulk_ingest.py /exports/ats_dump.zip --uploaded-by "ATS backfill"
+#   python src/bulk_ingest.py /exports/ats_dump.zip --uploaded-by "ATS backfill" --batch
+
+import argparse
+import os
+import sqlite3
+import sys
+import time
+import zipfile
+from typing import Dict, Iterator, List, Tuple
+
+from batch import (
+    BATCH_MAX_REQUESTS, BATCH_POLL_SECONDS, BatchBackend, OpenAIBatchBackend,
+    build_batch_jsonl, wait_for_batch,
+)
+from cache import sha256_hex
+
+DEFAULT_CHUNK = 50
+
+
+# ─────────────────────────────────────────────────────────────────────
+# 1. Sources: directory tree or zip archive
+# ─────────────────────────────────────────────────────────────────────
+class Source:
+    """Lists PDFs under ``path`` and reads them back by key."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.is_zip = zipfile.is_zipfile(path) if os.path.isfile(path) else False
+        if not self.is_zip and not os.path.isdir(path):
+            raise SystemExit(f"❌ {path} is neither a directory nor a zip archive.")
+        self._zip = zipfile.ZipFile(path) if self.is_zip else None
+
+    def keys(self) -> Iterator[str]:
+        if self._zip:
+            for info in self._zip.infolist():
+                if not info.is_dir() and info.filename.lower().endswith(".pdf"):
+                    yield info.filename
+            return
+        for root, _, names in os.walk(self.path):
+            for name in sorted(names):
+                if name.lower().endswith(".pdf"):
+                    yield os.path.relpath(os.path.join(root, name), self.path)
+
+    def read(self, key: str) -> bytes:
+        if self._zip:
+            return self._zip.read(key)
+        with open(os.path.join(self.path, key), "rb") as f:
+            return f.read()
+
+
+# ─────────────────────────────────────────────────────────────────────
+# 2. Checkpoint manifest
+# ─────────────────────────────────────────────────────────────────────
+class Manifest:
+    def __init__(self, path: str):
+        self.conn = sqlite3.connect(path)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute(
+            """CREATE TABLE IF NOT EXISTS files (
+                   key TEXT PRIMARY KEY,
+                   stage TEXT NOT NULL,
+                   sha256 TEXT,
+                   name TEXT,
+                   cid TEXT,
+                   summary TEXT,
+                   error TEXT,
+                   updated REAL NOT NULL)"""
+        )
+        # Columns added for batch mode; older manifests are migrated in place.
+        existing = {row[1] for row in self.conn.execute("PRAGMA table_info(files)")}
+        for column in ("raw", "batch_id"):
+            if column not in existing:
+                self.conn.execute(f"ALTER TABLE files ADD COLUMN {column} TEXT")
+        self.conn.execute("CREATE INDEX IF NOT EXISTS files_stage ON files(stage)")
+        self.conn.commit()
+
+    def register(self, keys: Iterator[str]) -> int:
+        before = self.conn.total_changes
+        self.conn.executemany(
+            "INSERT OR IGNORE INTO files(key, stage, updated) VALUES (?, 'pending', ?)",
+            ((k, time.time()) for k in keys),
+        )
+        self.conn.commit()
+        return self.conn.total_changes - before
+
+    def keys_in(self, stage: str, limit: int) -> List[str]:
+        rows = self.conn.execute(
+            "SELECT key FROM files WHERE stage=? ORDER BY key LIMIT ?", (stage, limit)
+        ).fetchall()
+        return [r[0] for r in rows]
+
+    def summarized(self, limit: int) -> List[Dict]:
+        rows = self.conn.execute(
+            "SELECT key, name, cid, summary, raw FROM files WHERE stage='summarized' ORDER BY key LIMIT ?",
+            (limit,),
+        ).fetchall()
+        return [dict(zip(("key", "name", "cid", "summary", "raw"), r)) for r in rows]
+
+    def extracted(self, limit: int) -> List[Dict]:
+        rows = self.conn.execute(
+            "SELECT key, raw FROM files WHERE stage='extracted' ORDER BY key LIMIT ?", (limit,)
+        ).fetchall()
+        return [{"key": k, "raw": raw} for k, raw in rows]
+
+    def outstanding_batches(self) -> List[str]:
+        rows = self.conn.execute(
+            "SELECT DISTINCT batch_id FROM files WHERE stage='submitted'"
+        ).fetchall()
+        return [r[0] for r in rows]
+
+    def batch_rows(self, batch_id: str) -> List[Dict]:
+        rows = self.conn.execute(
+            "SELECT key, sha256, raw FROM files WHERE stage='submitted' AND batch_id=?", (batch_id,)
+        ).fetchall()
+        return [{"key": k, "sha256": h, "raw": raw} for k, h, raw in rows]
+
+    def mark_submitted(self, keys: List[str], batch_id: str):
+        now = time.time()
+        self.conn.executemany(
+            "UPDATE files SET stage='submitted', batch_id=?, updated=? WHERE key=?",
+            ((batch_id, now, k) for k in keys),
+        )
+        self.conn.commit()
+
+    def mark(self, key: str, stage: str, **fields):
+        fields.update(stage=stage, updated=time.time())
+        cols = ", ".join(f"{c}=?" for c in fields)
+        self.conn.execute(f"UPDATE files SET {cols} WHERE key=?", (*fields.values(), key))
+        self.conn.commit()
+
+    def mark_saved(self, keys: List[str]):
+        now = time.time()
+        self.conn.executemany(
+            "UPDATE files SET stage='saved', summary=NULL, raw=NULL, updated=? WHERE key=?",
+            ((now, k) for k in keys),
+        )
+        self.conn.commit()
+
+    def retry_failed(self) -> int:
+        cur = self.conn.execute("UPDATE files SET stage='pending', error=NULL WHERE stage='failed'")
+        self.conn.commit()
+        return cur.rowcount
+
+    def counts(self) -> Dict[str, int]:
+        return dict(self.conn.execute("SELECT stage, COUNT(*) FROM files GROUP BY stage").fetchall())
+
+
+# ─────────────────────────────────────────────────────────────────────
+# 3. Pipeline
+# ─────────────────────────────────────────────────────────────────────
+def save_summarized(manifest: Manifest, uploaded_by: str, chunk: int) -> int:
+    """Write every summarized-but-unsaved manifest row to the collection."""
+    from utils import save_candidates
+
+    saved = 0
+    while True:
+        rows = manifest.summarized(chunk)
+        if not rows:
+            return saved
+        # Headless runs never prompt: candidates are indexed so later
+        # uploads are checked against them, but matches are not merged.
+        save_candidates([dict(r, uploaded_by=uploaded_by) for r in rows])
+        manifest.mark_saved([r["key"] for r in rows])
+        saved += len(rows)
+
+
+def process_pending(
+    source: Source, manifest: Manifest, uploaded_by: str, chunk: int, batch_mode: bool = False
+) -> Tuple[int, int]:
+    """Extract (and, unless ``batch_mode``, summarise and save) pending files."""
+    from ingest import ingest_batch
+    from utils import (
+        summarize_resume, extract_candidate_name, candidate_identity, make_candidate_id,
+        get_ingest_cache, get_extractor_stats, get_summary_fingerprint,
+    )
+
+    ok = failed = 0
+    while True:
+        keys = manifest.keys_in("pending", chunk)
+        if not keys:
+            return ok, failed
+
+        files = []
+        for key in keys:
+            try:
+                files.append((key, source.read(key)))
+            except Exception as e:
+                manifest.mark(key, "failed", error=f"read failed: {e}")
+                failed += 1
+
+        def on_result(idx: int, res: Dict):
+            key = files[idx][0]
+            digest = sha256_hex(files[idx][1])
+            if res["summary"] is None:
+                manifest.mark(key, "extracted", sha256=digest, raw=res["raw"])
+                return
+            name = extract_candidate_name(res["summary"], os.path.basename(key))
+            manifest.mark(
+                key, "summarized",
+                sha256=digest, name=name,
+                cid=make_candidate_id(candidate_identity(res["summary"], res["raw"])),
+                summary=res["summary"], raw=res["raw"],
+            )
+
+        def on_progress(done: int, total: int, filename: str, stage: str):
+            if batch_mode or stage != "extracted":
+                print(f"  [{done}/{total}] {stage:<10} {filename}", flush=True)
+
+        # Batch jobs trim over-budget résumés instead of map-reducing them.
+        _, errors = ingest_batch(
+            files, None if batch_mode else summarize_resume,
+            on_progress=on_progress, on_result=on_result,
+            cache=get_ingest_cache(),
+            fingerprint=get_summary_fingerprint("trim" if batch_mode else "map-reduce"),
+            extractor_stats=get_extractor_stats(),
+        )
+        for err in errors:
+            manifest.mark(err["filename"], "failed", error=err["error"])
+        failed += len(errors)
+        ok += len(files) - len(errors)
+
+        # Save per chunk so a crash never leaves more than one chunk unsaved.
+        save_summarized(manifest, uploaded_by, chunk)
+        print(f"Chunk done: {manifest.counts()}", flush=True)
+
+
+def submit_extracted(manifest: Manifest, backend: BatchBackend) -> List[str]:
+    """Pack every extracted row into batch jobs; returns the new job IDs."""
+    from utils import summary_messages, SUMMARY_MODEL, SUMMARY_PARAMS
+
+    job_ids = []
+    while True:
+        rows = manifest.extracted(BATCH_MAX_REQUESTS)
+        if not rows:
+            return job_ids
+        payload = build_batch_jsonl(
+            ((r["key"], summary_messages(r["raw"])) for r in rows),
+            model=SUMMARY_MODEL, **SUMMARY_PARAMS,
+        )
+        job_id = backend.submit(payload)
+        manifest.mark_submitted([r["key"] for r in rows], job_id)
+        print(f"Submitted batch {job_id} with {len(rows)} résumés.", flush=True)
+        job_ids.append(job_id)
+
+
+def collect_batches(manifest: Manifest, backend: BatchBackend, poll_seconds: float) -> Tuple[int, int]:
+    """Wait for every submitted job and move its rows to summarized/failed."""
+    from utils import (
+        extract_candidate_name, candidate_identity, make_candidate_id, normalize_summary,
+        get_ingest_cache, get_summary_fingerprint,
+    )
+
+    cache = get_ingest_cache()
+    fingerprint = get_summary_fingerprint("trim")
+    ok = failed = 0
+    for job_id in manifest.outstanding_batches():
+        answers, errors = wait_for_batch(
+            backend, job_id, poll_seconds,
+            on_status=lambda jid, state: print(f"  batch {jid}: {state}", flush=True),
+        )
+        for row in manifest.batch_rows(job_id):
+            key = row["key"]
+            summary = answers.get(key)
+            if summary is not None:
+                summary = normalize_summary(summary)
+                name = extract_candidate_name(summary, os.path.basename(key))
+                cid = make_candidate_id(candidate_identity(summary, row["raw"]))
+                manifest.mark(key, "summarized", name=name, cid=cid, summary=summary)
+                if cache and row["sha256"]:
+                    cache.put_summary(row["sha256"], fingerprint, summary)
+                ok += 1
+            elif key in errors:
+                manifest.mark(key, "failed", error=errors[key])
+                failed += 1
+            else:
+                # Job failed or expired before reaching this request.
+                manifest.mark(key, "extracted", batch_id=None)
+    return ok, failed
+
+
+# ─────────────────────────────────────────────────────────────────────
+# 4. Entry point
+# ─────────────────────────────────────────────────────────────────────
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Bulk-ingest résumé PDFs into HireScope.")
+    parser.add_argument("source", help="Directory of PDFs or a .zip archive")
+    parser.add_argument("--uploaded-by", required=True, help="Recorded as the uploading HR user")
+    parser.add_argument(
+        "--manifest",
+        help="Checkpoint file (default: <source>.manifest.sqlite3); reuse it to resume",
+    )
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK,
+                        help=f"Files per processing/save chunk (default {DEFAULT_CHUNK})")
+    parser.add_argument("--retry-failed", action="store_true",
+                        help="Re-queue files that failed in a previous run")
+    parser.add_argument("--batch", action="store_true",
+                        help="Summarise through an offline batch job (cheaper, not interactive)")
+    parser.add_argument("--poll-seconds", type=float, default=BATCH_POLL_SECONDS,
+                        help=f"Batch status polling interval (default {BATCH_POLL_SECONDS:g})")
+    args = parser.parse_args(argv)
+
+    if not os.getenv("OPENAI_API_KEY"):
+        print("❌ OPENAI_API_KEY missing.", file=sys.stderr)
+        return 2
+
+    source = Source(args.source)
+    manifest = Manifest(args.manifest or args.source.rstrip("/\\") + ".manifest.sqlite3")
+    print(f"Registered {manifest.register(source.keys())} new files.")
+    if args.retry_failed:
+        print(f"Re-queued {manifest.retry_failed()} failed files.")
+
+    # Finish anything summarized by an interrupted run before new work.
+    resumed = save_summarized(manifest, args.uploaded_by, args.chunk_size)
+    if resumed:
+        print(f"Saved {resumed} résumés summarized by a previous run.")
+
+    if not args.batch:
+        ok, failed = process_pending(source, manifest, args.uploaded_by, args.chunk_size)
+        print(f"Done: {ok} ingested, {failed} failed. Manifest: {manifest.counts()}")
+        return 0 if not failed else 1
+
+    return run_batch_mode(source, manifest, args, OpenAIBatchBackend())
+
+
+def run_batch_mode(source: Source, manifest: Manifest, args, backend: BatchBackend) -> int:
+    # Jobs submitted by an interrupted run are polled, never resubmitted.
+    collect_batches(manifest, backend, args.poll_seconds)
+    save_summarized(manifest, args.uploaded_by, args.chunk_size)
+
+    _, failed = process_pending(source, manifest, args.uploaded_by, args.chunk_size, batch_mode=True)
+    # Cache hits during extraction were staged as summarized directly.
+    save_summarized(manifest, args.uploaded_by, args.chunk_size)
+
+    submit_extracted(manifest, backend)
+    ok, batch_failed = collect_batches(manifest, backend, args.poll_seconds)
+    save_summarized(manifest, args.uploaded_by, args.chunk_size)
+
+    failed += batch_failed
+    print(f"Done: {ok} summarized by batch, {failed} failed. Manifest: {manifest.counts()}")
+    return 0 if not failed else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
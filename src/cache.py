@@ -0,0 +1,138 @@
+# cache.py – content-addressed ingest cache for HireScope
+#
+# Stores extracted text keyed by the SHA-256 of the PDF bytes, and GPT
+# summaries keyed by PDF hash + prompt/model fingerprint, in one SQLite
+# file.  Entries are evicted least-recently-used once the stored payload
+# exceeds ``max_bytes``.
+
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, Optional
+
+DEFAULT_MAX_BYTES = int(os.getenv("INGEST_CACHE_MAX_MB", "512")) * 1024 * 1024
+
+
+def sha256_hex(data) -> str:
+    if isinstance(data, str):
+        data = data.encode("utf-8")
+    return hashlib.sha256(data).hexdigest()
+
+
+class IngestCache:
+    """SQLite-backed cache for extracted text and résumé summaries.
+
+    Safe to share between threads; every call opens its own short-lived
+    connection so the file can also be shared by several processes.
+    """
+
+    KINDS = ("text", "summary")
+
+    def __init__(self, path: str, max_bytes: int = DEFAULT_MAX_BYTES):
+        self.path = path
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        parent = os.path.dirname(os.path.abspath(path))
+        os.makedirs(parent, exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                """CREATE TABLE IF NOT EXISTS entries (
+                       kind TEXT NOT NULL,
+                       key TEXT NOT NULL,
+                       value TEXT NOT NULL,
+                       size INTEGER NOT NULL,
+                       last_used REAL NOT NULL,
+                       PRIMARY KEY (kind, key))"""
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS entries_lru ON entries(last_used)")
+            conn.execute(
+                """CREATE TABLE IF NOT EXISTS counters (
+                       kind TEXT PRIMARY KEY,
+                       hits INTEGER NOT NULL DEFAULT 0,
+                       misses INTEGER NOT NULL DEFAULT 0)"""
+            )
+            conn.executemany(
+                "INSERT OR IGNORE INTO counters(kind) VALUES (?)", [(k,) for k in self.KINDS]
+            )
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self.path, timeout=30)
+
+    # ── generic get / put ────────────────────────────────────────────
+    def _get(self, kind: str, key: str) -> Optional[str]:
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT value FROM entries WHERE kind=? AND key=?", (kind, key)
+            ).fetchone()
+            column = "hits" if row else "misses"
+            conn.execute(f"UPDATE counters SET {column}={column}+1 WHERE kind=?", (kind,))
+            if row:
+                conn.execute(
+                    "UPDATE entries SET last_used=? WHERE kind=? AND key=?",
+                    (time.time(), kind, key),
+                )
+        return row[0] if row else None
+
+    def _put(self, kind: str, key: str, value: str):
+        size = len(value.encode("utf-8"))
+        with self._lock, self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO entries(kind, key, value, size, last_used) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (kind, key, value, size, time.time()),
+            )
+            self._evict(conn)
+
+    def _evict(self, conn: sqlite3.Connection):
+        total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        rows = conn.execute("SELECT kind, key, size FROM entries ORDER BY last_used").fetchall()
+        doomed = []
+        for kind, key, size in rows:
+            if total <= self.max_bytes:
+                break
+            doomed.append((kind, key))
+            total -= size
+        conn.executemany("DELETE FROM entries WHERE kind=? AND key=?", doomed)
+
+    # ── typed helpers ────────────────────────────────────────────────
+    def get_text(self, pdf_hash: str) -> Optional[str]:
+        return self._get("text", pdf_hash)
+
+    def put_text(self, pdf_hash: str, text: str):
+        self._put("text", pdf_hash, text)
+
+    @staticmethod
+    def summary_key(pdf_hash: str, fingerprint: str) -> str:
+        """Summary key covering the PDF content and the prompt/model fingerprint."""
+        return sha256_hex(f"{pdf_hash}:{fingerprint}")
+
+    def get_summary(self, pdf_hash: str, fingerprint: str) -> Optional[str]:
+        return self._get("summary", self.summary_key(pdf_hash, fingerprint))
+
+    def put_summary(self, pdf_hash: str, fingerprint: str, summary: str):
+        self._put("summary", self.summary_key(pdf_hash, fingerprint), summary)
+
+    # ── metrics ──────────────────────────────────────────────────────
+    def stats(self) -> Dict[str, Dict[str, int]]:
+        """Hit/miss counters per kind plus entry count and stored bytes."""
+        with self._connect() as conn:
+            counters = conn.execute("SELECT kind, hits, misses FROM counters").fetchall()
+            sizes = dict(
+                (kind, (n, b)) for kind, n, b in conn.execute(
+                    "SELECT kind, COUNT(*), COALESCE(SUM(size), 0) FROM entries GROUP BY kind"
+                )
+            )
+        return {
+            kind: {
+                "hits": hits,
+                "misses": misses,
+                "entries": sizes.get(kind, (0, 0))[0],
+                "bytes": sizes.get(kind, (0, 0))[1],
+            }
+            for kind, hits, misses in counters
+        }
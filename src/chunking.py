@@ -0,0 +1,92 @@
+# chunking.py – section-level chunks of a candidate for multi-vector search
+#
+# In INDEX_MODE=sections each candidate is also stored as several small
+# documents in the `resume_sections` collection, all carrying its
+# `candidate_id`:
+#
+#   profile – skill area, location, organisation, education, experience
+#   role    – one chunk per work-history entry (the latest one is marked)
+#   skills  – the skills list
+#   <raw>   – sections of the extracted résumé text (experience, projects,
+#             ...) cut to SECTION_CHUNK_TOKENS, when the text is available;
+#             text without recognised headings is one "other" section
+#
+# Queries match individual chunks; hits are collapsed back to candidates
+# and only the matching chunks are sent to the chat model.
+
+import os
+from typing import Dict, List, Tuple
+
+from resume_schema import SchemaError, latest_role, parse_summary, total_experience
+from summarization import chunk_text, split_sections
+
+SECTION_CHUNK_TOKENS = int(os.getenv("SECTION_CHUNK_TOKENS", "300"))
+
+
+def _line(label: str, value) -> str:
+    return f"{label}: {value}" if value not in (None, "", []) else ""
+
+
+def summary_chunks(summary: str) -> List[Tuple[str, str]]:
+    """``[(section, text)]`` from a schema summary; the whole text if it isn't JSON."""
+    try:
+        profile = parse_summary(summary)
+    except SchemaError:
+        return [("summary", text) for text in chunk_text(summary, SECTION_CHUNK_TOKENS)] if summary.strip() else []
+
+    name = profile["name"] or "Candidate"
+    chunks = []
+    lines = [
+        _line("Primary skill area", profile["primarySkillArea"]),
+        _line("Location", profile["currentLocation"]),
+        _line("Current organisation", profile["currentOrganisation"]),
+        _line("Highest education", profile["highestEducation"]),
+        _line("Year of passing", profile["yearOfPassing"]),
+        _line("Total experience (years)", total_experience(profile)),
+        _line("Assessment", profile["assessment"]),
+    ]
+    body = "\n".join(line for line in lines if line)
+    if body:
+        chunks.append(("profile", f"{name}\n{body}"))
+
+    latest = latest_role(profile)
+    for role in profile["experienceDetails"]["workHistoryDates"]:
+        if not isinstance(role, dict):
+            continue
+        tag = " (most recent role)" if role is latest else ""
+        lines = [
+            _line("Role", role.get("role")),
+            _line("Company", role.get("company")),
+            _line("From", role.get("startDate")),
+            _line("To", role.get("endDate")),
+            _line("Duration", role.get("duration")),
+        ]
+        chunks.append(("role", f"{name} – work history{tag}\n" + "\n".join(l for l in lines if l)))
+
+    skills = [str(s) for s in profile["skills"] if s]
+    if skills:
+        chunks.append(("skills", f"{name} – skills\n{', '.join(skills)}"))
+    return chunks
+
+
+def candidate_chunks(summary: str, raw: str = "") -> List[Tuple[str, str]]:
+    chunks = summary_chunks(summary)
+    sections = split_sections(raw or "")
+    if [name for name, _ in sections] == ["header"]:
+        # No recognised headings: the whole body is one section.
+        sections = [("other", sections[0][1])]
+    for section, text in sections:
+        if section == "header":      # contact block; already in the profile chunk
+            continue
+        chunks.extend((section, part) for part in chunk_text(text, SECTION_CHUNK_TOKENS))
+    return chunks
+
+
+def chunk_records(candidate_id: str, name: str, summary: str, raw: str = "") -> Dict[str, List]:
+    """``ids`` / ``documents`` / ``metadatas`` for one candidate's chunks."""
+    ids, documents, metadatas = [], [], []
+    for i, (section, text) in enumerate(candidate_chunks(summary, raw)):
+        ids.append(f"{candidate_id}#{i}")
+        documents.append(text)
+        metadatas.append({"candidate_id": candidate_id, "name": name, "section": section})
+    return {"ids": ids, "documents": documents, "metadatas": metadatas}
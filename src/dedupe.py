@@ -0,0 +1,238 @@
+# dedupe.py – duplicate-candidate index for HireScope
+#
+# Two kinds of match, both answered from indexed SQLite lookups so an
+# upload batch can be checked against 100k stored candidates quickly:
+#
+#   exact – same normalised email or phone (or same name with near-
+#           identical text): almost certainly the same person.
+#   near  – MinHash/LSH Jaccard estimate of the résumé text above
+#           NEAR_DUP_THRESHOLD: likely the same person with an updated CV,
+#           shown for merge review.
+#
+# Candidates saved before this index existed only have their summary, so
+# every candidate is signed over its summary, and also over its extracted
+# text when that is known.  Signatures are only compared like for like:
+# extracted text against extracted text when both sides have it, else
+# summary against summary.
+
+import hashlib
+import os
+import re
+import sqlite3
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+
+NUM_PERM = 128
+LSH_BANDS = 32                      # 32 bands × 4 rows ≈ 0.42 Jaccard knee
+LSH_ROWS = NUM_PERM // LSH_BANDS
+SHINGLE_WORDS = 3
+NEAR_DUP_THRESHOLD = float(os.getenv("NEAR_DUP_THRESHOLD", "0.6"))
+SAME_TEXT_THRESHOLD = 0.9
+
+_PRIME = np.uint64((1 << 31) - 1)
+_rng = np.random.RandomState(20240611)   # fixed: signatures are persisted
+_A = _rng.randint(1, (1 << 31) - 1, NUM_PERM).astype(np.uint64)
+_B = _rng.randint(0, (1 << 31) - 1, NUM_PERM).astype(np.uint64)
+
+
+# ─────────────────────────────────────────────────────────────────────
+# 1. Normalised identity keys
+# ─────────────────────────────────────────────────────────────────────
+def email_key(email: Optional[str]) -> Optional[str]:
+    if not email or "@" not in email:
+        return None
+    local, _, domain = email.strip().lower().partition("@")
+    return f"{local.split('+', 1)[0]}@{domain}"
+
+
+def phone_key(phone: Optional[str]) -> Optional[str]:
+    digits = re.sub(r"\D", "", phone or "")
+    return digits[-10:] if len(digits) >= 8 else None
+
+
+def name_key(name: Optional[str]) -> Optional[str]:
+    tokens = re.findall(r"[a-z]+", (name or "").lower())
+    return " ".join(sorted(tokens)) if len(tokens) >= 2 else None
+
+
+# ─────────────────────────────────────────────────────────────────────
+# 2. MinHash signatures
+# ─────────────────────────────────────────────────────────────────────
+def minhash(text: str) -> np.ndarray:
+    """``NUM_PERM`` uint32 MinHash values over word ``SHINGLE_WORDS``-grams."""
+    words = re.findall(r"\w+", text.lower())
+    if len(words) < SHINGLE_WORDS:
+        words = words + [""] * (SHINGLE_WORDS - len(words))
+    shingles = {" ".join(words[i:i + SHINGLE_WORDS]) for i in range(len(words) - SHINGLE_WORDS + 1)}
+    hashes = np.fromiter(
+        (int.from_bytes(hashlib.blake2b(s.encode(), digest_size=4).digest(), "little") for s in shingles),
+        dtype=np.uint64, count=len(shingles),
+    ) % _PRIME
+    permuted = (np.outer(hashes, _A) + _B) % _PRIME
+    return permuted.min(axis=0).astype(np.uint32)
+
+
+def jaccard(a: np.ndarray, b: np.ndarray) -> float:
+    return float(np.mean(a == b))
+
+
+def _bands(signature: np.ndarray, source: str) -> List[str]:
+    """LSH bucket per band; ``source`` ("raw" / "summary") keeps the two kinds apart."""
+    return [
+        f"{source}:" + hashlib.blake2b(signature[b * LSH_ROWS:(b + 1) * LSH_ROWS].tobytes(), digest_size=8).hexdigest()
+        for b in range(LSH_BANDS)
+    ]
+
+
+def _signatures(text: str, summary: str) -> Dict[str, np.ndarray]:
+    """``{"raw": …, "summary": …}`` for whichever of the two texts is non-empty."""
+    sources = {"raw": text or "", "summary": summary or ""}
+    return {source: minhash(value) for source, value in sources.items() if value.strip()}
+
+
+# ─────────────────────────────────────────────────────────────────────
+# 3. Persistent index
+# ─────────────────────────────────────────────────────────────────────
+class DedupeIndex:
+    def __init__(self, path: str):
+        self.path = path
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                """CREATE TABLE IF NOT EXISTS candidates (
+                       candidate_id TEXT PRIMARY KEY,
+                       email_key TEXT, phone_key TEXT, name_key TEXT,
+                       signature BLOB, summary_signature BLOB)"""
+            )
+            columns = {r[1] for r in conn.execute("PRAGMA table_info(candidates)")}
+            if "summary_signature" not in columns:
+                # Older indexes held one signature of unknown origin (text or
+                # summary).  Keep the identity keys, drop the signature; the
+                # next "Rebuild search metadata" re-signs these candidates.
+                conn.execute("ALTER TABLE candidates ADD COLUMN summary_signature BLOB")
+                conn.execute("UPDATE candidates SET signature=NULL")
+                legacy = True
+            else:
+                legacy = False
+            for col in ("email_key", "phone_key", "name_key"):
+                conn.execute(f"CREATE INDEX IF NOT EXISTS candidates_{col} ON candidates({col})")
+            conn.execute(
+                """CREATE TABLE IF NOT EXISTS lsh (
+                       band INTEGER NOT NULL, bucket TEXT NOT NULL, candidate_id TEXT NOT NULL)"""
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS lsh_bucket ON lsh(band, bucket)")
+            conn.execute("CREATE INDEX IF NOT EXISTS lsh_candidate ON lsh(candidate_id)")
+            if legacy:
+                conn.execute("DELETE FROM lsh")
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self.path, timeout=30)
+
+    # ── writes ───────────────────────────────────────────────────────
+    def add_many(self, entries: Iterable[Dict]):
+        """Index ``{candidate_id, email, phone, name, text, summary}`` dicts (upsert).
+
+        ``text`` is the extracted résumé text, empty when only the summary
+        is known.
+        """
+        rows, bands = [], []
+        for e in entries:
+            sigs = _signatures(e.get("text"), e.get("summary"))
+            cid = e["candidate_id"]
+            rows.append((cid, email_key(e.get("email")), phone_key(e.get("phone")), name_key(e.get("name")),
+                         sigs["raw"].tobytes() if "raw" in sigs else None,
+                         sigs["summary"].tobytes() if "summary" in sigs else None))
+            for source, sig in sigs.items():
+                bands.extend((b, bucket, cid) for b, bucket in enumerate(_bands(sig, source)))
+        if not rows:
+            return
+        with self._connect() as conn:
+            conn.executemany("DELETE FROM lsh WHERE candidate_id=?", [(r[0],) for r in rows])
+            conn.executemany(
+                "INSERT OR REPLACE INTO candidates"
+                "(candidate_id, email_key, phone_key, name_key, signature, summary_signature) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                rows,
+            )
+            conn.executemany("INSERT INTO lsh VALUES (?, ?, ?)", bands)
+
+    def remove_many(self, candidate_ids: Iterable[str]):
+        ids = [(c,) for c in candidate_ids]
+        with self._connect() as conn:
+            conn.executemany("DELETE FROM candidates WHERE candidate_id=?", ids)
+            conn.executemany("DELETE FROM lsh WHERE candidate_id=?", ids)
+
+    def indexed_ids(self) -> set:
+        """Candidates already signed (legacy rows without signatures are not)."""
+        with self._connect() as conn:
+            return {r[0] for r in conn.execute(
+                "SELECT candidate_id FROM candidates WHERE signature IS NOT NULL OR summary_signature IS NOT NULL"
+            )}
+
+    # ── reads ────────────────────────────────────────────────────────
+    def check(self, email: Optional[str], phone: Optional[str], name: Optional[str],
+              text: str, summary: str = "") -> List[Dict]:
+        """Stored candidates matching one incoming résumé, best first.
+
+        ``text`` is its extracted text and ``summary`` its summary.  Each
+        match is ``{candidate_id, kind, reason, similarity}`` with ``kind``
+        in {"exact", "near"}.
+        """
+        sigs = _signatures(text, summary)
+        keys = {"email": email_key(email), "phone": phone_key(phone), "name": name_key(name)}
+        found: Dict[str, Dict] = {}
+        with self._connect() as conn:
+            for reason, key in keys.items():
+                if not key:
+                    continue
+                for (cid,) in conn.execute(
+                    f"SELECT candidate_id FROM candidates WHERE {reason}_key=?", (key,)
+                ):
+                    found.setdefault(cid, {"candidate_id": cid, "reasons": set()})["reasons"].add(reason)
+
+            for source, sig in sigs.items():
+                bands = _bands(sig, source)
+                placeholders = " OR ".join(["(band=? AND bucket=?)"] * len(bands))
+                params = [v for b, bucket in enumerate(bands) for v in (b, bucket)]
+                for (cid,) in conn.execute(
+                    f"SELECT DISTINCT candidate_id FROM lsh WHERE {placeholders}", params
+                ):
+                    found.setdefault(cid, {"candidate_id": cid, "reasons": set()})["reasons"].add("text")
+
+            if not found:
+                return []
+            ids = list(found)
+            stored = {
+                cid: {"raw": raw, "summary": summ}
+                for cid, raw, summ in conn.execute(
+                    "SELECT candidate_id, signature, summary_signature FROM candidates "
+                    f"WHERE candidate_id IN ({','.join('?' * len(ids))})",
+                    ids,
+                )
+            }
+
+        matches = []
+        for cid, m in found.items():
+            similarity = 0.0
+            for source in ("raw", "summary"):     # like for like, extracted text first
+                theirs = stored.get(cid, {}).get(source)
+                if source in sigs and theirs:
+                    similarity = jaccard(sigs[source], np.frombuffer(theirs, dtype=np.uint32))
+                    break
+            reasons = m["reasons"]
+            if reasons & {"email", "phone"} or ("name" in reasons and similarity >= SAME_TEXT_THRESHOLD):
+                kind = "exact"
+            elif similarity >= NEAR_DUP_THRESHOLD:
+                kind = "near"
+            else:
+                continue
+            matches.append({
+                "candidate_id": cid,
+                "kind": kind,
+                "reason": ", ".join(sorted(reasons)),
+                "similarity": round(similarity, 2),
+            })
+        matches.sort(key=lambda m: (m["kind"] != "exact", -m["similarity"]))
+        return matches
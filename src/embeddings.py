@@ -0,0 +1,440 @@
+# embeddings.py – embedding providers and cache for HireScope
+#
+# Providers (EMBEDDING_PROVIDER):
+#   openai – OpenAI embeddings API (text-embedding-3-large by default)
+#   local  – a sentence-transformers model loaded from EMBEDDING_MODEL_PATH,
+#            run on CPU in batches across a thread pool; no network needed
+#
+# The active provider, model and dimensions are recorded in the
+# collection's metadata so a store embedded by one provider is never
+# queried with vectors from another.
+#
+# EMBEDDING_DIMENSIONS (e.g. 256/512/1024) stores a truncated prefix of
+# each vector to shrink the HNSW index; VECTOR_SIDECAR=int8 keeps int8
+# full-size vectors beside it so the shortlist can be re-scored.
+#
+# Whichever provider is active is wrapped in a cache so identical texts
+# (repeated recruiter queries, re-saved summaries) are embedded once.
+# Vectors are keyed by SHA-256(model + text) and looked up in two tiers:
+#
+#   1. an in-process LRU of recent vectors (no I/O),
+#   2. a SQLite store next to the Chroma directory, evicted least-recently-
+#      used once it exceeds ``max_bytes``.
+#
+# Only the misses of a call are sent to the provider, in one batch.
+
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+from chromadb.api.types import EmbeddingFunction
+
+from cache import sha256_hex
+
+EMBEDDING_CACHE_MAX_BYTES = int(os.getenv("EMBEDDING_CACHE_MAX_MB", "256")) * 1024 * 1024
+EMBEDDING_LRU_SIZE = int(os.getenv("EMBEDDING_LRU_SIZE", "2048"))
+SQLITE_MAX_PARAMS = 900
+
+EMBEDDING_PROVIDER = os.getenv("EMBEDDING_PROVIDER", "openai").lower()
+EMBEDDING_MODEL_PATH = os.getenv("EMBEDDING_MODEL_PATH", "")
+EMBEDDING_BATCH_SIZE = int(os.getenv("EMBEDDING_BATCH_SIZE", "32"))
+EMBEDDING_WORKERS = int(os.getenv("EMBEDDING_WORKERS", str(min(4, os.cpu_count() or 1))))
+EMBEDDING_DIMENSIONS = int(os.getenv("EMBEDDING_DIMENSIONS", "0")) or None
+VECTOR_SIDECAR = os.getenv("VECTOR_SIDECAR", "").lower()        # "int8" to enable
+RESCORE_OVERFETCH = int(os.getenv("RESCORE_OVERFETCH", "4"))
+
+OPENAI_DIMENSIONS = {
+    "text-embedding-3-large": 3072,
+    "text-embedding-3-small": 1536,
+    "text-embedding-ada-002": 1536,
+}
+
+
+def embedding_key(model: str, text: str) -> str:
+    return sha256_hex(f"{model}\x00{text}")
+
+
+# ─────────────────────────────────────────────────────────────────────
+# 1. Providers
+# ─────────────────────────────────────────────────────────────────────
+class EmbeddingProvider:
+    """Callable ``texts -> vectors`` with a stable description.
+
+    ``provider``, ``model`` and ``dimensions`` are what gets recorded in
+    the collection metadata.
+    """
+
+    provider = ""
+    model = ""
+    dimensions: Optional[int] = None
+
+    def __call__(self, input) -> List:
+        raise NotImplementedError
+
+    def describe(self) -> Dict:
+        return {
+            "embedding_provider": self.provider,
+            "embedding_model": self.model,
+            "embedding_dimensions": self.dimensions,
+        }
+
+    # Chroma (>= 1.0) calls name() on every collection open and persists a
+    # config for non-legacy embedding functions; providers other than
+    # OpenAI have no registered Chroma equivalent.
+    def name(self) -> str:
+        return f"hirescope-{self.provider}"
+
+    def get_config(self) -> Dict:
+        return self.describe()
+
+    def is_legacy(self) -> bool:
+        return True
+
+
+class OpenAIEmbeddingProvider(EmbeddingProvider):
+    provider = "openai"
+
+    def __init__(self, api_key: str, model: str = "text-embedding-3-large"):
+        from chromadb.utils import embedding_functions
+        self.model = model
+        self.dimensions = OPENAI_DIMENSIONS.get(model)
+        self._fn = embedding_functions.OpenAIEmbeddingFunction(api_key=api_key, model_name=model)
+
+    def __call__(self, input) -> List:
+        return self._fn(input)
+
+    def name(self):
+        return self._fn.name()
+
+    def get_config(self):
+        return self._fn.get_config()
+
+    def is_legacy(self) -> bool:
+        return self._fn.is_legacy() if hasattr(self._fn, "is_legacy") else True
+
+
+class LocalEmbeddingProvider(EmbeddingProvider):
+    """sentence-transformers model from a local directory, on CPU."""
+
+    provider = "local"
+
+    def __init__(self, model_path: str, batch_size: int = EMBEDDING_BATCH_SIZE,
+                 workers: int = EMBEDDING_WORKERS):
+        if not model_path or not os.path.isdir(model_path):
+            raise ValueError(f"EMBEDDING_MODEL_PATH is not a model directory: {model_path!r}")
+        try:
+            from sentence_transformers import SentenceTransformer
+        except ImportError as e:
+            raise RuntimeError("The local embedding provider needs `pip install sentence-transformers`.") from e
+        self.model = os.path.basename(os.path.normpath(model_path))
+        self.batch_size = batch_size
+        self._model = SentenceTransformer(model_path, device="cpu")
+        self.dimensions = self._model.get_sentence_embedding_dimension()
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="embed")
+
+    def _encode(self, texts: List[str]):
+        return self._model.encode(
+            texts, batch_size=len(texts), normalize_embeddings=True, convert_to_numpy=True
+        )
+
+    def __call__(self, input) -> List:
+        texts = list(input)
+        batches = [texts[i:i + self.batch_size] for i in range(0, len(texts), self.batch_size)]
+        if len(batches) <= 1:   # a single query: skip the pool hand-off
+            arrays = [self._encode(b) for b in batches]
+        else:
+            arrays = list(self._pool.map(self._encode, batches))
+        return [v for arr in arrays for v in arr]
+
+
+def make_embedding_provider(api_key: str, provider: str = EMBEDDING_PROVIDER) -> EmbeddingProvider:
+    if provider == "openai":
+        return OpenAIEmbeddingProvider(api_key)
+    if provider == "local":
+        return LocalEmbeddingProvider(EMBEDDING_MODEL_PATH)
+    raise ValueError(f"Unknown EMBEDDING_PROVIDER {provider!r} (expected 'openai' or 'local').")
+
+
+# Collections created before providers were recorded were embedded this way.
+LEGACY_EMBEDDINGS = {
+    "embedding_provider": "openai",
+    "embedding_model": "text-embedding-3-large",
+    "embedding_dimensions": 3072,
+}
+
+
+def embedding_mismatch(metadata: Optional[Dict], count: int, active: Dict) -> Optional[str]:
+    """Why the stored vectors can't be used with ``active``, or ``None``.
+
+    ``metadata`` is the collection's; an unrecorded, non-empty collection
+    is assumed to hold ``LEGACY_EMBEDDINGS``.
+    """
+    metadata = metadata or {}
+    if "embedding_provider" in metadata:
+        stored = {k: metadata.get(k) for k in active}
+    elif count:
+        stored = LEGACY_EMBEDDINGS
+    else:
+        return None
+    if stored == active:
+        return None
+    return (
+        f"The collection holds {stored['embedding_provider']}/{stored['embedding_model']} vectors "
+        f"({stored['embedding_dimensions']} dims) but the active provider is "
+        f"{active['embedding_provider']}/{active['embedding_model']} ({active['embedding_dimensions']} dims). "
+        "Switch EMBEDDING_PROVIDER back or re-embed the collection."
+    )
+
+
+# ─────────────────────────────────────────────────────────────────────
+# 2. Cache
+# ─────────────────────────────────────────────────────────────────────
+class EmbeddingCache:
+    """Two-tier (memory LRU + SQLite) store of float32 vectors."""
+
+    def __init__(self, path: str, max_bytes: int = EMBEDDING_CACHE_MAX_BYTES,
+                 lru_size: int = EMBEDDING_LRU_SIZE):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.lru_size = lru_size
+        self._lru: "OrderedDict[str, np.ndarray]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.counters = {"memory_hits": 0, "disk_hits": 0, "misses": 0, "evictions": 0}
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                """CREATE TABLE IF NOT EXISTS embeddings (
+                       key TEXT PRIMARY KEY,
+                       vector BLOB NOT NULL,
+                       last_used REAL NOT NULL)"""
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS embeddings_lru ON embeddings(last_used)")
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self.path, timeout=30)
+
+    def _remember(self, key: str, vector: np.ndarray):
+        self._lru[key] = vector
+        self._lru.move_to_end(key)
+        while len(self._lru) > self.lru_size:
+            self._lru.popitem(last=False)
+            self.counters["evictions"] += 1
+
+    def get_many(self, keys: List[str]) -> Dict[str, np.ndarray]:
+        found: Dict[str, np.ndarray] = {}
+        with self._lock:
+            for key in keys:
+                if key in self._lru:
+                    self._lru.move_to_end(key)
+                    found[key] = self._lru[key]
+            self.counters["memory_hits"] += len(found)
+
+        missing = [k for k in dict.fromkeys(keys) if k not in found]
+        if missing:
+            now = time.time()
+            with self._connect() as conn:
+                for i in range(0, len(missing), SQLITE_MAX_PARAMS):
+                    part = missing[i:i + SQLITE_MAX_PARAMS]
+                    rows = conn.execute(
+                        f"SELECT key, vector FROM embeddings WHERE key IN ({','.join('?' * len(part))})",
+                        part,
+                    ).fetchall()
+                    conn.executemany(
+                        "UPDATE embeddings SET last_used=? WHERE key=?", ((now, k) for k, _ in rows)
+                    )
+                    for key, blob in rows:
+                        found[key] = np.frombuffer(blob, dtype=np.float32)
+            with self._lock:
+                for key in missing:
+                    if key in found:
+                        self.counters["disk_hits"] += 1
+                        self._remember(key, found[key])
+                    else:
+                        self.counters["misses"] += 1
+        return found
+
+    def put_many(self, items: Dict[str, np.ndarray]):
+        if not items:
+            return
+        now = time.time()
+        with self._lock:
+            for key, vector in items.items():
+                self._remember(key, vector)
+        with self._lock, self._connect() as conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO embeddings(key, vector, last_used) VALUES (?, ?, ?)",
+                ((k, v.astype(np.float32).tobytes(), now) for k, v in items.items()),
+            )
+            self._evict(conn)
+
+    def _evict(self, conn: sqlite3.Connection):
+        total = conn.execute("SELECT COALESCE(SUM(LENGTH(vector)), 0) FROM embeddings").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        doomed = []
+        for key, size in conn.execute("SELECT key, LENGTH(vector) FROM embeddings ORDER BY last_used"):
+            if total <= self.max_bytes:
+                break
+            doomed.append((key,))
+            total -= size
+        conn.executemany("DELETE FROM embeddings WHERE key=?", doomed)
+        self.counters["evictions"] += len(doomed)
+
+    def stats(self) -> Dict:
+        with self._connect() as conn:
+            entries, size = conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(LENGTH(vector)), 0) FROM embeddings"
+            ).fetchone()
+        with self._lock:
+            stats = dict(self.counters, memory_entries=len(self._lru))
+        lookups = stats["memory_hits"] + stats["disk_hits"] + stats["misses"]
+        stats.update(
+            disk_entries=entries, bytes=size,
+            hit_rate=(stats["memory_hits"] + stats["disk_hits"]) / lookups if lookups else None,
+        )
+        return stats
+
+
+class CachedEmbeddingFunction(EmbeddingFunction):
+    """Chroma embedding function that consults an ``EmbeddingCache`` first.
+
+    The cache holds the provider's full-size vectors; with ``dimensions``
+    set, what Chroma stores and queries is the truncated, re-normalised
+    prefix (text-embedding-3 models are trained so prefixes stay useful).
+    """
+
+    def __init__(self, inner: EmbeddingProvider, cache: Optional[EmbeddingCache],
+                 dimensions: Optional[int] = None):
+        if dimensions and inner.dimensions and dimensions > inner.dimensions:
+            raise ValueError(f"EMBEDDING_DIMENSIONS={dimensions} exceeds {inner.model}'s {inner.dimensions}.")
+        self.inner = inner
+        self.model = f"{inner.provider}:{inner.model}:{inner.dimensions}"
+        self.cache = cache
+        self.dimensions = dimensions or inner.dimensions
+
+    def full(self, input) -> np.ndarray:
+        """Full-size float32 vectors, one row per text."""
+        texts = list(input)
+        if not texts:
+            return np.zeros((0, self.inner.dimensions or 0), dtype=np.float32)
+        if self.cache is None:
+            return np.asarray(self.inner(texts), dtype=np.float32)
+        keys = [embedding_key(self.model, t) for t in texts]
+        found = self.cache.get_many(keys)
+
+        todo = list(dict.fromkeys(k for k in keys if k not in found))
+        if todo:
+            text_of = dict(zip(keys, texts))
+            vectors = self.inner([text_of[k] for k in todo])
+            fresh = {k: np.asarray(v, dtype=np.float32) for k, v in zip(todo, vectors)}
+            self.cache.put_many(fresh)
+            found.update(fresh)
+        return np.stack([found[k] for k in keys])
+
+    def reduce(self, vectors: np.ndarray) -> np.ndarray:
+        return reduce_dimensions(vectors, self.dimensions)
+
+    def __call__(self, input):
+        return self.reduce(self.full(input)).tolist()
+
+    def describe(self) -> Dict:
+        return dict(self.inner.describe(), embedding_dimensions=self.dimensions)
+
+    # Collection configuration (chromadb >= 1.0) describes the wrapped
+    # function; reduced vectors have no Chroma-side equivalent.
+    def name(self):
+        return self.inner.name()
+
+    def get_config(self):
+        return self.inner.get_config()
+
+    def is_legacy(self):
+        return self.dimensions != self.inner.dimensions or self.inner.is_legacy()
+
+
+# ─────────────────────────────────────────────────────────────────────
+# 3. Reduced dimensions and int8 re-scoring sidecar
+# ─────────────────────────────────────────────────────────────────────
+def reduce_dimensions(vectors: np.ndarray, dimensions: Optional[int]) -> np.ndarray:
+    """First ``dimensions`` components of each row, L2 re-normalised."""
+    vectors = np.asarray(vectors, dtype=np.float32)
+    if not dimensions or vectors.shape[-1] <= dimensions:
+        return vectors
+    cut = vectors[..., :dimensions]
+    norms = np.linalg.norm(cut, axis=-1, keepdims=True)
+    return cut / np.where(norms == 0, 1, norms)
+
+
+def quantize_int8(vectors: np.ndarray):
+    """Symmetric per-vector scalar quantisation: ``v ≈ q * scale``."""
+    vectors = np.atleast_2d(np.asarray(vectors, dtype=np.float32))
+    scale = np.abs(vectors).max(axis=1) / 127
+    scale[scale == 0] = 1
+    q = np.clip(np.rint(vectors / scale[:, None]), -127, 127).astype(np.int8)
+    return q, scale.astype(np.float32)
+
+
+class QuantizedVectors:
+    """SQLite sidecar of int8 full-size document vectors, keyed by Chroma ID.
+
+    The HNSW index holds the (possibly reduced) float vectors; searches
+    over-fetch from it and re-score the shortlist against these.  At 3072
+    dimensions a row is ~3 KB instead of 12 KB of float32.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                """CREATE TABLE IF NOT EXISTS vectors (
+                       id TEXT PRIMARY KEY,
+                       scale REAL NOT NULL,
+                       vector BLOB NOT NULL)"""
+            )
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self.path, timeout=30)
+
+    def put_many(self, ids: List[str], vectors: np.ndarray):
+        if not len(ids):
+            return
+        q, scale = quantize_int8(vectors)
+        with self._connect() as conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO vectors(id, scale, vector) VALUES (?, ?, ?)",
+                ((i, float(s), row.tobytes()) for i, s, row in zip(ids, scale, q)),
+            )
+
+    def remove_many(self, ids: Iterable[str]):
+        with self._connect() as conn:
+            conn.executemany("DELETE FROM vectors WHERE id=?", [(i,) for i in ids])
+
+    def ids(self) -> set:
+        with self._connect() as conn:
+            return {r[0] for r in conn.execute("SELECT id FROM vectors")}
+
+    def score(self, query: np.ndarray, ids: List[str]) -> Dict[str, float]:
+        """Cosine similarity of ``query`` to each stored ID (missing IDs omitted)."""
+        rows = []
+        with self._connect() as conn:
+            for i in range(0, len(ids), SQLITE_MAX_PARAMS):
+                part = ids[i:i + SQLITE_MAX_PARAMS]
+                rows += conn.execute(
+                    f"SELECT id, scale, vector FROM vectors WHERE id IN ({','.join('?' * len(part))})",
+                    part,
+                ).fetchall()
+        if not rows:
+            return {}
+        matrix = np.stack([np.frombuffer(v, dtype=np.int8) for _, _, v in rows]).astype(np.float32)
+        matrix *= np.array([s for _, s, _ in rows], dtype=np.float32)[:, None]
+        query = np.asarray(query, dtype=np.float32)
+        sims = matrix @ query / (np.linalg.norm(matrix, axis=1) * np.linalg.norm(query) + 1e-12)
+        return {r[0]: float(s) for r, s in zip(rows, sims)}
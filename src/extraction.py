@@ -0,0 +1,346 @@
+# extraction.py – PDF text extraction for HireScope
+#
+# Kept free of Streamlit and OpenAI imports so it can run inside worker
+# processes spawned by the ingestion engine.  The PDF / OCR libraries are
+# imported by the extractors on first use, not at import time, so pages
+# that only need ExtractorStats or the upload form start without them
+# (see import_benchmark.py).
+
+import io
+import os
+import re
+import signal
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import Callable, Dict, List, Optional, Tuple
+
+# Pages whose text layer has fewer characters than this are treated as
+# scanned images and sent to OCR.
+MIN_PAGE_CHARS = int(os.getenv("OCR_MIN_PAGE_CHARS", "20"))
+OCR_WORKERS = int(os.getenv("OCR_WORKERS", "4"))
+OCR_DPI = 300
+
+# Adaptive rendering: aim for OCR_TARGET_PX pixels on the page's long
+# side (≈ A4 at 300 DPI), clamped to [OCR_MIN_DPI, OCR_DPI].  Oversized
+# scans are rendered coarser instead of producing huge bitmaps.
+OCR_TARGET_PX = 3500
+OCR_MIN_DPI = 150
+
+# Maximum number of rendered page images alive at once (rendering blocks
+# until the Tesseract pool has drained one).
+OCR_MAX_INFLIGHT = int(os.getenv("OCR_MAX_INFLIGHT", str(OCR_WORKERS + 1)))
+
+def _page_dpi(page) -> int:
+    long_side_in = max(page.rect.width, page.rect.height) / 72 or 1
+    return int(max(OCR_MIN_DPI, min(OCR_DPI, OCR_TARGET_PX / long_side_in)))
+
+def _render_page(page):
+    """Rasterise one fitz page to a greyscale PIL image for Tesseract."""
+    import fitz  # PyMuPDF
+    from PIL import Image
+    pix = page.get_pixmap(dpi=_page_dpi(page), colorspace=fitz.csGRAY, alpha=False)
+    return Image.frombytes("L", (pix.width, pix.height), pix.samples)
+
+def extract_pages_hybrid(pdf_bytes: bytes) -> List[str]:
+    """Per-page text: PyMuPDF text layer where present, OCR for the rest.
+
+    Only pages without a usable text layer are rasterised.  Pages are
+    rendered one at a time from the already open document and streamed to a
+    Tesseract thread pool, with at most ``OCR_MAX_INFLIGHT`` images held in
+    memory.  A page whose OCR fails keeps its (short) text layer.
+    """
+    import fitz  # PyMuPDF
+    with fitz.open(stream=pdf_bytes, filetype="pdf") as doc:
+        pages = [p.get_text() for p in doc]
+        scanned = [i for i, t in enumerate(pages) if len(t.strip()) < MIN_PAGE_CHARS]
+        if not scanned:
+            return pages
+
+        import pytesseract
+        slots = threading.BoundedSemaphore(max(1, OCR_MAX_INFLIGHT))
+
+        def ocr(i: int, img) -> str:
+            try:
+                return pytesseract.image_to_string(img)
+            except Exception:
+                return pages[i]
+            finally:
+                img.close()
+                slots.release()
+
+        futures = {}
+        with ThreadPoolExecutor(max_workers=max(1, min(OCR_WORKERS, len(scanned)))) as pool:
+            # fitz documents are not thread-safe, so rendering stays on this
+            # thread and only the finished bitmaps cross into the pool.
+            for i in scanned:
+                slots.acquire()
+                try:
+                    img = _render_page(doc[i])
+                except Exception:
+                    slots.release()
+                    continue
+                futures[i] = pool.submit(ocr, i, img)
+            for i, fut in futures.items():
+                pages[i] = fut.result()
+    return pages
+
+# ─────────────────────────────────────────────────────────────────────
+# Extractor registry
+# ─────────────────────────────────────────────────────────────────────
+# Registration order is the default chain order.  Timeouts are enforced
+# with SIGALRM, which only works on a process's main thread (true for the
+# ingestion worker processes); elsewhere extractors run unbounded.
+EXTRACTORS: Dict[str, Callable[[bytes], str]] = OrderedDict()
+EXTRACTOR_TIMEOUTS: Dict[str, float] = {}
+
+class ExtractorTimeout(Exception):
+    pass
+
+def register_extractor(name: str, timeout: float = 30):
+    def decorator(fn: Callable[[bytes], str]):
+        EXTRACTORS[name] = fn
+        EXTRACTOR_TIMEOUTS[name] = timeout
+        return fn
+    return decorator
+
+@contextmanager
+def _time_limit(seconds: float):
+    if (not seconds or not hasattr(signal, "setitimer")
+            or threading.current_thread() is not threading.main_thread()):
+        yield
+        return
+
+    def on_alarm(signum, frame):
+        raise ExtractorTimeout(f"timed out after {seconds:g}s")
+
+    previous = signal.signal(signal.SIGALRM, on_alarm)
+    signal.setitimer(signal.ITIMER_REAL, seconds)
+    try:
+        yield
+    finally:
+        signal.setitimer(signal.ITIMER_REAL, 0)
+        signal.signal(signal.SIGALRM, previous)
+
+# Method 1: PyMuPDF (fitz) text layer, OCR only for pages without one
+@register_extractor("pymupdf", timeout=180)
+def _extract_pymupdf(pdf_bytes: bytes) -> str:
+    return "\n".join(extract_pages_hybrid(pdf_bytes))
+
+# Method 2: pdfminer.six (can spin on malformed files, hence the short limit)
+@register_extractor("pdfminer", timeout=15)
+def _extract_pdfminer(pdf_bytes: bytes) -> str:
+    from pdfminer.high_level import extract_text
+    return extract_text(io.BytesIO(pdf_bytes))
+
+# Method 3: pdfplumber
+@register_extractor("pdfplumber", timeout=20)
+def _extract_pdfplumber(pdf_bytes: bytes) -> str:
+    import pdfplumber
+    with pdfplumber.open(io.BytesIO(pdf_bytes)) as pdf:
+        return "\n".join(p.extract_text() or "" for p in pdf.pages)
+
+# Method 4: PyPDF2
+@register_extractor("pypdf2", timeout=15)
+def _extract_pypdf2(pdf_bytes: bytes) -> str:
+    import PyPDF2
+    reader = PyPDF2.PdfReader(io.BytesIO(pdf_bytes))
+    return "".join(p.extract_text() or "" for p in reader.pages)
+
+# Method 5: OCR Fallback (Tesseract) for PDFs PyMuPDF cannot open;
+# everything else was already OCR'd page by page in Method 1.
+# Pages are converted one at a time to keep memory flat.
+@register_extractor("ocr", timeout=300)
+def _extract_ocr(pdf_bytes: bytes) -> str:
+    import pytesseract
+    from pdf2image import convert_from_bytes, pdfinfo_from_bytes
+    page_count = pdfinfo_from_bytes(pdf_bytes)["Pages"]
+    return "\n".join(
+        pytesseract.image_to_string(
+            convert_from_bytes(pdf_bytes, dpi=OCR_DPI, first_page=n, last_page=n)[0]
+        )
+        for n in range(1, page_count + 1)
+    )
+
+# ─────────────────────────────────────────────────────────────────────
+# Cheap PDF fingerprint used to bucket extractor statistics
+# ─────────────────────────────────────────────────────────────────────
+def pdf_fingerprint(pdf_bytes: bytes) -> Dict:
+    """Producer family, page count and share of pages carrying images."""
+    import fitz  # PyMuPDF
+    try:
+        with fitz.open(stream=pdf_bytes, filetype="pdf") as doc:
+            producer = (doc.metadata or {}).get("producer") or ""
+            pages = doc.page_count
+            with_images = sum(1 for p in doc if p.get_images(full=False))
+    except Exception:
+        return {"producer": "", "pages": 0, "image_ratio": 0.0, "bucket": "unreadable"}
+
+    image_ratio = with_images / pages if pages else 0.0
+    family = (re.findall(r"[a-z]+", producer.lower()) or ["unknown"])[0]
+    size = "1" if pages <= 1 else "2-3" if pages <= 3 else "4-10" if pages <= 10 else "11+"
+    images = "text" if image_ratio == 0 else "scanned" if image_ratio >= 0.8 else "mixed"
+    return {
+        "producer": producer,
+        "pages": pages,
+        "image_ratio": round(image_ratio, 2),
+        "bucket": f"{family}|{size}|{images}",
+    }
+
+# ─────────────────────────────────────────────────────────────────────
+# Adaptive ordering from recorded statistics
+# ─────────────────────────────────────────────────────────────────────
+# A method needs RANK_MIN_RUNS samples in a bucket before it is reordered
+# by expected cost (mean latency ÷ success rate); methods that have never
+# succeeded go last.  After SKIP_MIN_RUNS runs without a single success a
+# method is skipped, except on every EXPLORE_EVERY-th PDF of its bucket so
+# a changed extractor can still earn its place back.  That count is the
+# bucket's recorded attempts plus the PDFs this process has planned since,
+# so it keeps advancing while the method itself is not run.
+RANK_MIN_RUNS = 5
+SKIP_MIN_RUNS = 10
+EXPLORE_EVERY = 20
+
+_planned: Dict[str, int] = {}    # bucket -> PDFs planned in this process
+
+# snapshot[bucket][method] -> {"runs", "successes", "failures", "timeouts",
+#                               "seconds", "chars"}
+StatsSnapshot = Dict[str, Dict[str, Dict[str, float]]]
+
+def plan_extractors(bucket: str, snapshot: Optional[StatsSnapshot] = None) -> List[str]:
+    """Extractor names to try, in order, for a PDF in ``bucket``."""
+    default = list(EXTRACTORS)
+    stats = (snapshot or {}).get(bucket, {})
+    _planned[bucket] = _planned.get(bucket, 0) + 1
+    explore = (sum(s["runs"] for s in stats.values()) + _planned[bucket]) % EXPLORE_EVERY == 0
+
+    def keep(name: str) -> bool:
+        s = stats.get(name)
+        if not s or s["runs"] < SKIP_MIN_RUNS or s["successes"]:
+            return True
+        return explore
+
+    def rank(name: str):
+        s = stats.get(name)
+        if not s or s["runs"] < RANK_MIN_RUNS:
+            return (1, default.index(name))
+        if not s["successes"]:
+            return (2, default.index(name))
+        success_rate = (s["successes"] + 1) / (s["runs"] + 2)
+        return (0, (s["seconds"] / s["runs"]) / success_rate)
+
+    plan = sorted((n for n in default if keep(n)), key=rank)
+    return plan or default
+
+# ─────────────────────────────────────────────────────────────────────
+# Instrumented chain
+# ─────────────────────────────────────────────────────────────────────
+def extract_with_report(pdf_bytes: bytes, snapshot: Optional[StatsSnapshot] = None) -> Tuple[str, Dict]:
+    """Run the extractor chain and return ``(text, report)``.
+
+    ``report`` holds the fingerprint plus one attempt per method tried,
+    each with ``method``, ``seconds``, ``chars`` and ``status`` (one of
+    ``ok``, ``empty``, ``error``, ``timeout``).  Feed it to
+    ``ExtractorStats.record``.
+    """
+    fingerprint = pdf_fingerprint(pdf_bytes)
+    report = {"fingerprint": fingerprint, "attempts": []}
+    for name in plan_extractors(fingerprint["bucket"], snapshot):
+        text, status = "", "ok"
+        start = time.perf_counter()
+        try:
+            with _time_limit(EXTRACTOR_TIMEOUTS[name]):
+                text = EXTRACTORS[name](pdf_bytes) or ""
+        except ExtractorTimeout:
+            status = "timeout"
+        except Exception:
+            status = "error"
+        chars = len(text.strip())
+        if status == "ok" and not chars:
+            status = "empty"
+        report["attempts"].append({
+            "method": name,
+            "seconds": round(time.perf_counter() - start, 4),
+            "chars": chars,
+            "status": status,
+        })
+        if chars:
+            return text, report
+    return "", report
+
+def extract_all_text(pdf_bytes: bytes) -> str:
+    """Chain-tries multiple PDF text extractors, including an OCR fallback."""
+    return extract_with_report(pdf_bytes)[0]
+
+# ─────────────────────────────────────────────────────────────────────
+# Persistent per-method / per-bucket statistics
+# ─────────────────────────────────────────────────────────────────────
+class ExtractorStats:
+    """SQLite-backed extractor counters, aggregated per fingerprint bucket.
+
+    Every attempt is counted under its bucket and under the ``"*"`` bucket,
+    which holds the overall per-method totals.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with self._connect() as conn:
+            conn.execute(
+                """CREATE TABLE IF NOT EXISTS extractor_stats (
+                       bucket TEXT NOT NULL,
+                       method TEXT NOT NULL,
+                       runs INTEGER NOT NULL DEFAULT 0,
+                       successes INTEGER NOT NULL DEFAULT 0,
+                       failures INTEGER NOT NULL DEFAULT 0,
+                       timeouts INTEGER NOT NULL DEFAULT 0,
+                       seconds REAL NOT NULL DEFAULT 0,
+                       chars INTEGER NOT NULL DEFAULT 0,
+                       PRIMARY KEY (bucket, method))"""
+            )
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self.path, timeout=30)
+
+    def record(self, report: Dict):
+        bucket = report["fingerprint"]["bucket"]
+        rows = []
+        for a in report["attempts"]:
+            for b in (bucket, "*"):
+                rows.append((
+                    b, a["method"],
+                    int(a["status"] == "ok"),
+                    int(a["status"] == "error"),
+                    int(a["status"] == "timeout"),
+                    a["seconds"], a["chars"],
+                ))
+        with self._connect() as conn:
+            conn.executemany(
+                """INSERT INTO extractor_stats(bucket, method, runs, successes, failures, timeouts, seconds, chars)
+                   VALUES (?, ?, 1, ?, ?, ?, ?, ?)
+                   ON CONFLICT(bucket, method) DO UPDATE SET
+                       runs = runs + 1,
+                       successes = successes + excluded.successes,
+                       failures = failures + excluded.failures,
+                       timeouts = timeouts + excluded.timeouts,
+                       seconds = seconds + excluded.seconds,
+                       chars = chars + excluded.chars""",
+                rows,
+            )
+
+    def snapshot(self) -> StatsSnapshot:
+        with self._connect() as conn:
+            rows = conn.execute(
+                "SELECT bucket, method, runs, successes, failures, timeouts, seconds, chars "
+                "FROM extractor_stats"
+            ).fetchall()
+        snap: StatsSnapshot = {}
+        for bucket, method, runs, successes, failures, timeouts, seconds, chars in rows:
+            snap.setdefault(bucket, {})[method] = {
+                "runs": runs, "successes": successes, "failures": failures,
+                "timeouts": timeouts, "seconds": seconds, "chars": chars,
+            }
+        return snap
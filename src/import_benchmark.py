@@ -0,0 +1,104 @@
+# import_benchmark.py – cold-start import time of HireScope modules
+#
+# Runs each target in a fresh interpreter with `python -X importtime`
+# (what a new Streamlit worker pays before the first render), takes the
+# median over --repeat runs and lists the slowest modules it pulled in.
+# Times are net of a bare interpreter start.
+#
+#   upload page   – `import utils`, everything 1_HR_Upload.py needs to draw
+#                   the empty form
+#   extraction    – the extraction module alone
+#   pdf backends  – the PDF / OCR libraries the extractors load on first use
+#
+# Usage (from the repository root):
+#   python src/import_benchmark.py --repeat 5
+#   python src/import_benchmark.py --save before.json
+#   python src/import_benchmark.py --compare before.json
+
+import argparse
+import json
+import os
+import re
+import statistics
+import subprocess
+import sys
+from typing import Dict, Optional, Tuple
+
+SRC_DIR = os.path.dirname(os.path.abspath(__file__))
+
+TARGETS = {
+    "upload page": "import utils",
+    "extraction": "import extraction",
+    "pdf backends": "import fitz, pdfplumber, PyPDF2, pdfminer.high_level, pdf2image, pytesseract, PIL.Image",
+}
+
+_LINE = re.compile(r"import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)")
+
+
+def import_profile(statement: str) -> Tuple[float, Dict[str, float]]:
+    """``(total_ms, {module: cumulative_ms})`` for one fresh interpreter."""
+    env = dict(os.environ, PYTHONPATH=SRC_DIR, PYTHONDONTWRITEBYTECODE="1")
+    env.setdefault("OPENAI_API_KEY", "sk-import-benchmark")   # utils checks it at import
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", statement],
+        cwd=os.path.dirname(SRC_DIR), env=env, capture_output=True, text=True,
+    )
+    if proc.returncode:
+        raise RuntimeError(f"`{statement}` failed:\n{proc.stderr.strip().splitlines()[-1]}")
+    total, modules = 0.0, {}
+    for match in _LINE.finditer(proc.stderr):
+        cumulative_ms = int(match.group(2)) / 1000
+        modules[match.group(4)] = cumulative_ms
+        if len(match.group(3)) <= 1:            # top-level import
+            total += cumulative_ms
+    return total, modules
+
+
+def measure(statement: str, repeat: int, baseline: Optional[Dict] = None) -> Dict:
+    """Median total over ``repeat`` runs; modules already loaded by ``baseline`` are left out."""
+    runs = [import_profile(statement) for _ in range(repeat)]
+    skip = {m for m, _ in baseline["slowest"]} if baseline else set()
+    slowest = max(runs, key=lambda r: r[0])[1]
+    return {
+        "ms": statistics.median(r[0] for r in runs) - (baseline["ms"] if baseline else 0.0),
+        "slowest": sorted(((m, ms) for m, ms in slowest.items() if m not in skip), key=lambda kv: -kv[1]),
+    }
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Cold-start import time of HireScope modules.")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--top", type=int, default=8, help="slowest modules listed per target")
+    parser.add_argument("--save", help="write the results to this JSON file")
+    parser.add_argument("--compare", help="JSON file from an earlier --save to diff against")
+    args = parser.parse_args(argv)
+
+    baseline = measure("pass", args.repeat)
+    results = {}
+    for name, statement in TARGETS.items():
+        try:
+            results[name] = measure(statement, args.repeat, baseline)
+        except RuntimeError as e:
+            print(f"{name}: {e}", file=sys.stderr)
+    previous = {}
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            previous = json.load(f)
+
+    print(f"median of {args.repeat} fresh interpreters, net of {baseline['ms']:.0f} ms interpreter start\n")
+    for name, r in results.items():
+        delta = ""
+        if name in previous:
+            delta = f"  ({r['ms'] - previous[name]['ms']:+.0f} ms vs {previous[name]['ms']:.0f})"
+        print(f"{name:<14} {r['ms']:>8.0f} ms{delta}")
+        for module, ms in r["slowest"][:args.top]:
+            print(f"    {ms:>8.1f} ms  {module}")
+
+    if args.save:
+        with open(args.save, "w", encoding="utf-8") as f:
+            json.dump({n: {"ms": r["ms"], "slowest": r["slowest"][:50]} for n, r in results.items()}, f, indent=2)
+    return 0 if len(results) == len(TARGETS) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,171 @@
+# ingest.py – concurrent résumé ingestion engine for HireScope
+#
+# Text extraction is CPU-bound (PDF parsing, OCR) and runs in a process
+# pool; summarisation is network-bound (GPT-4o) and runs in a bounded
+# thread pool.  Each file flows into the summary pool as soon as its text
+# is ready, so the two stages overlap across the whole batch.
+
+import os
+from concurrent.futures import (
+    FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, wait,
+)
+from typing import Callable, Dict, List, Optional, Tuple
+
+from cache import IngestCache, sha256_hex
+from extraction import ExtractorStats, extract_with_report
+
+# ─────────────────────────────────────────────────────────────────────
+# 1. Pool sizes (override through environment variables)
+# ─────────────────────────────────────────────────────────────────────
+EXTRACT_WORKERS = int(os.getenv("INGEST_EXTRACT_WORKERS", os.cpu_count() or 2))
+SUMMARY_WORKERS = int(os.getenv("INGEST_SUMMARY_WORKERS", "8"))
+
+# Upper bound on PDFs handed to the process pool at once, so a 500-file
+# batch is not pickled into worker pipes all up front.
+EXTRACT_WINDOW = EXTRACT_WORKERS * 2
+
+# on_progress(done, total, filename, stage) with stage in
+# {"cached", "extracted", "summarized", "failed"}; always called on the
+# caller thread.
+ProgressFn = Callable[[int, int, str, str], None]
+
+
+# ─────────────────────────────────────────────────────────────────────
+# 2. Batch runner
+# ─────────────────────────────────────────────────────────────────────
+def ingest_batch(
+    files: List[Tuple[str, bytes]],
+    summarize: Optional[Callable[[str], str]],
+    on_progress: Optional[ProgressFn] = None,
+    extract_workers: int = EXTRACT_WORKERS,
+    summary_workers: int = SUMMARY_WORKERS,
+    cache: Optional[IngestCache] = None,
+    fingerprint: str = "",
+    extractor_stats: Optional[ExtractorStats] = None,
+    on_result: Optional[Callable[[int, Dict], None]] = None,
+) -> Tuple[List[Dict], List[Dict]]:
+    """Extract and summarise ``(filename, pdf_bytes)`` pairs concurrently.
+
+    Returns ``(results, errors)``: results are dicts with ``filename``,
+    ``raw``, ``summary`` and ``cached``; errors are dicts with ``filename``
+    and ``error``.  Both lists follow the input order.
+
+    With a ``cache``, files whose text and summary (for this prompt/model
+    ``fingerprint``) are already stored skip both pools entirely.
+
+    With ``extractor_stats``, every extraction's per-method timings are
+    recorded, and the snapshot taken at batch start steers the extractor
+    order inside the workers.
+
+    ``on_result(index, result)`` fires on the caller thread as soon as a
+    file's summary is available, so callers can checkpoint incrementally.
+
+    With ``summarize=None`` the batch is extraction-only (for offline batch
+    summarisation): files finish with ``summary`` set to ``None`` unless a
+    cached summary exists.
+    """
+    total = len(files)
+    results: Dict[int, Dict] = {}
+    errors: Dict[int, Dict] = {}
+    done = 0
+
+    def report(idx: int, stage: str):
+        if on_progress:
+            on_progress(done, total, files[idx][0], stage)
+
+    def fail(idx: int, message: str):
+        nonlocal done
+        errors[idx] = {"filename": files[idx][0], "error": message}
+        done += 1
+        report(idx, "failed")
+
+    if not files:
+        return [], []
+
+    hashes = [sha256_hex(data) for _, data in files] if cache else []
+    snapshot = extractor_stats.snapshot() if extractor_stats else None
+
+    with ProcessPoolExecutor(max_workers=max(1, extract_workers)) as extract_pool, \
+         ThreadPoolExecutor(max_workers=max(1, summary_workers)) as summary_pool:
+        pending = {}          # future -> (stage, idx)
+        queued = iter(range(total))
+
+        def start_summary(idx: int, raw: str):
+            nonlocal done
+            results[idx] = {"filename": files[idx][0], "raw": raw, "cached": False}
+            if summarize is None:
+                results[idx]["summary"] = None
+                done += 1
+                report(idx, "extracted")
+                if on_result:
+                    on_result(idx, results[idx])
+                return
+            pending[summary_pool.submit(summarize, raw)] = ("summary", idx)
+            report(idx, "extracted")
+
+        def from_cache(idx: int) -> bool:
+            """Stage or fast-track ``idx`` from the cache; True if handled."""
+            nonlocal done
+            raw = cache.get_text(hashes[idx])
+            if raw is None:
+                return False
+            summary = cache.get_summary(hashes[idx], fingerprint)
+            if summary is None:
+                start_summary(idx, raw)
+                return True
+            results[idx] = {"filename": files[idx][0], "raw": raw, "summary": summary, "cached": True}
+            done += 1
+            report(idx, "cached")
+            if on_result:
+                on_result(idx, results[idx])
+            return True
+
+        def feed_extractors():
+            in_flight = sum(1 for stage, _ in pending.values() if stage == "extract")
+            while in_flight < EXTRACT_WINDOW:
+                idx = next(queued, None)
+                if idx is None:
+                    return
+                if cache and from_cache(idx):
+                    continue
+                fut = extract_pool.submit(extract_with_report, files[idx][1], snapshot)
+                pending[fut] = ("extract", idx)
+                in_flight += 1
+
+        feed_extractors()
+        while pending:
+            finished, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for fut in finished:
+                stage, idx = pending.pop(fut)
+                try:
+                    value = fut.result()
+                except Exception as e:
+                    results.pop(idx, None)
+                    fail(idx, str(e))
+                    continue
+
+                if stage == "extract":
+                    text, extract_report = value
+                    if extractor_stats:
+                        extractor_stats.record(extract_report)
+                    if not text or not text.strip():
+                        fail(idx, "No text could be extracted.")
+                        continue
+                    if cache:
+                        cache.put_text(hashes[idx], text)
+                    start_summary(idx, text)
+                else:
+                    if not value:
+                        results.pop(idx)
+                        fail(idx, "AI summary was empty.")
+                        continue
+                    results[idx]["summary"] = value
+                    if cache:
+                        cache.put_summary(hashes[idx], fingerprint, value)
+                    done += 1
+                    report(idx, "summarized")
+                    if on_result:
+                        on_result(idx, results[idx])
+            feed_extractors()
+
+    return [results[i] for i in sorted(results)], [errors[i] for i in sorted(errors)]
@@ -0,0 +1,87 @@
+# intent.py – local intent router for recruiter chat messages
+#
+# Decides whether a message is about candidates / hiring without a model
+# call: weighted keyword and pattern matches, well under a millisecond.
+#
+#   recruitment  – score ≥ INTENT_MARGIN: search and answer
+#   off_topic    – score ≤ −INTENT_MARGIN: refuse without searching
+#   uncertain    – anything in between; the chat page answers it when
+#                  retrieval found a close match (INTENT_MATCH_DISTANCE)
+#                  and only otherwise escalates to the LLM classifier
+#
+# Positive evidence is recruiting vocabulary (candidate, résumé, hire,
+# years of experience, role titles, common skills); negative evidence is
+# requests that are plainly something else (weather, recipes, poems,
+# trivia, prices).
+
+import os
+import re
+from typing import List, NamedTuple, Optional, Pattern, Sequence, Tuple
+
+INTENT_MARGIN = float(os.getenv("INTENT_MARGIN", "2"))
+# Squared L2 between unit vectors, i.e. 2 - 2·cos: 1.0 is cosine ≥ 0.5.
+INTENT_MATCH_DISTANCE = float(os.getenv("INTENT_MATCH_DISTANCE", "1.0"))
+
+
+def _rule(pattern: str, weight: float) -> Tuple[Pattern, float]:
+    return re.compile(pattern, re.I), weight
+
+
+RECRUITING_RULES: List[Tuple[Pattern, float]] = [
+    _rule(r"\b(candidates?|applicants?|r[eé]sum[eé]s?|cvs?|profiles?|shortlist\w*)\b", 3),
+    _rule(r"\b(hir(e|es|ed|ing)|recruit\w*|interview\w*|onboard\w*|headcount|vacanc\w+|openings?)\b", 3),
+    _rule(r"\b(notice period|ctc|salary|expected pay|relocat\w+|joining)\b", 2),
+    _rule(r"\b(experience[ds]?|skill(s|ed|set)?|qualifi\w+|certifi\w+|degree|graduat\w+|fresher|intern\w*)\b", 2),
+    _rule(r"\b\d+\s*\+?\s*(years?|yrs?)\b", 2),
+    _rule(r"\b(developers?|engineers?|analysts?|architects?|designers?|scientists?|managers?|consultants?"
+          r"|administrators?|testers?|leads?|specialists?|accountants?|recruiters?)\b", 2),
+    _rule(r"\b(who|which|anyone|someone|people)\b.*\b(knows?|has|have|worked|work(s|ing)? (at|on|with)|can)\b", 1),
+    _rule(r"\b(python|java(script)?|typescript|react|angular|node|aws|azure|gcp|docker|kubernetes|sql|sap"
+          r"|salesforce|devops|ml|nlp|excel|tableau|power ?bi|spring|django|golang|rust|kotlin|swift)\b|c\+\+|c#|\.net", 1),
+    _rule(r"\b(jobs?|roles?|positions?|employers?|company|companies|organi[sz]ations?)\b", 1),
+    _rule(r"\b(last|current|previous|recent) (job|role|company|employer)\b", 1),
+    _rule(r"\b(compare|rank|best fit|suitable|match(es|ing)?|worked at|currently at|based in|located in)\b", 1),
+]
+
+OFF_TOPIC_RULES: List[Tuple[Pattern, float]] = [
+    _rule(r"\b(weather|forecast|temperature outside|rain(ing)? today)\b", 4),
+    _rule(r"\b(recipes?|cook(ing)?|bake|ingredients?)\b", 4),
+    _rule(r"\b(jokes?|poems?|songs?|lyrics|haiku|riddle|story about)\b", 4),
+    _rule(r"\b(capital of|president of|prime minister|who won|world cup|score of the)\b", 4),
+    _rule(r"\b(stock|share|bitcoin|crypto|gold) prices?\b|\bexchange rate\b", 4),
+    _rule(r"\b(translate|meaning of the word|synonym for)\b", 3),
+    _rule(r"\b(movies?|tv shows?|netflix|horoscope|lottery)\b", 3),
+]
+
+
+class Route(NamedTuple):
+    intent: str               # "recruitment" | "off_topic" | "uncertain"
+    score: float
+    matched: Tuple[str, ...]  # the text each rule matched, for debugging
+
+
+def route(query: str, margin: float = INTENT_MARGIN) -> Route:
+    """Classify one chat message from its wording alone."""
+    score, matched = 0.0, []
+    for rules, sign in ((RECRUITING_RULES, 1), (OFF_TOPIC_RULES, -1)):
+        for pattern, weight in rules:
+            m = pattern.search(query)
+            if m:
+                score += sign * weight
+                matched.append(m.group(0))
+    if score >= margin:
+        intent = "recruitment"
+    elif score <= -margin:
+        intent = "off_topic"
+    else:
+        intent = "uncertain"
+    return Route(intent, score, tuple(matched))
+
+
+def retrieval_confirms(distances: Sequence[Optional[float]], max_distance: float = INTENT_MATCH_DISTANCE) -> bool:
+    """Whether the vector leg found a résumé close enough to the message.
+
+    Vector search always returns neighbours, so hits alone say nothing;
+    keyword-only hits (distance ``None``) don't count either.
+    """
+    return any(d is not None and d <= max_distance for d in distances)
@@ -0,0 +1,141 @@
+# lexical.py – SQLite FTS5 keyword index and rank fusion for HireScope
+#
+# Vector search is weak on exact tokens such as "CKA", "SAP FICO" or
+# "C#".  This index holds the summary and extracted text of every stored
+# candidate in an FTS5 table, ranked with BM25, and is kept in sync with
+# the `resumes` collection by save_candidates / delete_candidate_vectors.
+# search_candidates runs it next to the vector query and merges the two
+# rankings with reciprocal-rank fusion.
+
+import os
+import re
+import sqlite3
+from typing import Dict, Iterable, List, Sequence, Tuple
+
+RRF_K = int(os.getenv("RRF_K", "60"))
+
+# Words that carry no skill signal in recruiter questions.
+STOPWORDS = {
+    "a", "an", "and", "any", "are", "as", "at", "be", "by", "can", "candidate",
+    "candidates", "do", "does", "experience", "experienced", "find", "for", "from",
+    "has", "have", "in", "is", "know", "knows", "me", "of", "on", "or", "people",
+    "profile", "profiles", "resume", "resumes", "show", "someone", "that", "the",
+    "their", "to", "who", "with", "worked", "working", "year", "years",
+}
+
+
+def query_terms(text: str) -> List[str]:
+    """Lower-cased search terms; ``+`` and ``#`` stay part of a token (C++, C#)."""
+    tokens = re.findall(r"[\w+#]+", text.lower())
+    return list(dict.fromkeys(t for t in tokens if t not in STOPWORDS))
+
+
+def phrase_query(text: str) -> str:
+    """FTS5 phrase for every token of ``text``, the last one as a prefix.
+
+    The Profiles keyword filter used to be a substring test; a phrase
+    keeps that meaning ("SAP FICO" needs both words, in order, and "java"
+    still finds "javascript"), stopwords included.
+    """
+    tokens = re.findall(r"[\w+#]+", text.lower())
+    return '"' + " ".join(tokens) + '"*' if tokens else ""
+
+
+class LexicalIndex:
+    """FTS5 table of candidate text searched with BM25.
+
+    ``doc_ids`` maps each candidate to its FTS rowid, so replacing or
+    removing a candidate is an index lookup rather than a scan of every
+    document.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS doc_ids ("
+                "id INTEGER PRIMARY KEY, candidate_id TEXT NOT NULL UNIQUE)"
+            )
+            conn.execute(
+                "CREATE VIRTUAL TABLE IF NOT EXISTS bodies USING fts5("
+                "body, tokenize=\"unicode61 tokenchars '+#'\")"
+            )
+            self._migrate(conn)
+
+    @staticmethod
+    def _migrate(conn: sqlite3.Connection):
+        # Earlier versions kept candidate_id as an UNINDEXED column of `docs`.
+        if not conn.execute("SELECT 1 FROM sqlite_master WHERE name='docs'").fetchone():
+            return
+        conn.execute(
+            "INSERT OR REPLACE INTO doc_ids(id, candidate_id) SELECT rowid, candidate_id FROM docs"
+        )
+        conn.execute(
+            "INSERT INTO bodies(rowid, body) SELECT rowid, body FROM docs WHERE rowid IN (SELECT id FROM doc_ids)"
+        )
+        conn.execute("DROP TABLE docs")
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self.path, timeout=30)
+
+    @staticmethod
+    def _delete(conn: sqlite3.Connection, candidate_ids: Sequence[str]):
+        rowids = []
+        for i in range(0, len(candidate_ids), 500):
+            part = candidate_ids[i:i + 500]
+            rowids += conn.execute(
+                f"SELECT id FROM doc_ids WHERE candidate_id IN ({','.join('?' * len(part))})", part
+            ).fetchall()
+        conn.executemany("DELETE FROM bodies WHERE rowid=?", rowids)
+        conn.executemany("DELETE FROM doc_ids WHERE id=?", rowids)
+
+    def add_many(self, entries: Iterable[Tuple[str, str]]):
+        """Index ``(candidate_id, text)`` pairs, replacing earlier text."""
+        entries = dict(entries)   # the last text for a repeated ID wins
+        if not entries:
+            return
+        with self._connect() as conn:
+            self._delete(conn, list(entries))
+            for cid, text in entries.items():
+                rowid = conn.execute("INSERT INTO doc_ids(candidate_id) VALUES (?)", (cid,)).lastrowid
+                conn.execute("INSERT INTO bodies(rowid, body) VALUES (?, ?)", (rowid, text))
+
+    def remove_many(self, candidate_ids: Iterable[str]):
+        with self._connect() as conn:
+            self._delete(conn, list(candidate_ids))
+
+    def indexed_ids(self) -> set:
+        with self._connect() as conn:
+            return {r[0] for r in conn.execute("SELECT candidate_id FROM doc_ids")}
+
+    def search(self, text: str, limit: int, phrase: bool = False) -> List[Tuple[str, float]]:
+        """``[(candidate_id, bm25)]`` best first (lower bm25 is better).
+
+        By default any query term may match (chat retrieval, fused with
+        the vector ranking); ``phrase=True`` needs the whole text, see
+        ``phrase_query``.
+        """
+        if phrase:
+            match = phrase_query(text)
+        else:
+            match = " OR ".join('"' + t.replace('"', '""') + '"' for t in query_terms(text))
+        if not match:
+            return []
+        with self._connect() as conn:
+            return conn.execute(
+                "SELECT doc_ids.candidate_id, bm25(bodies) AS score "
+                "FROM bodies JOIN doc_ids ON doc_ids.id = bodies.rowid "
+                "WHERE bodies MATCH ? ORDER BY score LIMIT ?",
+                (match, limit),
+            ).fetchall()
+
+
+def reciprocal_rank_fusion(rankings: Sequence[Sequence[str]], k: int = RRF_K) -> List[Tuple[str, float]]:
+    """Merge ranked ID lists: ``score(id) = Σ 1 / (k + rank)``, best first."""
+    scores: Dict[str, float] = {}
+    for ranking in rankings:
+        for rank, cid in enumerate(ranking, start=1):
+            scores[cid] = scores.get(cid, 0.0) + 1.0 / (k + rank)
+    return sorted(scores.items(), key=lambda kv: -kv[1])
@@ -0,0 +1,291 @@
+# llm.py – rate-limit-aware OpenAI request scheduler for HireScope
+#
+# One scheduler per process, shared by résumé summarisation, query
+# classification and chat.  It runs on a private asyncio loop in a daemon
+# thread, so synchronous callers (Streamlit scripts, ingest worker threads)
+# and async callers draw from the same limits:
+#
+#   • token buckets for requests/minute and tokens/minute,
+#   • a cap on in-flight requests (a streamed answer keeps its slot until
+#     it has been read to the end),
+#   • jittered exponential retry on 429 / 5xx / timeouts, honouring
+#     Retry-After (a 429 pauses every caller, not just the one that hit it).
+#
+# Point OPENAI_BASE_URL at a local fake server to exercise it offline
+# (tests/test_llm.py does so).
+
+import asyncio
+import email.utils
+import os
+import queue
+import random
+import threading
+import time
+from typing import AsyncIterator, Dict, Iterator, List, Optional
+
+import openai
+
+OPENAI_RPM = float(os.getenv("OPENAI_RPM", "500"))
+OPENAI_TPM = float(os.getenv("OPENAI_TPM", "300000"))
+OPENAI_MAX_CONCURRENCY = int(os.getenv("OPENAI_MAX_CONCURRENCY", "16"))
+OPENAI_MAX_RETRIES = int(os.getenv("OPENAI_MAX_RETRIES", "6"))
+OPENAI_TIMEOUT = float(os.getenv("OPENAI_TIMEOUT", "120"))
+
+BACKOFF_BASE = 1.0
+BACKOFF_CAP = 60.0
+
+RETRYABLE = (
+    openai.RateLimitError,
+    openai.APITimeoutError,
+    openai.APIConnectionError,
+    openai.InternalServerError,
+)
+
+
+def estimate_tokens(messages: List[Dict], max_tokens: Optional[int] = None) -> int:
+    """Rough prompt + completion token estimate (≈4 characters per token)."""
+    chars = sum(len(str(m.get("content") or "")) for m in messages)
+    return chars // 4 + 8 * len(messages) + (max_tokens or 512)
+
+
+def retry_after_seconds(error: Exception) -> Optional[float]:
+    """Seconds requested by a Retry-After / retry-after-ms header, if any."""
+    response = getattr(error, "response", None)
+    headers = getattr(response, "headers", None) or {}
+    ms = headers.get("retry-after-ms")
+    if ms:
+        try:
+            return float(ms) / 1000
+        except ValueError:
+            pass
+    value = headers.get("retry-after")
+    if not value:
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        parsed = email.utils.parsedate_to_datetime(value)
+        return max(0.0, parsed.timestamp() - time.time()) if parsed else None
+
+
+class TokenBucket:
+    """Continuous-refill bucket holding ``per_minute`` units at most."""
+
+    def __init__(self, per_minute: float):
+        self.capacity = per_minute
+        self.rate = per_minute / 60.0
+        self.tokens = per_minute
+        self.updated = time.monotonic()
+        self._lock: Optional[asyncio.Lock] = None
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    async def acquire(self, amount: float):
+        amount = min(amount, self.capacity)
+        if self._lock is None:  # created lazily so it binds to the scheduler loop
+            self._lock = asyncio.Lock()
+        async with self._lock:
+            while True:
+                self._refill()
+                if self.tokens >= amount:
+                    self.tokens -= amount
+                    return
+                await asyncio.sleep((amount - self.tokens) / self.rate)
+
+    def refund(self, amount: float):
+        self._refill()
+        self.tokens = min(self.capacity, self.tokens + amount)
+
+
+class RequestScheduler:
+    """Async OpenAI chat scheduler with RPM/TPM buckets and retries."""
+
+    def __init__(
+        self,
+        rpm: float = OPENAI_RPM,
+        tpm: float = OPENAI_TPM,
+        max_concurrency: int = OPENAI_MAX_CONCURRENCY,
+        max_retries: int = OPENAI_MAX_RETRIES,
+        client: Optional[openai.AsyncOpenAI] = None,
+        base_url: Optional[str] = None,
+    ):
+        # SDK-level retries are disabled; this class owns the retry policy.
+        self.client = client or openai.AsyncOpenAI(
+            api_key=openai.api_key or os.getenv("OPENAI_API_KEY"),
+            base_url=base_url or os.getenv("OPENAI_BASE_URL") or None,
+            max_retries=0,
+            timeout=OPENAI_TIMEOUT,
+        )
+        self.requests = TokenBucket(rpm)
+        self.tokens = TokenBucket(tpm)
+        self.max_concurrency = max_concurrency
+        self.max_retries = max_retries
+        self.stats = {
+            "requests": 0, "retries": 0, "rate_limited": 0, "failures": 0, "in_flight": 0, "peak_in_flight": 0,
+        }
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._paused_until = 0.0
+
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(
+            target=self._loop.run_forever, name="openai-scheduler", daemon=True
+        )
+        self._thread.start()
+
+    # ── async API ────────────────────────────────────────────────────
+    async def achat(self, messages: List[Dict], model: str = "gpt-4o", **kwargs):
+        """``chat.completions.create`` under the scheduler's limits."""
+        return await self._request(messages, model, False, **kwargs)
+
+    async def astream(self, messages: List[Dict], model: str = "gpt-4o", **kwargs) -> AsyncIterator[str]:
+        """Content deltas of a streamed completion.
+
+        Retries cover opening the stream; once tokens flow, an error is
+        raised to the caller rather than restarting the answer.  The stream
+        holds its concurrency slot until it is consumed or closed.
+        """
+        stream = await self._request(
+            messages, model, True, stream=True, stream_options={"include_usage": True}, **kwargs
+        )
+        estimate = estimate_tokens(messages, kwargs.get("max_tokens"))
+        try:
+            async for chunk in stream:
+                if chunk.choices and chunk.choices[0].delta.content:
+                    yield chunk.choices[0].delta.content
+                usage = getattr(chunk, "usage", None)
+                if usage and usage.total_tokens is not None and usage.total_tokens < estimate:
+                    self.tokens.refund(estimate - usage.total_tokens)
+        finally:
+            try:
+                await stream.close()
+            finally:
+                self.stats["in_flight"] -= 1
+                self._semaphore.release()
+
+    async def _request(self, messages: List[Dict], model: str, hold_slot: bool, **kwargs):
+        """One request with retries; with ``hold_slot`` the caller releases the slot."""
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        estimate = estimate_tokens(messages, kwargs.get("max_tokens"))
+
+        for attempt in range(self.max_retries + 1):
+            pause = self._paused_until - time.monotonic()
+            if pause > 0:
+                await asyncio.sleep(pause)
+            await self.requests.acquire(1)
+            await self.tokens.acquire(estimate)
+            await self._semaphore.acquire()
+            self.stats["in_flight"] += 1
+            self.stats["peak_in_flight"] = max(self.stats["peak_in_flight"], self.stats["in_flight"])
+            opened = False
+            try:
+                self.stats["requests"] += 1
+                response = await self.client.chat.completions.create(
+                    model=model, messages=messages, **kwargs
+                )
+                opened = True
+            except RETRYABLE as e:
+                if attempt == self.max_retries:
+                    self.stats["failures"] += 1
+                    raise
+                self.stats["retries"] += 1
+                delay = random.uniform(0, min(BACKOFF_CAP, BACKOFF_BASE * 2 ** attempt))
+                hinted = retry_after_seconds(e)
+                if hinted is not None:
+                    delay = max(delay, hinted)
+                if isinstance(e, openai.RateLimitError):
+                    self.stats["rate_limited"] += 1
+                    self._paused_until = max(self._paused_until, time.monotonic() + delay)
+            except Exception:
+                self.stats["failures"] += 1
+                raise
+            finally:
+                if not (opened and hold_slot):
+                    self.stats["in_flight"] -= 1
+                    self._semaphore.release()
+            if not opened:
+                await asyncio.sleep(delay)
+                continue
+
+            usage = getattr(response, "usage", None)
+            if usage and usage.total_tokens is not None and usage.total_tokens < estimate:
+                self.tokens.refund(estimate - usage.total_tokens)
+            return response
+
+    # ── sync API ─────────────────────────────────────────────────────
+    def chat(self, messages: List[Dict], model: str = "gpt-4o", **kwargs):
+        """Blocking wrapper around :meth:`achat`, safe from any thread."""
+        future = asyncio.run_coroutine_threadsafe(
+            self.achat(messages, model=model, **kwargs), self._loop
+        )
+        return future.result()
+
+    def chat_stream(self, messages: List[Dict], model: str = "gpt-4o", **kwargs) -> Iterator[str]:
+        """Blocking generator over :meth:`astream`, safe from any thread.
+
+        Closing it early (e.g. a Streamlit rerun) cancels the request.
+        """
+        chunks: queue.Queue = queue.Queue()
+        done = object()
+
+        async def pump():
+            try:
+                async for text in self.astream(messages, model=model, **kwargs):
+                    chunks.put(text)
+            except Exception as e:
+                chunks.put(e)
+            finally:
+                chunks.put(done)
+
+        future = asyncio.run_coroutine_threadsafe(pump(), self._loop)
+        try:
+            while True:
+                item = chunks.get()
+                if item is done:
+                    return
+                if isinstance(item, Exception):
+                    raise item
+                yield item
+        finally:
+            future.cancel()
+
+    def chat_many(self, conversations: List[List[Dict]], model: str = "gpt-4o", **kwargs) -> List:
+        """Run several requests concurrently under the same limits.
+
+        Returns one entry per conversation, in order: the response, or the
+        exception that request finally failed with.
+        """
+        async def run():
+            return await asyncio.gather(
+                *(self.achat(m, model=model, **kwargs) for m in conversations),
+                return_exceptions=True,
+            )
+        return asyncio.run_coroutine_threadsafe(run(), self._loop).result()
+
+
+def timed_stream(chunks: Iterator[str], timings: Dict) -> Iterator[str]:
+    """Pass ``chunks`` through, recording ``first_token_ms`` and ``generation_ms``."""
+    start = time.perf_counter()
+    try:
+        for text in chunks:
+            if "first_token_ms" not in timings:
+                timings["first_token_ms"] = 1000 * (time.perf_counter() - start)
+            yield text
+    finally:
+        timings["generation_ms"] = 1000 * (time.perf_counter() - start)
+
+
+_scheduler: Optional[RequestScheduler] = None
+_scheduler_lock = threading.Lock()
+
+
+def get_scheduler() -> RequestScheduler:
+    """Process-wide scheduler, created on first use."""
+    global _scheduler
+    with _scheduler_lock:
+        if _scheduler is None:
+            _scheduler = RequestScheduler()
+        return _scheduler
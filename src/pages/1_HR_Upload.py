@@ -1,16 +1,13 @@
-import io
-import re
 import streamlit as st
-import fitz  # PyMuPDF
-import pdfplumber
-import PyPDF2
-from pdfminer.high_level import extract_text
-from pdf2image import convert_from_bytes
-import pytesseract
-import json
 
 # Assume these are defined in your utils.py
-from utils import summarize_resume, make_candidate_id, chroma_client, collection
+from utils import (
+    summarize_resume, extract_candidate_name, candidate_identity, make_candidate_id, get_collection,
+    save_candidates, get_dedupe_index, dedupe_entry,
+    get_ingest_cache, get_extractor_stats, get_embedding_cache, get_summary_fingerprint, scheduler_caption,
+)
+from ingest import ingest_batch
+from summarization import SUMMARY_METRICS
 
 # --- 1. PAGE CONFIGURATION & THEME ---
 # Sets up the page with a title, icon, wide layout, and a custom theme.
@@ -25,84 +22,7 @@ st.set_page_config(
     }
 )
 
-# --- 2. CORE FUNCTIONS ---
-# Robust text extraction pipeline trying multiple methods for reliability.
-def extract_all_text(pdf_bytes: bytes) -> str:
-    """Chain-tries multiple PDF text extractors, including an OCR fallback."""
-    text = ""
-    # Method 1: PyMuPDF (fitz) - Often the most reliable
-    try:
-        with fitz.open(stream=pdf_bytes, filetype="pdf") as doc:
-            text = "\n".join(p.get_text() for p in doc)
-    except Exception:
-        pass
-    if text.strip(): return text
-
-    # Method 2: pdfminer.six
-    try:
-        text = extract_text(io.BytesIO(pdf_bytes))
-    except Exception:
-        pass
-    if text.strip(): return text
-
-    # Method 3: pdfplumber
-    try:
-        with pdfplumber.open(io.BytesIO(pdf_bytes)) as pdf:
-            text = "\n".join(p.extract_text() or "" for p in pdf.pages)
-    except Exception:
-        pass
-    if text.strip(): return text
-
-    # Method 4: PyPDF2
-    try:
-        reader = PyPDF2.PdfReader(io.BytesIO(pdf_bytes))
-        text = "".join(p.extract_text() or "" for p in reader.pages)
-    except Exception:
-        pass
-    if text.strip(): return text
-
-    # Method 5: OCR Fallback (Tesseract) for image-based PDFs
-    try:
-        images = convert_from_bytes(pdf_bytes, dpi=300)
-        text = "\n".join(pytesseract.image_to_string(img) for img in images)
-    except Exception:
-        pass
-    return text
-
-# Improved name extraction with more robust patterns.
-def extract_candidate_name(summary: str, fallback_filename: str) -> str:
-    """Extract candidate name from structured summary JSON or fallback heuristics."""
-    
-    # Try JSON parsing first
-    try:
-        data = json.loads(summary)
-        if isinstance(data, dict) and "name" in data and data["name"].strip():
-            return data["name"].strip()
-    except json.JSONDecodeError:
-        pass  # fallback if it's not a JSON
-
-    # Regex patterns for fallback
-    patterns = [
-        r"(?i)^name[:\-]?\s*(.+)$",
-        r"(?i)^candidate(?: name)?[:\-]?\s*(.+)$",
-        r"(?i)^full name[:\-]?\s*(.+)$",
-    ]
-    for pat in patterns:
-        m = re.search(pat, summary, re.M)
-        if m: return m.group(1).strip()
-
-    # Fallback 2: capitalized first + last name in top lines
-    for line in summary.splitlines()[:5]:
-        line = line.strip("-• \t")
-        if re.fullmatch(r"[A-Z][a-zA-Z.'-]{1,}(?:\s[A-Z][a-zA-Z.'-]{1,})+", line):
-            return line
-
-    # Fallback 3: derive from filename
-    clean_name = re.sub(r"[_-]", " ", fallback_filename).rsplit(".", 1)[0]
-    return clean_name.title()
-
-
-# --- 3. SESSION STATE INITIALIZATION ---
+# --- 2. SESSION STATE INITIALIZATION ---
 # Using session state to hold data across reruns.
 if "staged_files" not in st.session_state:
     st.session_state.staged_files = []
@@ -112,7 +32,7 @@ if "errors" not in st.session_state:
     st.session_state.errors = []
 
 
-# --- 4. UI: HEADER AND INPUT FORM ---
+# --- 3. UI: HEADER AND INPUT FORM ---
 st.title("HireFlow Résumé Processor")
 st.markdown("Upload candidate résumés to automatically extract, summarize, and store their information.")
 
@@ -120,7 +40,7 @@ with st.container(border=True):
     st.subheader("Step 1: Upload Your Files")
     hr_name = st.text_input("👤 Your Name (HR Representative)", placeholder="e.g., Maria Garcia")
     files = st.file_uploader(
-        "📂 Upload up to 10 résumé PDFs",
+        "📂 Upload résumé PDFs (batches of hundreds are fine)",
         type="pdf",
         accept_multiple_files=True
     )
@@ -133,113 +53,175 @@ with st.container(border=True):
         disabled=not (hr_name and files)
     )
 
+ingest_cache = get_ingest_cache()
+if ingest_cache:
+    with st.sidebar.expander("🗄️ Ingest cache"):
+        for kind, counts in ingest_cache.stats().items():
+            lookups = counts["hits"] + counts["misses"]
+            rate = f"{counts['hits'] / lookups:.0%}" if lookups else "–"
+            st.caption(
+                f"**{kind}**: {counts['hits']} hits / {counts['misses']} misses ({rate}), "
+                f"{counts['entries']} entries, {counts['bytes'] / 1e6:.1f} MB"
+            )
+
+embedding_cache = get_embedding_cache()
+if embedding_cache:
+    with st.sidebar.expander("🧬 Embedding cache"):
+        e = embedding_cache.stats()
+        rate = f"{e['hit_rate']:.0%}" if e["hit_rate"] is not None else "–"
+        st.caption(
+            f"{e['memory_hits']} memory hits / {e['disk_hits']} disk hits / {e['misses']} misses ({rate}), "
+            f"{e['disk_entries']} stored ({e['bytes'] / 1e6:.1f} MB), {e['evictions']} evictions"
+        )
+
+extractor_stats = get_extractor_stats()
+if extractor_stats:
+    overall = extractor_stats.snapshot().get("*", {})
+    if overall:
+        with st.sidebar.expander("⏱️ Extractor stats"):
+            for method, s in overall.items():
+                st.caption(
+                    f"**{method}**: {s['runs']} runs, {s['successes'] / s['runs']:.0%} success, "
+                    f"{1000 * s['seconds'] / s['runs']:.0f} ms avg, "
+                    f"{s['failures']} errors, {s['timeouts']} timeouts"
+                )
+
+summary_totals = SUMMARY_METRICS.snapshot()
+if summary_totals["documents"]:
+    with st.sidebar.expander("🧮 Summary tokens"):
+        st.caption(
+            f"{summary_totals['documents']} résumés, "
+            f"{summary_totals['sent_tokens_per_doc']:.0f} prompt tokens/résumé sent "
+            f"({summary_totals['input_tokens']} tokens of raw text in). "
+            f"{summary_totals['mapped_documents']} long résumés condensed with "
+            f"{summary_totals['map_calls']} section calls."
+        )
+
+with st.sidebar.expander("📡 OpenAI requests"):
+    st.caption(scheduler_caption())
+
 if st.sidebar.button("Clear Session and Start Over"):
     st.session_state.staged_files = []
     st.session_state.final_results = []
     st.session_state.errors = []
     st.rerun()
 
-# --- 5. LOGIC: PROCESSING PIPELINE ---
+# --- 4. LOGIC: PROCESSING PIPELINE ---
 if process_button:
-    if len(files) > 10:
-        st.error("⚠️ You can upload a maximum of 10 files at a time. Please reduce the count.")
-        st.stop()
-    
     # Reset state for the new batch
     st.session_state.staged_files = []
     st.session_state.errors = []
     
     status_placeholder = st.empty()
     progress_bar = st.progress(0, "Starting batch processing...")
-    
-    for i, pdf in enumerate(files):
-        try:
-            status_placeholder.info(f"⚙️ Processing: `{pdf.name}`...")
-            raw_text = extract_all_text(pdf.getvalue())
-            
-            if not raw_text or not raw_text.strip():
-                st.session_state.errors.append({"filename": pdf.name, "error": "No text could be extracted."})
-                continue
-            
-            # This is where you call your AI model
-            with st.spinner(f"🤖 AI is summarizing `{pdf.name}`..."):
-                summary = summarize_resume(raw_text) 
-            
-            name = extract_candidate_name(summary, pdf.name)
-            cid = make_candidate_id(name)
 
-            # Stage the processed data instead of saving immediately
-            st.session_state.staged_files.append({
-                "name": name, "cid": cid, "summary": summary, "raw": raw_text,
-                "filename": pdf.name, "uploaded_by": hr_name
-            })
-            
-        except Exception as e:
-            st.session_state.errors.append({"filename": pdf.name, "error": str(e)})
-        
-        progress_bar.progress((i + 1) / len(files), f"Completed: `{pdf.name}`")
-        
-    status_placeholder.success("✅ Batch processing complete! Please review and save below.")
+    def show_progress(done, total, filename, stage):
+        if stage == "cached":
+            progress_bar.progress(done / total, f"Completed {done}/{total} (cached): `{filename}`")
+        elif stage == "extracted":
+            status_placeholder.info(f"🤖 Text extracted from `{filename}`, AI is summarizing...")
+        else:
+            progress_bar.progress(done / total, f"Completed {done}/{total}: `{filename}`")
+
+    status_placeholder.info(f"⚙️ Processing {len(files)} résumés in parallel...")
+    results, errors = ingest_batch(
+        [(pdf.name, pdf.getvalue()) for pdf in files],
+        summarize_resume,
+        on_progress=show_progress,
+        cache=ingest_cache,
+        fingerprint=get_summary_fingerprint(),
+        extractor_stats=extractor_stats,
+    )
+    st.session_state.errors.extend(errors)
+
+    staged = {}
+    for res in results:
+        name = extract_candidate_name(res["summary"], res["filename"])
+        identity = candidate_identity(res["summary"], res["raw"])
+        cid = make_candidate_id(identity)
+        if cid in staged:
+            st.warning(f"`{res['filename']}` is the same candidate as `{staged[cid]['filename']}`; keeping the later file.")
+
+        # Stage the processed data instead of saving immediately
+        staged[cid] = {
+            "name": name, "cid": cid, "identity": identity, "summary": res["summary"], "raw": res["raw"],
+            "filename": res["filename"], "uploaded_by": hr_name
+        }
+    st.session_state.staged_files = list(staged.values())
+
+    cached_count = sum(1 for res in results if res["cached"])
+    status_placeholder.success(
+        f"✅ Batch processing complete ({cached_count} served from cache)! Please review and save below."
+    )
     progress_bar.empty()
 
-# --- 6. UI & LOGIC: DUPLICATE HANDLING AND SAVING ---
+# --- 5. UI & LOGIC: DUPLICATE HANDLING AND SAVING ---
 if st.session_state.staged_files:
     with st.container(border=True):
         st.subheader("Step 2: Review & Save to Database")
-        
-        duplicates_to_resolve = []
-        processed_names = {f['name'] for f in st.session_state.staged_files}
-        
-        # Check for duplicates already in the database
-        existing_in_db = collection.get(where={"name": {"$in": list(processed_names)}})['ids']
 
+        # Check each staged résumé against the duplicate index:
+        # "exact" = same email/phone (or same name with near-identical text),
+        # "near"  = very similar résumé text, offered for merge review.
+        dedupe_index = get_dedupe_index()
+        matches = {}
         for data in st.session_state.staged_files:
-            if data["name"] in existing_in_db:
-                duplicates_to_resolve.append(data)
-        
+            if dedupe_index:
+                entry = dedupe_entry(data["cid"], data["name"], data["summary"], data["raw"])
+                found = dedupe_index.check(entry["email"], entry["phone"], entry["name"], entry["text"], entry["summary"])
+                if found:
+                    matches[data["cid"]] = found
+
+        matched_ids = sorted({m["candidate_id"] for found in matches.values() for m in found})
+        existing_names = {}
+        if matched_ids:
+            existing = get_collection().get(ids=matched_ids, include=["metadatas"])
+            existing_names = {cid: (meta or {}).get("name", cid) for cid, meta in zip(existing["ids"], existing["metadatas"])}
+
         # Form to handle all duplicates at once
         with st.form("save_to_db_form"):
-            if duplicates_to_resolve:
-                st.warning("⚠️ Some candidates already exist. Choose whether to overwrite them.")
-                overwrite_choices = {}
-                for dup in duplicates_to_resolve:
-                    label = f"Overwrite **{dup['name']}** (from `{dup['filename']}`)"
-                    overwrite_choices[dup['name']] = st.checkbox(label, value=True)
+            choices = {}
+            if matches:
+                st.warning("⚠️ Some candidates look like people already in the database. Review them before saving.")
+                for data in st.session_state.staged_files:
+                    found = [m for m in matches.get(data["cid"], []) if m["candidate_id"] in existing_names]
+                    if not found:
+                        continue
+                    best = found[0]
+                    other = existing_names[best["candidate_id"]]
+                    if best["kind"] == "exact":
+                        label = (f"Overwrite **{other}** with **{data['name']}** (from `{data['filename']}`) "
+                                 f"— same {best['reason']}")
+                        default = True
+                    else:
+                        label = (f"Merge **{data['name']}** (from `{data['filename']}`) into **{other}** "
+                                 f"— {best['similarity']:.0%} similar résumé text")
+                        default = False
+                    choices[data["cid"]] = (st.checkbox(label, value=default, key=f"dup_{data['cid']}"), best)
+                st.caption("Unchecked exact matches are skipped; unchecked near matches are saved as new candidates.")
             else:
                 st.info("✅ All candidates appear to be new. Ready to save.")
-                overwrite_choices = {}
 
             save_button = st.form_submit_button("💾 Save to Database", use_container_width=True, type="primary")
 
         # Logic to execute after form submission
         if save_button:
             with st.spinner("Saving data..."):
-                saved_count = 0
-                st.session_state.final_results = [] # Clear previous results
-                
+                to_save, replace_ids = [], []
                 for data in st.session_state.staged_files:
-                    name = data["name"]
-                    # If it's a duplicate and the user unchecked the box, skip it.
-                    if name in overwrite_choices and not overwrite_choices.get(name):
-                        st.toast(f"Skipped {name}", icon="🚫")
+                    replace, match = choices.get(data["cid"], (False, None))
+                    # An exact duplicate the user chose not to overwrite is skipped.
+                    if match and match["kind"] == "exact" and not replace:
+                        st.toast(f"Skipped {data['name']}", icon="🚫")
                         continue
-                    
-                    # If it's a duplicate and we're overwriting, delete the old entry.
-                    if name in overwrite_choices and overwrite_choices.get(name):
-                        collection.delete(where={"name": name})
+                    # Overwrite / merge: the new résumé replaces the stored one
+                    # (a re-upload of the same identity is simply upserted).
+                    if replace and match["candidate_id"] != data["cid"]:
+                        replace_ids.append(match["candidate_id"])
+                    to_save.append(data)
 
-                    # Add the new or updated entry to ChromaDB.
-                    collection.add(
-                        documents=[data["summary"]],
-                        metadatas=[{"candidate_id": data["cid"], "name": name, "uploaded_by": data["uploaded_by"]}],
-                        ids=[data["cid"]]
-                    )
-                    st.session_state.final_results.append(data)
-                    saved_count += 1
-                
-                # Persist changes to the database if the client supports it.
-                if hasattr(chroma_client, "persist"):
-                    chroma_client.persist()
+                st.session_state.final_results = save_candidates(to_save, replace_ids)
+                saved_count = len(st.session_state.final_results)
 
             st.success(f"🎉 Success! {saved_count} résumés have been saved to the database.")
             st.session_state.staged_files = [] # Clear the stage
@@ -247,7 +229,7 @@ if st.session_state.staged_files:
             import time; time.sleep(1)
             st.rerun()
 
-# --- 7. UI: FINAL RESULTS DISPLAY ---
+# --- 6. UI: FINAL RESULTS DISPLAY ---
 if st.session_state.errors:
     with st.container(border=True):
         st.subheader("Processing Errors")
@@ -1,7 +1,10 @@
 import streamlit as st
 import json
 from datetime import datetime
-from utils import collection, chroma_client
+from utils import (
+    get_collection, get_chroma_client, rebuild_candidate_metadata, delete_candidate_vectors, keyword_matches,
+)
+from resume_schema import where_all
 
 st.set_page_config(
     page_title="HireScope - Candidate Profiles",
@@ -437,10 +440,10 @@ st.markdown("*Browse and manage all résumés processed by HireScope AI*")
 
 # Fetching data
 try:
-    # Get all data without specifying include parameters first
-    all_data = collection.get()
+    # Metadata only: stats need every candidate, documents are fetched
+    # below for the filtered set alone.
+    all_data = get_collection().get(include=["metadatas"])
     metas = all_data.get("metadatas", [])
-    docs = all_data.get("documents", [])
     all_ids = all_data.get("ids", [])
     
     # Debug info
@@ -451,7 +454,7 @@ try:
     
 except Exception as e:
     st.error(f"🚨 Failed to load candidate data: {e}")
-    metas, docs, all_ids = [], [], []
+    metas, all_ids = [], []
 
 # Stats section
 if metas:
@@ -476,8 +479,8 @@ if metas:
     
     with col3:
         # Count profiles with contact info
-        with_contact = sum(1 for meta, doc in zip(metas, docs) 
-                          if any(field in doc.lower() for field in ['email', 'phone', 'linkedin']))
+        with_contact = sum(1 for meta in metas
+                          if meta.get('has_email') or meta.get('has_phone') or meta.get('has_linkedin'))
         st.markdown(f"""
         <div class="stat-card">
             <div class="stat-number">{with_contact}</div>
@@ -492,6 +495,11 @@ if metas:
         cutoff_date = datetime.now() - timedelta(days=7)
         
         for meta in metas:
+            uploaded_at = meta.get('uploaded_at')
+            if isinstance(uploaded_at, (int, float)):
+                if uploaded_at >= cutoff_date.timestamp():
+                    recent_count += 1
+                continue
             upload_date = meta.get('upload_timestamp')
             if upload_date:
                 try:
@@ -558,6 +566,7 @@ with st.sidebar:
         has_email = st.checkbox("Has Email", value=False)
         has_phone = st.checkbox("Has Phone", value=False)
         has_linkedin = st.checkbox("Has LinkedIn", value=False)
+        min_years = st.number_input("🧭 Min. years of experience", min_value=0.0, value=0.0, step=0.5)
     
     # Show current filter values for debugging
     if name_filter or id_filter or by_hr or keywords or has_email or has_phone or has_linkedin:
@@ -569,12 +578,18 @@ with st.sidebar:
         if has_email: st.write("Has Email: ✓")
         if has_phone: st.write("Has Phone: ✓")
         if has_linkedin: st.write("Has LinkedIn: ✓")
+        if min_years: st.write(f"Min. experience: {min_years:g} years")
+
+    # Older records were saved before structured metadata existed.
+    if st.button("🛠️ Rebuild search metadata", use_container_width=True,
+                 help="Re-derive email/phone/skills/experience metadata from stored summaries"):
+        with st.spinner("Rebuilding metadata..."):
+            updated = rebuild_candidate_metadata()
+        st.success(f"Updated metadata for {updated} candidates.")
+        st.rerun()
 
-def matches(meta, doc):
-    # Debug what we're working with
-    doc_str = str(doc).lower() if doc else ""
-    
-    # Basic text filters - be more explicit
+def matches(meta):
+    # Substring filters on metadata; everything else is a Chroma where clause
     if name_filter and name_filter.strip():
         if name_filter.lower() not in meta.get('name', '').lower():
             return False
@@ -587,63 +602,59 @@ def matches(meta, doc):
         if by_hr.lower() not in meta.get('uploaded_by', '').lower():
             return False
     
-    if keywords and keywords.strip():
-        if keywords.lower() not in doc_str:
-            return False
-    
-    # Advanced filters - more thorough checking
-    if has_email:
-        email_found = (
-            'email' in doc_str or 
-            '@' in doc_str or
-            any(str(v).lower().find('email') != -1 for v in meta.values() if v) or
-            any('@' in str(v) for v in meta.values() if v)
-        )
-        if not email_found:
-            return False
-    
-    if has_phone:
-        import re
-        phone_patterns = [
-            r'\b\d{3}[-.\s]?\d{3}[-.\s]?\d{4}\b',  # US format
-            r'\b\d{10}\b',  # 10 digits
-            r'\+\d{1,3}[-.\s]?\d{3,4}[-.\s]?\d{3,4}[-.\s]?\d{4}',  # International
-        ]
-        phone_found = (
-            'phone' in doc_str or 
-            'mobile' in doc_str or
-            'tel' in doc_str or
-            any(re.search(pattern, doc_str) for pattern in phone_patterns) or
-            any('phone' in str(v).lower() for v in meta.values() if v)
-        )
-        if not phone_found:
-            return False
-    
-    if has_linkedin:
-        linkedin_found = (
-            'linkedin' in doc_str or 
-            'linkedin.com' in doc_str or
-            '/in/' in doc_str or
-            any('linkedin' in str(v).lower() for v in meta.values() if v)
-        )
-        if not linkedin_found:
-            return False
-    
     return True
 
+# Keyword searches list every candidate with a BM25 hit, best first, a page at a time
+KEYWORD_PAGE_SIZE = 50
+
+where = where_all(
+    {"has_email": True} if has_email else None,
+    {"has_phone": True} if has_phone else None,
+    {"has_linkedin": True} if has_linkedin else None,
+    {"experience_years": {"$gte": float(min_years)}} if min_years else None,
+)
+
 # Filter and display candidates
 filtered_candidates = []
 candidate_ids = []  # Keep track of IDs for deletion
 
-if metas and docs:
-    for i, (meta, doc) in enumerate(zip(metas, docs)):
-        if matches(meta, doc):
-            filtered_candidates.append((meta, doc, i))  # Include original index
-            # Try to get the actual ID from the collection
-            try:
-                candidate_ids.append(all_ids[i] if i < len(all_ids) else meta.get('candidate_id', f'idx_{i}'))
-            except:
-                candidate_ids.append(meta.get('candidate_id', f'idx_{i}'))
+if metas:
+    try:
+        order = keyword_matches(keywords.strip()) if keywords and keywords.strip() else None
+        if order is not None:
+            # Apply the other filters to every match before paging, so counts are exact
+            found = get_collection().get(ids=order, where=where, include=["metadatas"]) if order else {"ids": [], "metadatas": []}
+            meta_of = dict(zip(found["ids"], found["metadatas"]))
+            order = [cid for cid in order if cid in meta_of and matches(meta_of[cid])]
+            total_matches = len(order)
+            pages = max(1, -(-total_matches // KEYWORD_PAGE_SIZE))
+            page = int(st.number_input("Page", min_value=1, max_value=pages, value=1)) if pages > 1 else 1
+            first = (page - 1) * KEYWORD_PAGE_SIZE
+            order = order[first:first + KEYWORD_PAGE_SIZE]
+            if total_matches:
+                st.caption(
+                    f"{total_matches} keyword matches, ranked by relevance (BM25) · "
+                    f"showing {first + 1}–{first + len(order)}"
+                )
+            full = get_collection().get(ids=order, include=["metadatas", "documents"]) if order else {"ids": [], "metadatas": [], "documents": []}
+            by_id = {cid: (meta, doc) for cid, meta, doc in zip(full["ids"], full["metadatas"], full["documents"])}
+            order = [cid for cid in order if cid in by_id]
+            hits = {"ids": order, "metadatas": [by_id[c][0] for c in order], "documents": [by_id[c][1] for c in order]}
+        elif keywords and keywords.strip():
+            # No keyword index: plain substring match over the summaries
+            hits = get_collection().get(where=where, include=["metadatas", "documents"])
+            needle = keywords.strip().lower()
+            keep = [i for i, doc in enumerate(hits["documents"]) if needle in (doc or "").lower()]
+            hits = {k: [hits[k][i] for i in keep] for k in ("ids", "metadatas", "documents")}
+        else:
+            hits = get_collection().get(where=where, include=["metadatas", "documents"])
+    except Exception as e:
+        st.error(f"🚨 Failed to filter candidates: {e}")
+        hits = {"ids": [], "metadatas": [], "documents": []}
+    for i, (cid, meta, doc) in enumerate(zip(hits["ids"], hits["metadatas"], hits["documents"])):
+        if matches(meta):
+            filtered_candidates.append((meta, doc, i))
+            candidate_ids.append(cid)
 
 if not metas:
     st.markdown("""
@@ -678,7 +689,7 @@ cols = st.columns(2)
 for idx, (meta, doc, original_idx) in enumerate(filtered_candidates):
     name = meta.get('name', 'Unknown')
     uploaded_by = meta.get('uploaded_by', 'N/A')
-    upload_date = meta.get('upload_timestamp', 'N/A')
+    upload_date = meta.get('uploaded_at') or meta.get('upload_timestamp', 'N/A')
     candidate_id = meta.get('candidate_id', '')
     
     # Get the actual ID for deletion
@@ -688,16 +699,15 @@ for idx, (meta, doc, original_idx) in enumerate(filtered_candidates):
     avatar_url = meta.get('avatar_url')
     initials = "".join([w[0] for w in name.split() if w and w[0].isalpha()]).upper()[:2] or "👤"
 
-    # Parse contact info
-    email = phone = linkedin = None
-    summary_json = None
-    try:
-        summary_json = json.loads(doc)
-        email = summary_json.get("email")
-        phone = summary_json.get("phone")
-        linkedin = summary_json.get("linkedin")
-    except Exception:
-        summary_json = None
+    # Contact info comes from metadata; only records saved before
+    # structured metadata existed need the summary parsed
+    email, phone, linkedin = meta.get("email"), meta.get("phone"), meta.get("linkedin")
+    if "has_email" not in meta:
+        try:
+            legacy = json.loads(doc)
+            email, phone, linkedin = legacy.get("email"), legacy.get("phone"), legacy.get("linkedin")
+        except Exception:
+            pass
 
     col = cols[idx % len(cols)]
     with col:
@@ -708,7 +718,9 @@ for idx, (meta, doc, original_idx) in enumerate(filtered_candidates):
             if upload_date and upload_date != "N/A":
                 try:
                     # Try to parse different date formats
-                    if isinstance(upload_date, str):
+                    if isinstance(upload_date, (int, float)):
+                        display_date = datetime.fromtimestamp(upload_date).strftime("%B %d, %Y at %I:%M %p")
+                    elif isinstance(upload_date, str):
                         # Handle common date formats
                         for fmt in ["%Y-%m-%d %H:%M:%S", "%Y-%m-%d", "%d/%m/%Y", "%m/%d/%Y", "%Y-%m-%d %H:%M"]:
                             try:
@@ -778,9 +790,9 @@ for idx, (meta, doc, original_idx) in enumerate(filtered_candidates):
 
             # Summary modal
             if view_summary:
-                if summary_json:
-                    summary_str = json.dumps(summary_json, indent=2, ensure_ascii=False)
-                else:
+                try:
+                    summary_str = json.dumps(json.loads(doc), indent=2, ensure_ascii=False)
+                except Exception:
                     summary_str = doc
                 
                 st.markdown(f"""
@@ -803,7 +815,7 @@ for idx, (meta, doc, original_idx) in enumerate(filtered_candidates):
                             # Method 1: Delete by ChromaDB ID
                             if actual_id and len(actual_id) > 0:
                                 try:
-                                    collection.delete(ids=[str(actual_id)])
+                                    get_collection().delete(ids=[str(actual_id)])
                                     success = True
                                     st.write(f"✅ Deleted using ChromaDB ID: {actual_id}")
                                 except Exception as e1:
@@ -812,7 +824,7 @@ for idx, (meta, doc, original_idx) in enumerate(filtered_candidates):
                             # Method 2: Delete by candidate_id
                             if not success and candidate_id:
                                 try:
-                                    collection.delete(ids=[str(candidate_id)])
+                                    get_collection().delete(ids=[str(candidate_id)])
                                     success = True
                                     st.write(f"✅ Deleted using candidate ID: {candidate_id}")
                                 except Exception as e2:
@@ -821,7 +833,7 @@ for idx, (meta, doc, original_idx) in enumerate(filtered_candidates):
                             # Method 3: Delete by metadata where clause
                             if not success and candidate_id:
                                 try:
-                                    collection.delete(where={"candidate_id": {"$eq": candidate_id}})
+                                    get_collection().delete(where={"candidate_id": {"$eq": candidate_id}})
                                     success = True
                                     st.write(f"✅ Deleted using metadata where clause")
                                 except Exception as e3:
@@ -830,19 +842,21 @@ for idx, (meta, doc, original_idx) in enumerate(filtered_candidates):
                             # Method 4: Delete by name (dangerous but last resort)
                             if not success and name != "Unknown":
                                 try:
-                                    collection.delete(where={"name": {"$eq": name}})
+                                    get_collection().delete(where={"name": {"$eq": name}})
                                     success = True
                                     st.write(f"✅ Deleted using name: {name}")
                                 except Exception as e4:
                                     error_messages.append(f"Name method: {str(e4)}")
                             
                             if success:
+                                delete_candidate_vectors({str(i) for i in (actual_id, candidate_id) if i})
+
                                 # Try to persist
                                 try:
-                                    collection.persist()
+                                    get_collection().persist()
                                 except:
                                     try:
-                                        chroma_client.persist()
+                                        get_chroma_client().persist()
                                     except:
                                         pass
                                 
@@ -0,0 +1,159 @@
+# resume_schema.py – prompt_2.md output schema, validation and metadata
+#
+# summarize_resume asks for a JSON object (response_format=json_object);
+# this module checks it against the schema in prompt_2.md, fills missing
+# keys with the documented defaults, and flattens the fields we search on
+# into typed Chroma metadata so filters can be `where` clauses.
+
+import json
+import re
+import time
+from typing import Any, Dict, List, Optional
+
+SCHEMA_DEFAULTS: Dict[str, Any] = {
+    "name": None,
+    "email": None,
+    "phone": None,
+    "linkedin": None,
+    "primarySkillArea": None,
+    "experienceDetails": {
+        "claimedTotalExperience": None,
+        "computedTotalExperience": None,
+        "computedRelevantExperience": None,
+        "experienceCalculationExplanation": None,
+        "workHistoryDates": [],
+    },
+    "currentLocation": None,
+    "currentOrganisation": None,
+    "highestEducation": None,
+    "yearOfPassing": None,
+    "skills": [],
+    "assessment": None,
+}
+
+TOP_SKILLS = 10
+
+
+class SchemaError(ValueError):
+    pass
+
+
+def _number(value) -> Optional[float]:
+    if isinstance(value, bool) or value is None:
+        return None
+    if isinstance(value, (int, float)):
+        return float(value)
+    m = re.search(r"\d+(?:\.\d+)?", str(value))
+    return float(m.group()) if m else None
+
+
+def _text(value) -> Optional[str]:
+    if value is None:
+        return None
+    value = str(value).strip()
+    return value or None
+
+
+def parse_summary(text: str) -> Dict[str, Any]:
+    """Parse model output into a dict with exactly the schema's keys.
+
+    Tolerates Markdown code fences; raises ``SchemaError`` if the output is
+    not a JSON object or a field has the wrong shape.
+    """
+    body = re.sub(r"^```(?:json)?\s*|\s*```$", "", text.strip())
+    try:
+        data = json.loads(body)
+    except json.JSONDecodeError as e:
+        raise SchemaError(f"summary is not JSON: {e}") from None
+    if not isinstance(data, dict):
+        raise SchemaError("summary is not a JSON object")
+
+    profile: Dict[str, Any] = {}
+    for key, default in SCHEMA_DEFAULTS.items():
+        value = data.get(key, default)
+        if isinstance(default, dict):
+            value = value if isinstance(value, dict) else {}
+            value = {k: value.get(k, d) for k, d in default.items()}
+            if not isinstance(value["workHistoryDates"], list):
+                raise SchemaError("experienceDetails.workHistoryDates must be a list")
+        elif isinstance(default, list):
+            if value is None:
+                value = []
+            if not isinstance(value, list):
+                raise SchemaError(f"{key} must be a list")
+        elif isinstance(value, (dict, list)):
+            raise SchemaError(f"{key} must be a scalar")
+        profile[key] = value
+    return profile
+
+
+def latest_role(profile: Dict[str, Any]) -> Dict[str, Any]:
+    """Most recent work-history entry ("present" sorts last-ending)."""
+    roles = [r for r in profile["experienceDetails"]["workHistoryDates"] if isinstance(r, dict)]
+    if not roles:
+        return {}
+
+    def key(role):
+        end = str(role.get("endDate") or "present").lower()
+        return ("9999-99" if end == "present" else end, str(role.get("startDate") or ""))
+    return max(roles, key=key)
+
+
+def total_experience(profile: Dict[str, Any]) -> Optional[float]:
+    details = profile["experienceDetails"]
+    return _number(details["computedTotalExperience"]) or _number(details["claimedTotalExperience"])
+
+
+def candidate_metadata(
+    profile: Optional[Dict[str, Any]],
+    candidate_id: str,
+    name: str,
+    uploaded_by: str,
+    uploaded_at: Optional[float] = None,
+) -> Dict[str, Any]:
+    """Flat, typed Chroma metadata for one candidate.
+
+    Chroma metadata values must be str/int/float/bool, so ``top_skills`` is
+    a comma-separated lower-case string and absent fields are left out.
+    """
+    meta: Dict[str, Any] = {
+        "candidate_id": candidate_id,
+        "name": name,
+        "uploaded_by": uploaded_by,
+        "uploaded_at": int(uploaded_at if uploaded_at is not None else time.time()),
+    }
+    if not profile:
+        return meta
+
+    fields = {
+        "email": _text(profile["email"]),
+        "phone": _text(profile["phone"]),
+        "linkedin": _text(profile["linkedin"]),
+        "location": _text(profile["currentLocation"]),
+        "organisation": _text(profile["currentOrganisation"]),
+        "primary_skill_area": _text(profile["primarySkillArea"]),
+        "latest_title": _text(latest_role(profile).get("role")),
+        "experience_years": total_experience(profile),
+    }
+    meta.update({k: v for k, v in fields.items() if v is not None})
+
+    skills: List[str] = []
+    for skill in profile["skills"]:
+        s = _text(skill)
+        if s and s.lower() not in skills:
+            skills.append(s.lower())
+    if skills:
+        meta["top_skills"] = ", ".join(skills[:TOP_SKILLS])
+
+    meta["has_email"] = "email" in meta
+    meta["has_phone"] = "phone" in meta
+    meta["has_linkedin"] = "linkedin" in meta
+    return meta
+
+
+def where_all(*conditions: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+    """Combine Chroma ``where`` conditions, skipping ``None``s."""
+    parts = [c for c in conditions if c]
+    if not parts:
+        return None
+    return parts[0] if len(parts) == 1 else {"$and": parts}
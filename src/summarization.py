@@ -0,0 +1,211 @@
+# summarization.py – section-aware map-reduce résumé summarisation
+#
+# Short résumés go to the model whole.  Résumés over the per-document token
+# budget are split into sections (experience, education, skills, ...);
+# sections too long to keep verbatim are cut into chunks and condensed in
+# parallel ("map"), and the condensed résumé is then run through the
+# prompt_2.md schema once ("reduce").  Anything still over budget is
+# trimmed section by section, never by a blind prefix cut.
+
+import os
+import re
+import threading
+from typing import Dict, List, Optional, Tuple
+
+from llm import RequestScheduler
+
+RESUME_TOKEN_BUDGET = int(os.getenv("SUMMARY_TOKEN_BUDGET", "6000"))
+SUMMARY_CHUNK_TOKENS = int(os.getenv("SUMMARY_CHUNK_TOKENS", "1500"))
+# The summary model (utils.SUMMARY_MODEL); a cheaper one can be set here.
+MAP_MODEL = os.getenv("SUMMARY_MAP_MODEL", "gpt-4o")
+MAP_MAX_TOKENS = 400
+CHARS_PER_TOKEN = 4
+
+# Heading text (lower-cased, punctuation stripped) -> canonical section.
+SECTION_PATTERNS = [
+    ("summary", r"(professional |career )?(summary|profile|objective)|about me"),
+    ("experience", r"(work |professional |employment |career )?(experience|history)|employment"),
+    ("education", r"education( and training)?|academic (background|qualifications)|qualifications"),
+    ("skills", r"(technical |key |core |it )?skills( summary| and tools)?|technologies|tech stack|competencies|tools"),
+    ("projects", r"(key |academic |personal )?projects"),
+    ("certifications", r"certifications?|licenses( and certifications)?|courses|training"),
+]
+HEADING_MAX_CHARS = 40
+
+MAP_PROMPT = (
+    "Condense this part of the '{section}' section of a résumé into terse notes. "
+    "Keep every employer, job title, date range, location, degree, institution, "
+    "technology and quantified achievement; drop filler prose. Plain text only.\n\n"
+    "\"\"\"\n{text}\n\"\"\""
+)
+
+
+def count_tokens(text: str) -> int:
+    return len(text) // CHARS_PER_TOKEN
+
+
+# ─────────────────────────────────────────────────────────────────────
+# 1. Section splitting and budgeting
+# ─────────────────────────────────────────────────────────────────────
+def _heading(line: str) -> Optional[str]:
+    stripped = re.sub(r"[#*_:|•\-–=]+", " ", line.replace("&", " and "))
+    stripped = re.sub(r"\s+", " ", stripped).strip().lower()
+    if not stripped or len(stripped) > HEADING_MAX_CHARS:
+        return None
+    for name, pattern in SECTION_PATTERNS:
+        if re.fullmatch(pattern, stripped):
+            return name
+    return None
+
+
+def split_sections(raw: str) -> List[Tuple[str, str]]:
+    """``[(section, text)]`` in document order; text before any heading is ``header``."""
+    sections: List[Tuple[str, List[str]]] = [("header", [])]
+    for line in raw.splitlines():
+        name = _heading(line)
+        if name:
+            sections.append((name, []))
+        else:
+            sections[-1][1].append(line)
+    out = []
+    for name, lines in sections:
+        text = "\n".join(lines).strip()
+        if text:
+            out.append((name, text))
+    return out
+
+
+def chunk_text(text: str, max_tokens: int) -> List[str]:
+    """Split on blank lines (then lines) into chunks of at most ``max_tokens``."""
+    limit = max_tokens * CHARS_PER_TOKEN
+    chunks, current = [], ""
+    for block in re.split(r"\n\s*\n", text):
+        pieces = [block] if len(block) <= limit else block.splitlines()
+        for piece in pieces:
+            piece = piece[:limit]
+            if current and len(current) + len(piece) + 1 > limit:
+                chunks.append(current)
+                current = ""
+            current = f"{current}\n{piece}" if current else piece
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+def fit_to_budget(sections: List[Tuple[str, str]], budget: int) -> str:
+    """Join sections, trimming the longest ones first so the result fits ``budget``.
+
+    Water-filling: sections under the fair share keep all their text and
+    the leftover budget is divided among the longer ones.
+    """
+    limit = budget * CHARS_PER_TOKEN
+    sizes = [len(text) for _, text in sections]
+    allowed = list(sizes)
+    if sum(sizes) > limit:
+        remaining, open_idx = limit, sorted(range(len(sizes)), key=sizes.__getitem__)
+        while open_idx:
+            share = remaining // len(open_idx)
+            i = open_idx[0]
+            if sizes[i] <= share:
+                remaining -= sizes[i]
+                open_idx.pop(0)
+                continue
+            for j in open_idx:
+                allowed[j] = share
+            break
+    parts = []
+    for (name, text), n in zip(sections, allowed):
+        body = text if n >= len(text) else text[:n].rsplit("\n", 1)[0]
+        parts.append(body if name == "header" else f"{name.upper()}\n{body}")
+    return "\n\n".join(parts)
+
+
+# ─────────────────────────────────────────────────────────────────────
+# 2. Metrics
+# ─────────────────────────────────────────────────────────────────────
+class SummaryMetrics:
+    """Process-wide counters of what summarisation sends to the model."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.totals = {
+            "documents": 0, "mapped_documents": 0, "map_calls": 0,
+            "input_tokens": 0, "sent_tokens": 0, "completion_tokens": 0,
+        }
+
+    def record(self, doc: Dict):
+        with self._lock:
+            self.totals["documents"] += 1
+            self.totals["mapped_documents"] += int(doc["map_calls"] > 0)
+            for key in ("map_calls", "input_tokens", "sent_tokens", "completion_tokens"):
+                self.totals[key] += doc[key]
+
+    def snapshot(self) -> Dict:
+        with self._lock:
+            totals = dict(self.totals)
+        docs = totals["documents"] or 1
+        totals["sent_tokens_per_doc"] = totals["sent_tokens"] / docs
+        return totals
+
+
+SUMMARY_METRICS = SummaryMetrics()
+
+
+# ─────────────────────────────────────────────────────────────────────
+# 3. Map-reduce pipeline
+# ─────────────────────────────────────────────────────────────────────
+def resume_prompt(template: str, text: str) -> str:
+    return f"{template}\n\nRésumé:\n\"\"\"\n{text}\n\"\"\""
+
+
+def condense(raw: str, scheduler: RequestScheduler, budget: int = RESUME_TOKEN_BUDGET) -> Tuple[str, Dict]:
+    """Résumé text that fits ``budget``, plus map-stage metrics."""
+    metrics = {"map_calls": 0, "map_tokens": 0, "sections": []}
+    if count_tokens(raw) <= budget:
+        return raw, metrics
+
+    sections = split_sections(raw)
+    metrics["sections"] = [(name, count_tokens(text)) for name, text in sections]
+    jobs = []  # (section index, chunk)
+    for i, (name, text) in enumerate(sections):
+        if count_tokens(text) > SUMMARY_CHUNK_TOKENS:
+            jobs.extend((i, chunk) for chunk in chunk_text(text, SUMMARY_CHUNK_TOKENS))
+
+    if jobs:
+        responses = scheduler.chat_many(
+            [[{"role": "user", "content": MAP_PROMPT.format(section=sections[i][0], text=chunk)}]
+             for i, chunk in jobs],
+            model=MAP_MODEL, temperature=0, max_tokens=MAP_MAX_TOKENS,
+        )
+        condensed: Dict[int, List[str]] = {}
+        for (i, chunk), resp in zip(jobs, responses):
+            if isinstance(resp, Exception):
+                condensed.setdefault(i, []).append(chunk)  # budget trimming handles it
+                continue
+            metrics["map_calls"] += 1
+            usage = getattr(resp, "usage", None)
+            metrics["map_tokens"] += getattr(usage, "prompt_tokens", 0) or 0
+            condensed.setdefault(i, []).append(resp.choices[0].message.content.strip())
+        sections = [
+            (name, "\n".join(condensed[i]) if i in condensed else text)
+            for i, (name, text) in enumerate(sections)
+        ]
+    return fit_to_budget(sections, budget), metrics
+
+
+def summarize_map_reduce(
+    raw: str, template: str, scheduler: RequestScheduler, model: str, **params
+) -> Tuple[str, Dict]:
+    """Summarise ``raw`` into the template's schema; returns ``(summary, metrics)``."""
+    text, metrics = condense(raw, scheduler)
+    response = scheduler.chat(
+        [{"role": "user", "content": resume_prompt(template, text)}], model=model, **params
+    )
+    usage = getattr(response, "usage", None)
+    metrics.update(
+        input_tokens=count_tokens(raw),
+        sent_tokens=metrics["map_tokens"] + (getattr(usage, "prompt_tokens", 0) or 0),
+        completion_tokens=getattr(usage, "completion_tokens", 0) or 0,
+    )
+    SUMMARY_METRICS.record(metrics)
+    return response.choices[0].message.content.strip(), metrics
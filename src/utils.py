@@ -1,10 +1,52 @@
 # utils.py – shared helpers for HireScope
 
-import os, re
+import os, re, json, time, threading, functools
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 import streamlit as st
-import openai, chromadb
-from chromadb.utils import embedding_functions
+import openai
+from answer_cache import ANSWER_CACHE, AnswerCache, answer_scope
+from cache import IngestCache, sha256_hex
+from chunking import chunk_records
+from dedupe import DedupeIndex, email_key, phone_key
+from embeddings import (
+    EMBEDDING_DIMENSIONS, RESCORE_OVERFETCH, VECTOR_SIDECAR,
+    CachedEmbeddingFunction, EmbeddingCache, QuantizedVectors, embedding_mismatch,
+    make_embedding_provider,
+)
+from extraction import ExtractorStats
+from lexical import LexicalIndex, reciprocal_rank_fusion
+from rerank import RERANK_MIN_SCORE, RERANK_OVERFETCH, make_reranker
+from llm import get_scheduler
+from resume_schema import SchemaError, candidate_metadata, parse_summary
+from summarization import (
+    MAP_MAX_TOKENS, MAP_MODEL, MAP_PROMPT, RESUME_TOKEN_BUDGET, SUMMARY_CHUNK_TOKENS,
+    count_tokens, fit_to_budget, resume_prompt, split_sections, summarize_map_reduce,
+)
+from vectorstore import CHROMA_MODE, check_health, describe_store, open_client
+
+# Every shared resource here (Chroma client and collections, embedding
+# function, prompt, the SQLite caches and indexes, the re-ranker) is a
+# process-wide singleton created on first use, not at import, so a page
+# only pays for what it touches and reruns reuse them.  Unlike
+# st.cache_resource there is no per-call hashing, the same objects are
+# used by bulk_ingest outside Streamlit and by the warm-up thread, and a
+# "disabled" warning is shown once when creation fails, not on every rerun.
+_init_lock = threading.RLock()
+INIT_MS = {}    # singleton name -> creation time in ms
+
+def _once(fn):
+    value = []
+    @functools.wraps(fn)
+    def get():
+        if not value:
+            with _init_lock:
+                if not value:
+                    start = time.perf_counter()
+                    value.append(fn())
+                    INIT_MS[fn.__name__] = 1000 * (time.perf_counter() - start)
+        return value[0]
+    return get
 
 # ─────────────────────────────────────────────────────────────────────
 # 1. Load OpenAI API key from environment
@@ -24,33 +66,154 @@ HF_DATA_DIR       = "/data/chroma_store"
 USE_HF_DIR  = bool(os.getenv("SPACE_ID") or os.getenv("HF_SPACE_ID"))
 PERSIST_DIR = os.getenv("CHROMA_DB_DIR", HF_DATA_DIR if USE_HF_DIR else DEFAULT_LOCAL_DIR)
 
-@st.cache_resource
+# CHROMA_MODE=http shares one Chroma server between app replicas (vectorstore.py).
+@_once
 def get_chroma_client():
     try:
-        os.makedirs(PERSIST_DIR, exist_ok=True)
-        st.info(f"📂 Using persistent Chroma directory: {PERSIST_DIR}")
-        return chromadb.PersistentClient(path=PERSIST_DIR)
-    except PermissionError:
-        st.warning(f"⚠️ No write access to {PERSIST_DIR}. Using in-memory ChromaDB (non-persistent).")
-        return chromadb.Client()
+        client, warning = open_client(PERSIST_DIR)
+    except Exception as e:
+        st.error(f"❌ Vector store unavailable ({CHROMA_MODE}: {describe_store(PERSIST_DIR)}): {e}")
+        st.stop()
+    if warning:
+        st.warning(f"⚠️ {warning}")
+    return client
+
+# The keyword, duplicate and int8 indexes are local SQLite files that must
+# mirror the collection.  With a shared server (CHROMA_MODE=http) each
+# replica's copy would drift from it, and SQLite in WAL mode must not be
+# shared over a network filesystem, so they are off: search is vector-only
+# and duplicates are caught by the identity-derived candidate IDs alone.
+# The ingest, embedding and answer caches stay on, one per replica; they
+# are keyed by content, so a replica's cache can't serve stale data.
+LOCAL_INDEXES = CHROMA_MODE != "http"
+
+def store_health() -> dict:
+    """Heartbeat of the vector store: ``{mode, store, ok, latency_ms, error?}``."""
+    return dict(check_health(get_chroma_client()), mode=CHROMA_MODE, store=describe_store(PERSIST_DIR))
 
-chroma_client = get_chroma_client()
+EMBEDDING_CACHE_PATH = os.getenv(
+    "EMBEDDING_CACHE_PATH",
+    os.path.join(os.path.dirname(os.path.abspath(PERSIST_DIR)), "hirescope_embeddings.sqlite3"),
+)
 
+@_once
+def get_embedding_cache():
+    try:
+        return EmbeddingCache(EMBEDDING_CACHE_PATH)
+    except Exception as e:
+        st.warning(f"⚠️ Embedding cache disabled ({EMBEDDING_CACHE_PATH}): {e}")
+        return None
+
+@_once
+def get_embedding_function():
+    try:
+        provider = make_embedding_provider(OPENAI_API_KEY)
+    except Exception as e:
+        st.error(f"❌ Embedding provider unavailable: {e}")
+        st.stop()
+    # Repeated texts (same recruiter query, re-saved summary) skip the provider.
+    return CachedEmbeddingFunction(provider, get_embedding_cache(), EMBEDDING_DIMENSIONS)
+
+VECTOR_SIDECAR_PATH = os.getenv(
+    "VECTOR_SIDECAR_PATH",
+    os.path.join(os.path.dirname(os.path.abspath(PERSIST_DIR)), "hirescope_vectors_int8.sqlite3"),
+)
+
+@_once
+def get_vector_sidecar():
+    if VECTOR_SIDECAR != "int8" or not LOCAL_INDEXES:
+        return None
+    try:
+        return QuantizedVectors(VECTOR_SIDECAR_PATH)
+    except Exception as e:
+        st.warning(f"⚠️ int8 re-scoring disabled ({VECTOR_SIDECAR_PATH}): {e}")
+        return None
+
+@_once
 def get_collection():
-    return chroma_client.get_or_create_collection(
+    embedding_fn = get_embedding_function()
+    active = embedding_fn.describe()
+    col = get_chroma_client().get_or_create_collection(
         name="resumes",
-        embedding_function=embedding_functions.OpenAIEmbeddingFunction(
-            api_key=OPENAI_API_KEY,
-            model_name="text-embedding-3-large"
-        )
+        embedding_function=embedding_fn,
+        metadata=active,
     )
+    problem = embedding_mismatch(col.metadata, col.count(), active)
+    if problem:
+        st.error(f"❌ Mixed embeddings: {problem}")
+        st.stop()
+    if (col.metadata or {}).get("embedding_provider") is None:
+        # Record the provider on collections created before it was tracked.
+        kept = {k: v for k, v in (col.metadata or {}).items() if not k.startswith("hnsw:")}
+        col.modify(metadata={**kept, **active})
+    return col
 
-collection = get_collection()
+# INDEX_MODE=sections additionally stores each candidate as section chunks
+# (see chunking.py) and searches those, grouped back to candidates.
+INDEX_MODE = os.getenv("INDEX_MODE", "candidate").lower()
+SECTION_OVERFETCH = int(os.getenv("SECTION_OVERFETCH", "5"))
+SECTION_CHUNKS_PER_CANDIDATE = int(os.getenv("SECTION_CHUNKS_PER_CANDIDATE", "3"))
+
+@_once
+def get_section_collection():
+    if INDEX_MODE != "sections":
+        return None
+    embedding_fn = get_embedding_function()
+    return get_chroma_client().get_or_create_collection(
+        name="resume_sections",
+        embedding_function=embedding_fn,
+        metadata=embedding_fn.describe(),
+    )
+
+# ─────────────────────────────────────────────────────────────────────
+# Warm-up: open the collection and load its HNSW index once per process
+# ─────────────────────────────────────────────────────────────────────
+_warm_state = {"state": "cold"}
+
+def _warm():
+    start = time.perf_counter()
+    try:
+        collection = get_collection()
+        if collection.count():
+            # The first query loads the vector index from disk.
+            dims = get_embedding_function().dimensions or 1
+            collection.query(query_embeddings=[[0.0] * dims], n_results=1, include=[])
+        get_section_collection()
+        get_prompt_template()
+        _warm_state.update(state="ready", seconds=time.perf_counter() - start)
+    except BaseException as e:   # st.stop() raises a BaseException subclass
+        _warm_state.update(state="failed", error=str(e) or type(e).__name__)
+
+def warm_up(background: bool = True):
+    """Start loading the store once per process; later calls are no-ops."""
+    with _init_lock:
+        if _warm_state["state"] != "cold":
+            return
+        _warm_state["state"] = "warming"
+    if background:
+        threading.Thread(target=_warm, name="hirescope-warm-up", daemon=True).start()
+    else:
+        _warm()
+
+def readiness() -> dict:
+    """``{state: cold|warming|ready|failed, seconds?, error?, init_ms}``."""
+    return dict(_warm_state, init_ms=dict(INIT_MS))
+
+def readiness_caption() -> str:
+    """``Store ready in 1.4 s · collection 1210 ms · chroma client 380 ms · …`` (slowest singletons)."""
+    r = readiness()
+    if r["state"] == "ready":
+        head = f"Store ready in {r['seconds']:.1f} s"
+    elif r["state"] == "failed":
+        head = f"Store warm-up failed: {r['error']}"
+    else:
+        head = "Store warming up…"
+    slowest = sorted(r["init_ms"].items(), key=lambda kv: -kv[1])[:3]
+    return " · ".join([head] + [f"{name[4:].replace('_', ' ')} {ms:.0f} ms" for name, ms in slowest])
 
 # ─────────────────────────────────────────────────────────────────────
 # 3. Load summarization prompt from external Markdown file
 # ─────────────────────────────────────────────────────────────────────
-@st.cache_resource
 def load_prompt_template(path="src/prompt_2.md"):
     try:
         with open(path, "r", encoding="utf-8") as f:
@@ -62,29 +225,646 @@ def load_prompt_template(path="src/prompt_2.md"):
             "skills, education, experience, and summary. Format in readable plain text."
         )
 
-PROMPT_TEMPLATE = load_prompt_template()
+@_once
+def get_prompt_template():
+    return load_prompt_template()
+
+# Old module-level names, now resolved lazily (``from utils import collection``).
+_LAZY = {
+    "chroma_client": get_chroma_client,
+    "collection": get_collection,
+    "section_collection": get_section_collection,
+    "embedding_fn": get_embedding_function,
+    "PROMPT_TEMPLATE": get_prompt_template,
+    "SUMMARY_FINGERPRINT": lambda: get_summary_fingerprint(),
+}
+
+def __getattr__(name):
+    if name in _LAZY:
+        return _LAZY[name]()
+    raise AttributeError(f"module 'utils' has no attribute {name!r}")
 
 # ─────────────────────────────────────────────────────────────────────
 # 4. GPT‑4o résumé summariser using loaded prompt
 # ─────────────────────────────────────────────────────────────────────
+SUMMARY_MODEL = "gpt-4o"
+
+SUMMARY_PARAMS = {"temperature": 0.2, "response_format": {"type": "json_object"}}
+
+# Changes whenever anything that shapes a summary changes (prompt, model,
+# request parameters, token budget and, for the live map-reduce path, the
+# map model, chunk size and map prompt), so cached summaries produced by
+# an older setup are not reused.  The live path (summarize_resume) and
+# batch jobs (summary_messages) treat over-budget résumés differently and
+# cache under different fingerprints.
+def get_summary_fingerprint(pipeline: str = "map-reduce") -> str:
+    """``pipeline`` is ``"map-reduce"`` (live) or ``"trim"`` (batch)."""
+    settings = {
+        "pipeline": pipeline, "model": SUMMARY_MODEL, "params": SUMMARY_PARAMS,
+        "budget": RESUME_TOKEN_BUDGET,
+    }
+    if pipeline == "map-reduce":
+        settings.update(
+            map_model=MAP_MODEL, map_max_tokens=MAP_MAX_TOKENS, map_prompt=MAP_PROMPT,
+            chunk_tokens=SUMMARY_CHUNK_TOKENS,
+        )
+    return sha256_hex(f"{json.dumps(settings, sort_keys=True)}\n{get_prompt_template()}")
+
+def summary_messages(raw: str) -> list:
+    """Single-request chat messages for one résumé (used by batch jobs).
+
+    Over-budget résumés are trimmed section by section; the live path in
+    summarize_resume condenses them with map-reduce instead.  Cache the
+    result under ``get_summary_fingerprint("trim")``.
+    """
+    text = raw
+    if count_tokens(raw) > RESUME_TOKEN_BUDGET:
+        text = fit_to_budget(split_sections(raw), RESUME_TOKEN_BUDGET)
+    return [{"role": "user", "content": resume_prompt(get_prompt_template(), text)}]
+
+def normalize_summary(text: str) -> str:
+    """Schema-validated JSON string, or ``text`` unchanged if it doesn't parse."""
+    try:
+        return json.dumps(parse_summary(text), ensure_ascii=False)
+    except SchemaError:
+        return text
+
+def build_candidate_metadata(summary: str, cid: str, name: str, uploaded_by: str) -> dict:
+    try:
+        profile = parse_summary(summary)
+    except SchemaError:
+        profile = None
+    return candidate_metadata(profile, cid, name, uploaded_by)
+
+def rebuild_candidate_metadata(chunk: int = 500) -> int:
+    """Re-derive structured metadata for every stored candidate.
+
+    Only metadata is rewritten (no re-embedding).  Legacy string
+    ``upload_timestamp`` values are carried over as epoch ``uploaded_at``.
+    """
+    collection = get_collection()
+    section_collection = get_section_collection()
+    embedding_fn = get_embedding_function()
+    data = collection.get(include=["metadatas", "documents"])
+    ids, metadatas = [], []
+    for cid, meta, doc in zip(data["ids"], data["metadatas"], data["documents"]):
+        meta = meta or {}
+        uploaded_at = meta.get("uploaded_at")
+        if uploaded_at is None and isinstance(meta.get("upload_timestamp"), str):
+            try:
+                uploaded_at = datetime.fromisoformat(meta["upload_timestamp"]).timestamp()
+            except ValueError:
+                pass
+        new = build_candidate_metadata(
+            doc or "", meta.get("candidate_id", cid), meta.get("name", "Unknown"),
+            meta.get("uploaded_by", "Unknown"),
+        )
+        if uploaded_at is not None:
+            new["uploaded_at"] = int(uploaded_at)
+        if meta.get("identity"):
+            new["identity"] = meta["identity"]
+        ids.append(cid)
+        metadatas.append(new)
+    for i in range(0, len(ids), chunk):
+        collection.update(ids=ids[i:i + chunk], metadatas=metadatas[i:i + chunk])
+
+    # Candidates saved before the dedupe index existed (or before it kept
+    # summary signatures) are indexed from their summary, since the
+    # extracted text was never stored.
+    index = get_dedupe_index()
+    if index:
+        known = index.indexed_ids()
+        index.add_many(
+            dedupe_entry(cid, meta.get("name"), doc or "", "")
+            for cid, meta, doc in zip(data["ids"], metadatas, data["documents"])
+            if cid not in known
+        )
+
+    # Same for the keyword index (summary text only).
+    lexical = get_lexical_index()
+    if lexical:
+        known = lexical.indexed_ids()
+        lexical.add_many(
+            (cid, doc or "") for cid, doc in zip(data["ids"], data["documents"]) if cid not in known
+        )
+
+    # Same for the int8 sidecar when re-scoring was switched on later.
+    sidecar = get_vector_sidecar()
+    if sidecar:
+        known = sidecar.ids()
+        todo = [(cid, doc or "") for cid, doc in zip(data["ids"], data["documents"]) if cid not in known]
+        for i in range(0, len(todo), SAVE_BATCH_SIZE):
+            part = todo[i:i + SAVE_BATCH_SIZE]
+            sidecar.put_many([c for c, _ in part], embedding_fn.full([d for _, d in part]))
+
+    # And section chunks (from the summary only) in sections mode.
+    if section_collection:
+        chunked = {m["candidate_id"] for m in section_collection.get(include=["metadatas"])["metadatas"]}
+        save_sections([
+            (cid, meta.get("name", cid), doc or "", "")
+            for cid, meta, doc in zip(data["ids"], metadatas, data["documents"])
+            if cid not in chunked
+        ])
+    return len(ids)
+
 def summarize_resume(raw: str) -> str:
-    prompt = f"{PROMPT_TEMPLATE}\n\nRésumé:\n\"\"\"\n{raw[:3000]}\n\"\"\""
+    """Schema summary of one résumé.
+
+    Runs in ingest_batch's worker threads, where Streamlit calls have no
+    script context and are dropped, so errors are raised; ingest_batch
+    reports them per file from the calling thread.
+    """
     try:
-        response = openai.chat.completions.create(
-            model="gpt-4o",
-            messages=[{"role": "user", "content": prompt}],
-            temperature=0.2
+        summary, _ = summarize_map_reduce(
+            raw, get_prompt_template(), get_scheduler(), SUMMARY_MODEL, **SUMMARY_PARAMS
         )
-        return response.choices[0].message.content.strip()
     except Exception as e:
-        st.error(f"❌ OpenAI API error: {e}")
-        return ""
+        raise RuntimeError(f"OpenAI API error: {e}") from e
+    return normalize_summary(summary)
 
 # ─────────────────────────────────────────────────────────────────────
-# 5. Candidate ID generator
+# 5. Ingest cache (extracted text + summaries), stored next to PERSIST_DIR
 # ─────────────────────────────────────────────────────────────────────
-def make_candidate_id(name: str) -> str:
-    clean = re.sub(r"[^a-zA-Z0-9]", "", name.lower())
-    if not clean:
-        clean = "anonymous"
-    return f"{clean}_{datetime.now():%Y%m%d%H%M%S}"
+CACHE_PATH = os.getenv(
+    "INGEST_CACHE_PATH",
+    os.path.join(os.path.dirname(os.path.abspath(PERSIST_DIR)), "hirescope_cache.sqlite3"),
+)
+
+@_once
+def get_ingest_cache():
+    try:
+        return IngestCache(CACHE_PATH)
+    except Exception as e:
+        st.warning(f"⚠️ Ingest cache disabled ({CACHE_PATH}): {e}")
+        return None
+
+# Extractor timings/success counts live in the same SQLite file.
+@_once
+def get_extractor_stats():
+    try:
+        return ExtractorStats(CACHE_PATH)
+    except Exception:
+        return None
+
+# Duplicate-candidate index (identity keys + MinHash/LSH of résumé text)
+DEDUPE_INDEX_PATH = os.getenv(
+    "DEDUPE_INDEX_PATH",
+    os.path.join(os.path.dirname(os.path.abspath(PERSIST_DIR)), "hirescope_dedupe.sqlite3"),
+)
+
+@_once
+def get_dedupe_index():
+    if not LOCAL_INDEXES:
+        return None
+    try:
+        return DedupeIndex(DEDUPE_INDEX_PATH)
+    except Exception as e:
+        st.warning(f"⚠️ Duplicate detection disabled ({DEDUPE_INDEX_PATH}): {e}")
+        return None
+
+# Keyword (FTS5/BM25) index used next to vector search
+LEXICAL_INDEX_PATH = os.getenv(
+    "LEXICAL_INDEX_PATH",
+    os.path.join(os.path.dirname(os.path.abspath(PERSIST_DIR)), "hirescope_lexical.sqlite3"),
+)
+
+@_once
+def get_lexical_index():
+    if not LOCAL_INDEXES:
+        return None
+    try:
+        return LexicalIndex(LEXICAL_INDEX_PATH)
+    except Exception as e:
+        st.warning(f"⚠️ Keyword search disabled ({LEXICAL_INDEX_PATH}): {e}")
+        return None
+
+def lexical_text(summary: str, raw: str = "") -> str:
+    return f"{summary}\n\n{raw}" if raw else summary
+
+def dedupe_entry(cid: str, name: str, summary: str, raw: str) -> dict:
+    """Identity fields for DedupeIndex.add_many / check."""
+    try:
+        profile = parse_summary(summary)
+    except SchemaError:
+        profile = {"email": None, "phone": None}
+    return {"candidate_id": cid, "name": name, "email": profile["email"],
+            "phone": profile["phone"], "text": raw or "", "summary": summary}
+
+# ─────────────────────────────────────────────────────────────────────
+# 6. Candidate name from a summary, with heuristics when it isn't JSON
+# ─────────────────────────────────────────────────────────────────────
+def extract_candidate_name(summary: str, fallback_filename: str) -> str:
+    """Extract candidate name from structured summary JSON or fallback heuristics."""
+    
+    # Try JSON parsing first
+    try:
+        data = json.loads(summary)
+        if isinstance(data, dict) and isinstance(data.get("name"), str) and data["name"].strip():
+            return data["name"].strip()
+    except json.JSONDecodeError:
+        pass  # fallback if it's not a JSON
+
+    # Regex patterns for fallback
+    patterns = [
+        r"(?i)^name[:\-]?\s*(.+)$",
+        r"(?i)^candidate(?: name)?[:\-]?\s*(.+)$",
+        r"(?i)^full name[:\-]?\s*(.+)$",
+    ]
+    for pat in patterns:
+        m = re.search(pat, summary, re.M)
+        if m: return m.group(1).strip()
+
+    # Fallback 2: capitalized first + last name in top lines
+    for line in summary.splitlines()[:5]:
+        line = line.strip("-• \t")
+        if re.fullmatch(r"[A-Z][a-zA-Z.'-]{1,}(?:\s[A-Z][a-zA-Z.'-]{1,})+", line):
+            return line
+
+    # Fallback 3: derive from filename
+    clean_name = re.sub(r"[_-]", " ", fallback_filename).rsplit(".", 1)[0]
+    return clean_name.title()
+
+# ─────────────────────────────────────────────────────────────────────
+# 7. Candidate ID generator (deterministic, so re-ingest is an upsert)
+# ─────────────────────────────────────────────────────────────────────
+def candidate_identity(summary: str, raw: str = "") -> str:
+    """Stable identity of a résumé: normalised email, else phone, else text hash."""
+    entry = dedupe_entry("", "", summary, raw)
+    if email_key(entry["email"]):
+        return f"email:{email_key(entry['email'])}"
+    if phone_key(entry["phone"]):
+        return f"phone:{phone_key(entry['phone'])}"
+    text = re.sub(r"\s+", " ", raw or summary).strip().lower()
+    return f"text:{sha256_hex(text.encode('utf-8'))}"
+
+def make_candidate_id(identity: str) -> str:
+    return f"cand_{sha256_hex(identity.encode('utf-8'))[:16]}"
+
+def _resolve_id_collisions(records: list):
+    """Suffix IDs (``_2``, ``_3`` …) whose hash is taken by a different identity.
+
+    Records sharing both ID and identity are the same person: the last one
+    wins, as an upsert would.
+    """
+    collection = get_collection()
+    ids = sorted({r["cid"] for r in records})
+    stored = collection.get(ids=ids, include=["metadatas"]) if ids else {"ids": [], "metadatas": []}
+    owners = {cid: (meta or {}).get("identity") for cid, meta in zip(stored["ids"], stored["metadatas"])}
+
+    latest = {}
+    for r in records:
+        base, n = r["cid"], 1
+        while owners.get(r["cid"]) not in (None, r["identity"]):
+            n += 1
+            r["cid"] = f"{base}_{n}"
+            if r["cid"] not in owners:
+                stored = collection.get(ids=[r["cid"]], include=["metadatas"])
+                owners[r["cid"]] = (stored["metadatas"][0] or {}).get("identity") if stored["ids"] else None
+        owners[r["cid"]] = r["identity"]
+        latest[r["cid"]] = r
+    return list(latest.values())
+
+# ─────────────────────────────────────────────────────────────────────
+# 8. Bulk save: one delete, then one embedding call + upsert per batch
+# ─────────────────────────────────────────────────────────────────────
+SAVE_BATCH_SIZE = int(os.getenv("SAVE_BATCH_SIZE", "100"))
+
+def save_candidates(records: list, replace_ids=(), batch_size: int = SAVE_BATCH_SIZE) -> list:
+    """Write staged candidates to the collection and the dedupe index.
+
+    ``records`` are dicts with ``cid``, ``name``, ``summary``, ``raw`` and
+    ``uploaded_by``.  ``replace_ids`` (stored candidates being overwritten
+    or merged) are deleted in a single call first.  Returns the records as
+    saved; a record's ``cid`` may gain a suffix on a hash collision.
+    """
+    collection = get_collection()
+    section_collection = get_section_collection()
+    embedding_fn = get_embedding_function()
+    chroma_client = get_chroma_client()
+    for r in records:
+        r.setdefault("identity", candidate_identity(r["summary"], r.get("raw") or ""))
+        r.setdefault("cid", make_candidate_id(r["identity"]))
+    records = _resolve_id_collisions(records)
+
+    index = get_dedupe_index()
+    sidecar = get_vector_sidecar()
+    lexical = get_lexical_index()
+    replace_ids = sorted(set(replace_ids) - {r["cid"] for r in records})
+    if replace_ids:
+        collection.delete(ids=replace_ids)
+        delete_candidate_vectors(replace_ids)
+    if section_collection and records:
+        # Re-saved candidates may now have fewer chunks than before.
+        section_collection.delete(where={"candidate_id": {"$in": [r["cid"] for r in records]}})
+
+    for i in range(0, len(records), batch_size):
+        batch = records[i:i + batch_size]
+        documents = [r["summary"] for r in batch]
+        full = embedding_fn.full(documents)
+        collection.upsert(
+            ids=[r["cid"] for r in batch],
+            documents=documents,
+            embeddings=embedding_fn.reduce(full).tolist(),
+            metadatas=[
+                dict(build_candidate_metadata(r["summary"], r["cid"], r["name"], r["uploaded_by"]),
+                     identity=r["identity"])
+                for r in batch
+            ],
+        )
+        if index:
+            index.add_many(dedupe_entry(r["cid"], r["name"], r["summary"], r.get("raw")) for r in batch)
+        if sidecar:
+            sidecar.put_many([r["cid"] for r in batch], full)
+        if lexical:
+            lexical.add_many((r["cid"], lexical_text(r["summary"], r.get("raw") or "")) for r in batch)
+        if section_collection:
+            save_sections([(r["cid"], r["name"], r["summary"], r.get("raw") or "") for r in batch])
+
+    if hasattr(chroma_client, "persist"):
+        chroma_client.persist()
+    return records
+
+def save_sections(candidates: list):
+    """Upsert section chunks for ``(cid, name, summary, raw)`` tuples."""
+    section_collection = get_section_collection()
+    ids, documents, metadatas = [], [], []
+    for cid, name, summary, raw in candidates:
+        chunks = chunk_records(cid, name, summary, raw)
+        ids += chunks["ids"]
+        documents += chunks["documents"]
+        metadatas += chunks["metadatas"]
+    for i in range(0, len(ids), SAVE_BATCH_SIZE):
+        section_collection.upsert(
+            ids=ids[i:i + SAVE_BATCH_SIZE],
+            documents=documents[i:i + SAVE_BATCH_SIZE],
+            metadatas=metadatas[i:i + SAVE_BATCH_SIZE],
+        )
+
+def delete_candidate_vectors(candidate_ids):
+    """Drop side indexes (dedupe, keyword, int8, sections) for deleted candidates."""
+    section_collection = get_section_collection()
+    candidate_ids = sorted(set(candidate_ids))
+    if not candidate_ids:
+        return
+    index = get_dedupe_index()
+    if index:
+        index.remove_many(candidate_ids)
+    lexical = get_lexical_index()
+    if lexical:
+        lexical.remove_many(candidate_ids)
+    sidecar = get_vector_sidecar()
+    if sidecar:
+        sidecar.remove_many(candidate_ids)
+    if section_collection:
+        section_collection.delete(where={"candidate_id": {"$in": candidate_ids}})
+
+# ─────────────────────────────────────────────────────────────────────
+# 9. Retrieval: vector + keyword legs in parallel, fused by rank
+# ─────────────────────────────────────────────────────────────────────
+HYBRID_FETCH = int(os.getenv("HYBRID_FETCH", "2"))   # per-leg depth, × n_results
+_search_pool = ThreadPoolExecutor(max_workers=4, thread_name_prefix="search")
+
+def _timed(fn, *args):
+    start = time.perf_counter()
+    result = fn(*args)
+    return result, 1000 * (time.perf_counter() - start)
+
+@_once
+def get_reranker():
+    try:
+        return make_reranker()
+    except Exception as e:
+        st.warning(f"⚠️ Re-ranking disabled: {e}")
+        return None
+
+def search_candidates(query: str, n_results: int, where=None, rerank: bool = True) -> dict:
+    """Hybrid search for one text, in ``collection.query`` result shape.
+
+    The vector leg (``vector_search``) and the keyword leg (BM25 over the
+    lexical index) each return ``HYBRID_FETCH`` × the wanted count and run
+    concurrently; their rankings are merged by reciprocal-rank fusion.
+    With a re-ranker, ``RERANK_OVERFETCH`` × ``n_results`` fused hits are
+    re-scored and the best ``n_results`` at or above ``RERANK_MIN_SCORE``
+    kept (``rerank_scores``).  ``timings`` holds per-stage milliseconds.
+    Distances are the vector leg's (``None`` for keyword-only hits).
+    """
+    collection = get_collection()
+    start = time.perf_counter()
+    lexical = get_lexical_index()
+    sidecar = get_vector_sidecar()
+    reranker = get_reranker() if rerank else None
+    wanted = n_results * RERANK_OVERFETCH if reranker else n_results
+    depth = wanted * HYBRID_FETCH if lexical else wanted
+    vector = _search_pool.submit(_timed, vector_search, query, depth, where, sidecar)
+    keyword = _search_pool.submit(_timed, lexical.search, query, depth * 4 if where else depth) if lexical else None
+
+    hits, vector_ms = vector.result()
+    timings = {"vector_ms": vector_ms}
+    rows = {
+        cid: (doc, meta, dist)
+        for cid, doc, meta, dist in zip(hits["ids"][0], hits["documents"][0], hits["metadatas"][0], hits["distances"][0])
+    }
+    ranked = hits["ids"][0]
+    if keyword is not None:
+        lexical_hits, timings["lexical_ms"] = keyword.result()
+        lexical_ids = [cid for cid, _ in lexical_hits]
+        if where and lexical_ids:
+            allowed = set(collection.get(ids=lexical_ids, where=where, include=[])["ids"])
+            lexical_ids = [cid for cid in lexical_ids if cid in allowed]
+        lexical_ids = lexical_ids[:depth]
+
+        ranked = [cid for cid, _ in reciprocal_rank_fusion([ranked, lexical_ids])][:wanted]
+        missing = [cid for cid in ranked if cid not in rows]
+        if missing:
+            extra = collection.get(ids=missing, include=["documents", "metadatas"])
+            for cid, doc, meta in zip(extra["ids"], extra["documents"], extra["metadatas"]):
+                rows[cid] = (doc, meta, None)
+        ranked = [cid for cid in ranked if cid in rows]   # keyword hits deleted since indexing
+
+    result = {}
+    if reranker and ranked:
+        scores, timings["rerank_ms"] = _timed(reranker.score, query, [rows[cid][0] for cid in ranked])
+        order = sorted(zip(ranked, scores), key=lambda pair: -pair[1])
+        order = [(cid, sc) for cid, sc in order if sc >= RERANK_MIN_SCORE][:n_results]
+        ranked = [cid for cid, _ in order]
+        result["rerank_scores"] = [[sc for _, sc in order]]
+    else:
+        ranked = ranked[:n_results]
+
+    timings["total_ms"] = 1000 * (time.perf_counter() - start)
+    result.update({
+        "ids": [ranked],
+        "documents": [[rows[cid][0] for cid in ranked]],
+        "metadatas": [[rows[cid][1] for cid in ranked]],
+        "distances": [[rows[cid][2] for cid in ranked]],
+        "timings": timings,
+    })
+    return result
+
+def keyword_matches(text: str):
+    """IDs of every candidate whose text contains ``text`` as a phrase, best (BM25) first.
+
+    ``None`` when there is no keyword index (e.g. CHROMA_MODE=http).
+    """
+    lexical = get_lexical_index()
+    if not lexical:
+        return None
+    return [cid for cid, _ in lexical.search(text, max(1, get_collection().count()), phrase=True)]
+
+def timings_caption(timings: dict) -> str:
+    """``vector 120 ms · keyword 3 ms · rerank 1 ms · total 125 ms · first token 410 ms · answer 5200 ms``."""
+    legs = [("vector", "vector_ms"), ("keyword", "lexical_ms"), ("rerank", "rerank_ms"), ("total", "total_ms"),
+            ("first token", "first_token_ms"), ("answer", "generation_ms"), ("answer cache", "answer_cache_ms")]
+    caption = " · ".join(f"{label} {timings[key]:.0f} ms" for label, key in legs if key in timings)
+    return caption + (" · cached answer" if timings.get("answer_cached") else "")
+
+def scheduler_caption() -> str:
+    """Counters of the shared OpenAI scheduler (llm.py) since the process started."""
+    s = get_scheduler().stats
+    return (f"OpenAI: {s['requests']} requests · {s['retries']} retries ({s['rate_limited']} rate-limited) · "
+            f"{s['failures']} failed · {s['in_flight']} in flight (peak {s['peak_in_flight']})")
+
+def vector_search(query: str, n_results: int, where=None, sidecar=None) -> dict:
+    """``collection.query`` for one text, same result shape.
+
+    With the int8 ``sidecar``, ``RESCORE_OVERFETCH`` × ``n_results`` hits
+    are fetched from the (reduced) index and re-ranked by cosine against
+    the full-size query vector.  In sections mode, see ``search_sections``.
+    """
+    collection = get_collection()
+    section_collection = get_section_collection()
+    embedding_fn = get_embedding_function()
+    if section_collection:
+        return search_sections(query, n_results, where)
+    full = embedding_fn.full([query])
+    fetch = n_results * RESCORE_OVERFETCH if sidecar else n_results
+    hits = collection.query(
+        query_embeddings=embedding_fn.reduce(full).tolist(),
+        n_results=max(1, min(fetch, collection.count())),
+        where=where,
+        include=["documents", "metadatas", "distances"],
+    )
+    if not sidecar or not hits["ids"][0]:
+        return hits
+
+    # The collection uses squared L2 on unit vectors, i.e. 2 - 2·cos; IDs
+    # missing from the sidecar keep their index distance.
+    scores = sidecar.score(full[0], hits["ids"][0])
+    rows = [
+        (cid, doc, meta, 2 - 2 * scores[cid] if cid in scores else dist)
+        for cid, doc, meta, dist in zip(
+            hits["ids"][0], hits["documents"][0], hits["metadatas"][0], hits["distances"][0]
+        )
+    ]
+    rows.sort(key=lambda r: r[3])
+    rows = rows[:n_results]
+    return {
+        "ids": [[r[0] for r in rows]],
+        "documents": [[r[1] for r in rows]],
+        "metadatas": [[r[2] for r in rows]],
+        "distances": [[r[3] for r in rows]],
+    }
+
+def search_sections(query: str, n_results: int, where=None) -> dict:
+    """Match section chunks, collapse them to candidates.
+
+    Each result document holds only that candidate's best-matching chunks
+    (at most ``SECTION_CHUNKS_PER_CANDIDATE``); its distance is the best
+    chunk's.  ``where`` filters on candidate metadata.
+    """
+    collection = get_collection()
+    section_collection = get_section_collection()
+    embedding_fn = get_embedding_function()
+    chunk_where = None
+    if where:
+        allowed = collection.get(where=where, include=[])["ids"]
+        if not allowed:
+            return {"ids": [[]], "documents": [[]], "metadatas": [[]], "distances": [[]]}
+        chunk_where = {"candidate_id": {"$in": allowed}}
+    total = section_collection.count()
+    if not total:
+        return {"ids": [[]], "documents": [[]], "metadatas": [[]], "distances": [[]]}
+    hits = section_collection.query(
+        query_embeddings=embedding_fn([query]),
+        n_results=min(n_results * SECTION_OVERFETCH, total),
+        where=chunk_where,
+        include=["documents", "metadatas", "distances"],
+    )
+
+    grouped = {}   # candidate_id -> (best distance, [chunks]); dicts keep rank order
+    for doc, meta, dist in zip(hits["documents"][0], hits["metadatas"][0], hits["distances"][0]):
+        cid = meta["candidate_id"]
+        best, chunks = grouped.setdefault(cid, (dist, []))
+        if len(chunks) < SECTION_CHUNKS_PER_CANDIDATE:
+            chunks.append(doc)
+        if len(grouped) > n_results:
+            grouped.pop(cid)
+            break
+
+    ids = list(grouped)
+    metas = collection.get(ids=ids, include=["metadatas"]) if ids else {"ids": [], "metadatas": []}
+    meta_of = dict(zip(metas["ids"], metas["metadatas"]))
+    ids = [cid for cid in ids if cid in meta_of]   # chunks of since-deleted candidates
+    return {
+        "ids": [ids],
+        "documents": [[
+            f"Candidate: {(meta_of[cid] or {}).get('name', cid)}\n" + "\n\n".join(grouped[cid][1])
+            for cid in ids
+        ]],
+        "metadatas": [[meta_of[cid] for cid in ids]],
+        "distances": [[grouped[cid][0] for cid in ids]],
+    }
+
+# ─────────────────────────────────────────────────────────────────────
+# 10. Semantic answer cache for the chat pages (see answer_cache.py)
+# ─────────────────────────────────────────────────────────────────────
+ANSWER_CACHE_PATH = os.getenv(
+    "ANSWER_CACHE_PATH",
+    os.path.join(os.path.dirname(os.path.abspath(PERSIST_DIR)), "hirescope_answers.sqlite3"),
+)
+
+@_once
+def get_answer_cache():
+    if not ANSWER_CACHE:
+        return None
+    try:
+        return AnswerCache(ANSWER_CACHE_PATH)
+    except Exception as e:
+        st.warning(f"⚠️ Answer cache disabled ({ANSWER_CACHE_PATH}): {e}")
+        return None
+
+def cached_answer(pipeline: str, history: list, query: str, hits: dict):
+    """Earlier answer to a near-identical question over the same candidates, or ``None``.
+
+    ``history`` is the conversation before ``query``; ``hits`` comes from
+    search_candidates and gets ``answer_cache_ms`` (and ``answer_cached``
+    on a hit) added to its timings.
+    """
+    cache = get_answer_cache()
+    if not cache:
+        return None
+    start = time.perf_counter()
+    scope = answer_scope(pipeline, history, hits["ids"][0], hits["documents"][0])
+    found = cache.get(scope, get_embedding_function().full([query])[0])
+    hits["timings"]["answer_cache_ms"] = 1000 * (time.perf_counter() - start)
+    if found is None:
+        return None
+    hits["timings"]["answer_cached"] = True
+    return found[0]
+
+def remember_answer(pipeline: str, history: list, query: str, hits: dict, answer: str):
+    """Store a freshly generated answer (needs ``generation_ms`` in the timings)."""
+    cache = get_answer_cache()
+    generation_ms = hits["timings"].get("generation_ms")
+    if not cache or not answer or generation_ms is None:
+        return
+    scope = answer_scope(pipeline, history, hits["ids"][0], hits["documents"][0])
+    cache.put(scope, query, get_embedding_function().full([query])[0], answer, generation_ms)
+
+def answer_cache_caption() -> str:
+    cache = get_answer_cache()
+    if not cache:
+        return ""
+    s = cache.stats()
+    return (f"Answer cache: {s['hits']} / {s['lookups']} hits ({s['hit_rate']:.0%}) · "
+            f"{s['saved_s']:.0f} s of generation saved")
@@ -0,0 +1,117 @@
+# vector_benchmark.py – recall vs. memory of reduced / int8 vector storage
+#
+# Embeds the stored résumé summaries and a set of recruiter queries once at
+# full size, then compares each storage option against exact full-size
+# search (the ground truth):
+#
+#   float32 @ D          – truncated, re-normalised vectors in the index
+#   float32 @ D + int8   – same, shortlist of k × overfetch re-scored
+#                          against the int8 full-size sidecar
+#
+# Search here is exact (brute force), so the numbers isolate the effect of
+# the representation; HNSW approximation comes on top in production.
+# Memory is per vector: index payload plus an HNSW link estimate, and the
+# sidecar row when used.
+#
+# Usage (from the repository root):
+#   python src/vector_benchmark.py --k 10 --dims 256 512 1024
+#   python src/vector_benchmark.py --queries queries.txt
+
+import argparse
+import sys
+from typing import Dict, List
+
+import numpy as np
+
+from embeddings import RESCORE_OVERFETCH, quantize_int8, reduce_dimensions
+
+HNSW_M = 16                       # Chroma default
+HNSW_LINK_BYTES = 2 * HNSW_M * 4  # layer-0 neighbour list, rough per-vector estimate
+
+DEFAULT_QUERIES = [
+    "Python developer with AWS and Docker experience",
+    "Data scientist with NLP and deep learning background",
+    "Frontend engineer React TypeScript",
+    "Java Spring Boot microservices backend developer",
+    "DevOps engineer Kubernetes Terraform CI/CD",
+    "Project manager with Agile and Scrum certification",
+    "Machine learning engineer with MLOps experience",
+    "SQL data analyst Power BI Tableau",
+    "Android mobile developer Kotlin",
+    "Kubernetes in the last job",
+    "Candidates with more than 5 years of experience in finance",
+    "Fresh graduate computer science internship",
+]
+
+
+def top_k(docs: np.ndarray, query: np.ndarray, k: int) -> np.ndarray:
+    return np.argsort(-(docs @ query))[:k]
+
+
+def benchmark(docs: np.ndarray, queries: np.ndarray, k: int, dims: List[int],
+              overfetch: int = RESCORE_OVERFETCH) -> List[Dict]:
+    """One row per storage option: mean recall@k and bytes per vector."""
+    full_dims = docs.shape[1]
+    docs = docs / np.linalg.norm(docs, axis=1, keepdims=True)
+    queries = queries / np.linalg.norm(queries, axis=1, keepdims=True)
+    k = min(k, len(docs))
+    truth = [set(top_k(docs, q, k)) for q in queries]
+
+    q8, scale = quantize_int8(docs)
+    docs8 = q8.astype(np.float32) * scale[:, None]
+    docs8 /= np.linalg.norm(docs8, axis=1, keepdims=True)
+    sidecar_bytes = full_dims + 4
+
+    def recall(found):
+        return float(np.mean([len(set(f) & t) / k for f, t in zip(found, truth)]))
+
+    rows = [{"storage": f"float32 @ {full_dims}", "recall": 1.0,
+             "bytes": full_dims * 4 + HNSW_LINK_BYTES}]
+    for d in sorted(set(dims)):
+        if d >= full_dims:
+            continue
+        small = reduce_dimensions(docs, d)
+        small_q = reduce_dimensions(queries, d)
+        shortlists = [top_k(small, q, k * overfetch) for q in small_q]
+        rows.append({"storage": f"float32 @ {d}", "recall": recall(s[:k] for s in shortlists),
+                     "bytes": d * 4 + HNSW_LINK_BYTES})
+        rescored = [s[np.argsort(-(docs8[s] @ q))][:k] for s, q in zip(shortlists, queries)]
+        rows.append({"storage": f"float32 @ {d} + int8 rescore", "recall": recall(rescored),
+                     "bytes": d * 4 + HNSW_LINK_BYTES + sidecar_bytes})
+    return rows
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Recall@k and memory of reduced / int8 vector storage.")
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--dims", type=int, nargs="+", default=[256, 512, 1024])
+    parser.add_argument("--overfetch", type=int, default=RESCORE_OVERFETCH)
+    parser.add_argument("--queries", help="text file with one query per line")
+    args = parser.parse_args(argv)
+
+    from utils import collection, embedding_fn
+
+    queries = DEFAULT_QUERIES
+    if args.queries:
+        with open(args.queries, encoding="utf-8") as f:
+            queries = [line.strip() for line in f if line.strip()]
+    documents = collection.get(include=["documents"])["documents"]
+    if not documents:
+        print("The collection is empty; ingest some résumés first.", file=sys.stderr)
+        return 1
+
+    print(f"Embedding {len(documents)} documents and {len(queries)} queries at full size...", flush=True)
+    docs = embedding_fn.full(documents)
+    qs = embedding_fn.full(queries)
+
+    rows = benchmark(docs, qs, args.k, args.dims, args.overfetch)
+    base = rows[0]["bytes"]
+    print(f"\n{'storage':<32} {'recall@' + str(args.k):>10} {'bytes/vec':>10} {'vs full':>8}")
+    for r in rows:
+        print(f"{r['storage']:<32} {r['recall']:>10.3f} {r['bytes']:>10} {r['bytes'] / base:>8.0%}")
+    print(f"\nAt {len(documents)} candidates: full index ≈ {base * len(documents) / 1e6:.1f} MB.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,135 @@
+# vectorstore.py – Chroma client construction and health checks for HireScope
+#
+# CHROMA_MODE selects where the vectors live:
+#
+#   embedded  – PersistentClient on CHROMA_DB_DIR (default); one process
+#               owns the SQLite / HNSW files
+#   http      – HttpClient to a Chroma server at CHROMA_HOST:CHROMA_PORT,
+#               so several app replicas share one store.  Requests go
+#               through one keep-alive connection pool per process
+#               (CHROMA_POOL_SIZE) with CHROMA_TIMEOUT seconds per request
+#   memory    – in-process, non-persistent; for demos and tests only
+#
+# A store that cannot be opened is an error.  Falling back to memory (and
+# losing every write on restart) only happens with CHROMA_MEMORY_FALLBACK=1.
+#
+# Usage (from the repository root), against e.g. `chroma run --port 8000`:
+#   CHROMA_MODE=http python src/vectorstore.py
+# tests/test_vectorstore.py starts such a server and round-trips data
+# through http mode.
+
+import json
+import os
+import sys
+import time
+from typing import Dict, Optional
+
+import chromadb
+from chromadb.config import Settings
+
+CHROMA_MODE = os.getenv("CHROMA_MODE", "embedded").lower()
+CHROMA_HOST = os.getenv("CHROMA_HOST", "localhost")
+CHROMA_PORT = int(os.getenv("CHROMA_PORT", "8000"))
+CHROMA_SSL = os.getenv("CHROMA_SSL", "0") == "1"
+CHROMA_AUTH_TOKEN = os.getenv("CHROMA_AUTH_TOKEN", "")
+CHROMA_TIMEOUT = float(os.getenv("CHROMA_TIMEOUT", "10"))
+CHROMA_CONNECT_TIMEOUT = float(os.getenv("CHROMA_CONNECT_TIMEOUT", "3"))
+CHROMA_POOL_SIZE = int(os.getenv("CHROMA_POOL_SIZE", "20"))
+CHROMA_CONNECT_RETRIES = int(os.getenv("CHROMA_CONNECT_RETRIES", "3"))
+CHROMA_MEMORY_FALLBACK = os.getenv("CHROMA_MEMORY_FALLBACK", "0") == "1"
+
+
+class StoreUnavailable(RuntimeError):
+    """The configured Chroma store could not be opened."""
+
+
+def _http_client():
+    headers = {"Authorization": f"Bearer {CHROMA_AUTH_TOKEN}"} if CHROMA_AUTH_TOKEN else None
+    settings = Settings(
+        anonymized_telemetry=False,
+        chroma_http_max_connections=CHROMA_POOL_SIZE,
+        chroma_http_max_keepalive_connections=CHROMA_POOL_SIZE,
+    )
+    client = chromadb.HttpClient(
+        host=CHROMA_HOST, port=CHROMA_PORT, ssl=CHROMA_SSL, headers=headers, settings=settings
+    )
+    # Chroma creates its httpx session without a timeout; a hung server
+    # would otherwise block the page forever.
+    session = getattr(getattr(client, "_server", None), "_session", None)
+    if session is not None:
+        import httpx
+        session.timeout = httpx.Timeout(CHROMA_TIMEOUT, connect=CHROMA_CONNECT_TIMEOUT)
+    return client
+
+
+def _connect_http():
+    """HttpClient whose server answered a heartbeat, retried with backoff."""
+    last = None
+    for attempt in range(max(1, CHROMA_CONNECT_RETRIES)):
+        try:
+            client = _http_client()
+            client.heartbeat()
+            return client
+        except Exception as e:
+            last = e
+            time.sleep(min(0.5 * 2 ** attempt, 5))
+    raise StoreUnavailable(
+        f"Chroma server at {CHROMA_HOST}:{CHROMA_PORT} is unreachable: {last}"
+    ) from last
+
+
+def open_client(persist_dir: str, mode: str = CHROMA_MODE):
+    """``(client, warning)``; ``warning`` is set when the memory fallback is used."""
+    if mode == "memory":
+        return chromadb.EphemeralClient(), None
+    try:
+        if mode == "http":
+            return _connect_http(), None
+        if mode != "embedded":
+            raise ValueError(f"Unknown CHROMA_MODE {mode!r} (expected 'embedded', 'http' or 'memory').")
+        try:
+            os.makedirs(persist_dir, exist_ok=True)
+            return chromadb.PersistentClient(path=persist_dir), None
+        except PermissionError as e:
+            raise StoreUnavailable(f"No write access to {persist_dir}.") from e
+    except StoreUnavailable as e:
+        if not CHROMA_MEMORY_FALLBACK:
+            raise
+        return chromadb.EphemeralClient(), f"{e} Using in-memory ChromaDB; nothing will be persisted."
+
+
+def describe_store(persist_dir: str, mode: str = CHROMA_MODE) -> str:
+    if mode == "http":
+        scheme = "https" if CHROMA_SSL else "http"
+        return f"{scheme}://{CHROMA_HOST}:{CHROMA_PORT}"
+    return "in-memory" if mode == "memory" else persist_dir
+
+
+def check_health(client) -> Dict:
+    """``{ok, latency_ms, error?}`` from one heartbeat round trip."""
+    start = time.perf_counter()
+    try:
+        client.heartbeat()
+        return {"ok": True, "latency_ms": 1000 * (time.perf_counter() - start)}
+    except Exception as e:
+        return {"ok": False, "latency_ms": 1000 * (time.perf_counter() - start), "error": str(e)}
+
+
+def main(persist_dir: Optional[str] = None) -> int:
+    persist_dir = persist_dir or os.getenv("CHROMA_DB_DIR", "./chroma_store")
+    print(f"Chroma store: {CHROMA_MODE} ({describe_store(persist_dir)})")
+    try:
+        client, warning = open_client(persist_dir)
+    except Exception as e:
+        print(f"unavailable: {e}", file=sys.stderr)
+        return 1
+    if warning:
+        print(f"warning: {warning}", file=sys.stderr)
+    health = check_health(client)
+    health["collections"] = {c.name: c.count() for c in client.list_collections()} if health["ok"] else {}
+    print(json.dumps(health, indent=2))
+    return 0 if health["ok"] else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,5 @@
+import os
+import sys
+
+# The app modules live flat in src/ (Streamlit puts it on sys.path).
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src"))
@@ -0,0 +1,42 @@
+from answer_cache import AnswerCache, answer_scope
+
+IDS = ["alice", "bob"]
+DOCS = ["Go and Kafka engineer", "SAP FICO consultant"]
+
+
+def chat(*contents):
+    roles = ["user", "assistant"]
+    return [{"role": "system", "content": "context"}] + [
+        {"role": roles[i % 2], "content": c} for i, c in enumerate(contents)
+    ]
+
+
+def test_scope_follows_the_retrieved_text():
+    scope = answer_scope("query-bot", chat(), IDS, DOCS)
+
+    assert answer_scope("query-bot", chat(), IDS[::-1], DOCS[::-1]) == scope
+    assert answer_scope("query-bot", chat(), IDS, ["Go, Kafka and Rust engineer", DOCS[1]]) != scope
+    assert answer_scope("query-bot", chat(), IDS[:1], DOCS[:1]) != scope
+    assert answer_scope("hr-chat", chat(), IDS, DOCS) != scope
+
+
+def test_scope_only_counts_the_last_turns():
+    recent = chat("who knows Go?", "Alice.")
+    longer = chat("who knows SAP?", "Bob.", "who knows Go?", "Alice.")
+
+    assert answer_scope("query-bot", longer, IDS, DOCS) == answer_scope("query-bot", recent, IDS, DOCS)
+    assert answer_scope("query-bot", longer, IDS, DOCS, history_turns=4) != \
+        answer_scope("query-bot", recent, IDS, DOCS, history_turns=4)
+    assert answer_scope("query-bot", recent, IDS, DOCS, history_turns=0) == answer_scope("query-bot", chat(), IDS, DOCS)
+
+
+def test_similar_question_in_the_same_scope_is_a_hit(tmp_path):
+    cache = AnswerCache(str(tmp_path / "answers.sqlite3"), threshold=0.95)
+    scope = answer_scope("query-bot", chat(), IDS, DOCS)
+    cache.put(scope, "Who knows Kafka?", [1.0, 0.0], "Alice.", generation_ms=4000)
+
+    assert cache.get(scope, [0.99, 0.05])[0] == "Alice."
+    assert cache.get(scope, [0.0, 1.0]) is None
+    assert cache.get("other scope", [1.0, 0.0]) is None
+    stats = cache.stats()
+    assert (stats["hits"], stats["lookups"], stats["saved_s"]) == (1, 3, 4.0)
@@ -0,0 +1,109 @@
+import json
+import sys
+import types
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+import bulk_ingest
+import ingest
+from batch import ReplayBatchBackend
+from cache import IngestCache, sha256_hex
+
+RESUMES = {
+    "alice.pdf": "Alice Rao\nGo and Kafka engineer",
+    "bob.pdf": "Bob Smith\nSAP FICO consultant",
+    "blank.pdf": "   ",                 # no text: fails at extraction
+    "carol.pdf": "Carol White\nData analyst",  # empty batch answer: fails at collection
+}
+
+
+def fake_extract(pdf_bytes, snapshot=None):
+    return pdf_bytes.decode("utf-8"), {"bucket": "test", "methods": []}
+
+
+def answer(custom_id, body):
+    text = body["messages"][0]["content"]
+    if "Carol" in text:
+        return ""
+    return json.dumps({"name": text.splitlines()[0]})
+
+
+@pytest.fixture
+def app(tmp_path, monkeypatch):
+    """The slice of the Streamlit app module bulk_ingest calls into."""
+    monkeypatch.setattr(ingest, "ProcessPoolExecutor", ThreadPoolExecutor)
+    monkeypatch.setattr(ingest, "extract_with_report", fake_extract)
+    cache = IngestCache(str(tmp_path / "cache.sqlite3"))
+    saved = []
+
+    def summarize_resume(raw):
+        raise AssertionError("batch mode must not make live summary calls")
+
+    utils = types.ModuleType("utils")
+    utils.__dict__.update(
+        SUMMARY_MODEL="gpt-4o",
+        SUMMARY_PARAMS={"temperature": 0.2},
+        summary_messages=lambda raw: [{"role": "user", "content": raw}],
+        summarize_resume=summarize_resume,
+        normalize_summary=str.strip,
+        extract_candidate_name=lambda summary, fallback: json.loads(summary)["name"],
+        candidate_identity=lambda summary, raw="": summary,
+        make_candidate_id=lambda identity: sha256_hex(identity)[:16],
+        get_ingest_cache=lambda: cache,
+        get_extractor_stats=lambda: None,
+        get_summary_fingerprint=lambda pipeline="map-reduce": f"test-{pipeline}",
+        save_candidates=lambda records, **kw: saved.extend(records),
+    )
+    monkeypatch.setitem(sys.modules, "utils", utils)
+    return types.SimpleNamespace(cache=cache, saved=saved)
+
+
+class RecordingBackend(ReplayBatchBackend):
+    """Replay backend that snapshots the manifest as the job moves along."""
+
+    def __init__(self, manifest, **kwargs):
+        super().__init__(**kwargs)
+        self.manifest = manifest
+        self.seen = []
+
+    def submit(self, jsonl):
+        self.seen.append(("submit", self.manifest.counts()))
+        return super().submit(jsonl)
+
+    def status(self, job_id):
+        self.seen.append(("status", self.manifest.counts()))
+        return super().status(job_id)
+
+
+def test_batch_mode_moves_files_through_every_manifest_stage(app, tmp_path):
+    folder = tmp_path / "export"
+    folder.mkdir()
+    for name, text in RESUMES.items():
+        (folder / name).write_bytes(text.encode("utf-8"))
+    source = bulk_ingest.Source(str(folder))
+    manifest = bulk_ingest.Manifest(str(tmp_path / "manifest.sqlite3"))
+    manifest.register(source.keys())
+    backend = RecordingBackend(manifest, responder=answer)
+    args = types.SimpleNamespace(uploaded_by="ATS backfill", chunk_size=10, poll_seconds=0)
+
+    code = bulk_ingest.run_batch_mode(source, manifest, args, backend)
+
+    assert code == 1
+    assert backend.seen == [
+        ("submit", {"extracted": 3, "failed": 1}),
+        ("status", {"submitted": 3, "failed": 1}),
+    ]
+    assert manifest.counts() == {"saved": 2, "failed": 2}
+    errors = dict(manifest.conn.execute("SELECT key, error FROM files WHERE stage='failed'"))
+    assert errors == {"blank.pdf": "No text could be extracted.", "carol.pdf": "AI summary was empty."}
+    assert sorted((r["name"], r["uploaded_by"]) for r in app.saved) == [
+        ("Alice Rao", "ATS backfill"), ("Bob Smith", "ATS backfill"),
+    ]
+    # Batch answers are cached under the trim pipeline's fingerprint.
+    alice = sha256_hex(RESUMES["alice.pdf"].encode("utf-8"))
+    assert app.cache.get_summary(alice, "test-trim") == '{"name": "Alice Rao"}'
+
+    # A second run finds nothing to submit or save.
+    assert bulk_ingest.run_batch_mode(source, manifest, args, backend) == 0
+    assert len(backend.jobs) == 1 and len(app.saved) == 2
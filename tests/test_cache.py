@@ -0,0 +1,29 @@
+import itertools
+import types
+
+import cache
+from cache import IngestCache
+
+
+def test_least_recently_used_entries_are_evicted_first(tmp_path, monkeypatch):
+    clock = itertools.count(1)
+    monkeypatch.setattr(cache, "time", types.SimpleNamespace(time=lambda: next(clock)))
+    store = IngestCache(str(tmp_path / "cache.sqlite3"), max_bytes=25)
+
+    store.put_text("a", "x" * 10)
+    store.put_text("b", "y" * 10)
+    assert store.get_text("a") == "x" * 10      # a is now fresher than b
+    store.put_text("c", "z" * 10)               # 30 bytes > 25: evict one
+
+    assert store.get_text("b") is None
+    assert store.get_text("a") == "x" * 10 and store.get_text("c") == "z" * 10
+    assert store.stats()["text"] == {"hits": 3, "misses": 1, "entries": 2, "bytes": 20}
+
+
+def test_summaries_are_keyed_by_fingerprint(tmp_path):
+    store = IngestCache(str(tmp_path / "cache.sqlite3"))
+
+    store.put_summary("pdf", "map-reduce:v1", '{"name": "A"}')
+
+    assert store.get_summary("pdf", "map-reduce:v1") == '{"name": "A"}'
+    assert store.get_summary("pdf", "trim:v1") is None
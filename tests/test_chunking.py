@@ -0,0 +1,20 @@
+from chunking import candidate_chunks
+
+SUMMARY = "not a schema summary"
+
+
+def test_raw_sections_are_chunked_without_the_contact_header():
+    raw = "Jane Doe\njane@example.com\n\nExperience\nAcme Corp, 2019-2024\n\nSkills\nPython, SQL"
+
+    sections = [name for name, _ in candidate_chunks(SUMMARY, raw)]
+
+    assert sections == ["summary", "experience", "skills"]
+
+
+def test_raw_text_without_headings_is_indexed_as_one_section():
+    raw = "Jane Doe\njane@example.com\n\nBuilt payment APIs at Acme Corp in Go and Kafka."
+
+    chunks = candidate_chunks(SUMMARY, raw)
+
+    assert [name for name, _ in chunks] == ["summary", "other"]
+    assert "Kafka" in chunks[1][1]
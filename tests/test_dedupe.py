@@ -0,0 +1,60 @@
+import sqlite3
+
+from dedupe import DedupeIndex
+
+RAW = (
+    "Jane Doe. Senior backend engineer at Acme Corp since 2019, building payment APIs in Go "
+    "with Kafka and PostgreSQL. Previously data engineer at Initech working on Spark pipelines "
+    "and Airflow scheduling. B.Tech in computer science from IIT Madras, 2014."
+)
+SUMMARY = '{"name": "Jane Doe", "skills": ["Go", "Kafka", "PostgreSQL", "Spark", "Airflow"], "org": "Acme Corp"}'
+OTHER = "Ravi Kumar. SAP FICO consultant with eleven years of S/4HANA finance implementations for retail clients."
+
+
+def entry(cid, text="", summary="", email=None, phone=None, name=None):
+    return {"candidate_id": cid, "email": email, "phone": phone, "name": name, "text": text, "summary": summary}
+
+
+def test_same_email_is_an_exact_match(tmp_path):
+    index = DedupeIndex(str(tmp_path / "dedupe.sqlite3"))
+    index.add_many([entry("jane", RAW, SUMMARY, email="Jane.Doe@example.com")])
+
+    found = index.check("jane.doe+jobs@example.com", None, "Jane Doe", OTHER, "{}")
+
+    assert [(m["candidate_id"], m["kind"], m["reason"]) for m in found] == [("jane", "exact", "email")]
+
+
+def test_updated_cv_is_a_near_match_and_unrelated_text_is_not(tmp_path):
+    index = DedupeIndex(str(tmp_path / "dedupe.sqlite3"))
+    index.add_many([entry("jane", RAW, SUMMARY), entry("ravi", OTHER, '{"name": "Ravi Kumar"}')])
+
+    updated = RAW + " Speaks at GopherCon."
+    found = index.check(None, None, None, updated, SUMMARY)
+
+    assert [(m["candidate_id"], m["kind"]) for m in found] == [("jane", "near")]
+    assert found[0]["similarity"] >= 0.8
+
+
+def test_summary_only_candidates_are_compared_by_summary(tmp_path):
+    index = DedupeIndex(str(tmp_path / "dedupe.sqlite3"))
+    # Saved before the index existed: only the summary is known.
+    index.add_many([entry("legacy", "", SUMMARY)])
+
+    found = index.check(None, None, None, RAW, SUMMARY)
+
+    assert [(m["candidate_id"], m["kind"], m["similarity"]) for m in found] == [("legacy", "near", 1.0)]
+    # The new résumé's text is never compared with the stored summary.
+    assert index.check(None, None, None, SUMMARY, "") == []
+
+
+def test_signatures_of_unknown_origin_are_dropped_on_upgrade(tmp_path):
+    path = str(tmp_path / "dedupe.sqlite3")
+    with sqlite3.connect(path) as conn:
+        conn.execute("CREATE TABLE candidates (candidate_id TEXT PRIMARY KEY, email_key TEXT, "
+                     "phone_key TEXT, name_key TEXT, signature BLOB)")
+        conn.execute("INSERT INTO candidates VALUES ('old', 'a@b.com', NULL, NULL, x'00')")
+
+    index = DedupeIndex(path)
+
+    assert index.indexed_ids() == set()      # re-signed by the next metadata rebuild
+    assert [m["candidate_id"] for m in index.check("a@b.com", None, None, RAW)] == ["old"]
@@ -0,0 +1,26 @@
+import extraction
+from extraction import EXPLORE_EVERY, SKIP_MIN_RUNS, plan_extractors
+
+
+def stats(runs, successes, seconds=1.0):
+    return {"runs": runs, "successes": successes, "failures": runs - successes,
+            "timeouts": 0, "seconds": seconds, "chars": 0}
+
+
+def test_failing_method_is_periodically_re_explored(monkeypatch):
+    monkeypatch.setattr(extraction, "_planned", {})
+    snapshot = {"b": {"pymupdf": stats(50, 50), "pdfminer": stats(SKIP_MIN_RUNS, 0)}}
+
+    plans = [plan_extractors("b", snapshot) for _ in range(3 * EXPLORE_EVERY)]
+
+    explored = sum("pdfminer" in plan for plan in plans)
+    assert explored == 3
+
+
+def test_never_successful_method_ranks_after_untried_ones():
+    snapshot = {"b": {"pymupdf": stats(6, 0), "pdfminer": stats(6, 6)}}
+
+    plan = plan_extractors("b", snapshot)
+
+    assert plan[0] == "pdfminer"
+    assert plan[-1] == "pymupdf"
@@ -0,0 +1,62 @@
+from concurrent.futures import ThreadPoolExecutor
+
+import ingest
+
+
+def fake_extract(pdf_bytes, snapshot=None):
+    text = pdf_bytes.decode("utf-8")
+    return text, {"bucket": "test", "methods": []}
+
+
+def test_ingest_batch_extracts_and_summarizes_every_file(monkeypatch):
+    # Threads instead of worker processes so the stub extractor is used.
+    monkeypatch.setattr(ingest, "ProcessPoolExecutor", ThreadPoolExecutor)
+    monkeypatch.setattr(ingest, "extract_with_report", fake_extract)
+    progress = []
+
+    results, errors = ingest.ingest_batch(
+        [("a.pdf", b"Alice resume"), ("b.pdf", b"Bob resume")],
+        summarize=lambda raw: f"summary of {raw}",
+        on_progress=lambda done, total, name, stage: progress.append((name, stage)),
+        extract_workers=2,
+        summary_workers=2,
+    )
+
+    assert errors == []
+    assert [(r["filename"], r["raw"], r["summary"]) for r in results] == [
+        ("a.pdf", "Alice resume", "summary of Alice resume"),
+        ("b.pdf", "Bob resume", "summary of Bob resume"),
+    ]
+    assert sorted(progress) == [
+        ("a.pdf", "extracted"), ("a.pdf", "summarized"),
+        ("b.pdf", "extracted"), ("b.pdf", "summarized"),
+    ]
+
+
+def test_ingest_batch_reports_files_without_text(monkeypatch):
+    monkeypatch.setattr(ingest, "ProcessPoolExecutor", ThreadPoolExecutor)
+    monkeypatch.setattr(ingest, "extract_with_report", fake_extract)
+
+    results, errors = ingest.ingest_batch(
+        [("blank.pdf", b"   "), ("ok.pdf", b"text")], summarize=lambda raw: "s",
+    )
+
+    assert [r["filename"] for r in results] == ["ok.pdf"]
+    assert errors == [{"filename": "blank.pdf", "error": "No text could be extracted."}]
+
+
+def test_ingest_batch_reports_summary_errors_per_file(monkeypatch):
+    monkeypatch.setattr(ingest, "ProcessPoolExecutor", ThreadPoolExecutor)
+    monkeypatch.setattr(ingest, "extract_with_report", fake_extract)
+
+    def summarize(raw):
+        if "Bob" in raw:
+            raise RuntimeError("OpenAI API error: rate limited")
+        return "s"
+
+    results, errors = ingest.ingest_batch(
+        [("a.pdf", b"Alice resume"), ("b.pdf", b"Bob resume")], summarize=summarize,
+    )
+
+    assert [r["filename"] for r in results] == ["a.pdf"]
+    assert errors == [{"filename": "b.pdf", "error": "OpenAI API error: rate limited"}]
@@ -0,0 +1,23 @@
+from intent import retrieval_confirms, route
+
+
+def test_clear_messages_are_routed_without_the_classifier():
+    hiring = route("Which candidates have 5+ years of Python experience?")
+    assert hiring.intent == "recruitment" and hiring.score >= 2
+
+    off_topic = route("Tell me a joke about the weather")
+    assert off_topic.intent == "off_topic" and off_topic.score <= -2
+
+
+def test_weak_evidence_stays_uncertain_within_the_margin():
+    assert route("Tell me about Priya").intent == "uncertain"
+    # One skill mention scores 1: recruitment with a margin of 1, not of 2.
+    assert route("kubernetes", margin=2).intent == "uncertain"
+    assert route("kubernetes", margin=1).intent == "recruitment"
+
+
+def test_only_close_vector_hits_confirm_an_uncertain_message():
+    assert retrieval_confirms([1.4, 0.6], max_distance=1.0)
+    assert not retrieval_confirms([1.4, 1.2], max_distance=1.0)
+    assert not retrieval_confirms([None, None], max_distance=1.0)    # keyword-only hits
+    assert not retrieval_confirms([])
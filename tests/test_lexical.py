@@ -0,0 +1,60 @@
+import sqlite3
+
+from lexical import LexicalIndex, reciprocal_rank_fusion
+
+
+def make_index(tmp_path, docs):
+    index = LexicalIndex(str(tmp_path / "lexical.sqlite3"))
+    index.add_many(docs)
+    return index
+
+
+def test_phrase_search_keeps_the_substring_meaning(tmp_path):
+    index = make_index(tmp_path, [
+        ("sap", "SAP FICO consultant, 6 years of experience"),
+        ("basis", "SAP Basis administrator"),
+        ("fico", "Credit analyst; FICO scores"),
+        ("js", "JavaScript and C++ developer"),
+    ])
+
+    # Any term may match for chat retrieval; the filter needs the phrase.
+    assert {cid for cid, _ in index.search("SAP FICO", 10)} == {"sap", "basis", "fico"}
+    assert [cid for cid, _ in index.search("SAP FICO", 10, phrase=True)] == ["sap"]
+    # Stopwords count, and the last word may be a prefix as with a substring.
+    assert [cid for cid, _ in index.search("experience", 10, phrase=True)] == ["sap"]
+    assert [cid for cid, _ in index.search("java", 10, phrase=True)] == ["js"]
+    assert [cid for cid, _ in index.search("c++", 10, phrase=True)] == ["js"]
+
+
+def test_re_adding_and_removing_replace_by_candidate(tmp_path):
+    index = make_index(tmp_path, [("a", "python developer"), ("b", "rust developer")])
+
+    index.add_many([("a", "golang developer"), ("a", "kotlin developer")])
+    index.remove_many(["b", "unknown"])
+
+    assert index.indexed_ids() == {"a"}
+    assert index.search("python", 10) == [] and index.search("golang", 10) == []
+    assert [cid for cid, _ in index.search("kotlin", 10)] == ["a"]
+
+
+def test_indexes_from_the_old_single_table_layout_are_migrated(tmp_path):
+    path = str(tmp_path / "lexical.sqlite3")
+    with sqlite3.connect(path) as conn:
+        conn.execute("CREATE VIRTUAL TABLE docs USING fts5(candidate_id UNINDEXED, body)")
+        conn.executemany("INSERT INTO docs VALUES (?, ?)", [("a", "react native"), ("b", "django")])
+
+    index = LexicalIndex(path)
+
+    assert index.indexed_ids() == {"a", "b"}
+    assert [cid for cid, _ in index.search("django", 10)] == ["b"]
+
+
+def test_rank_fusion_favours_candidates_ranked_well_by_both_retrievers():
+    vector = ["a", "b", "c", "d"]
+    keyword = ["b", "c", "e"]
+
+    fused = reciprocal_rank_fusion([vector, keyword], k=60)
+
+    assert [cid for cid, _ in fused] == ["b", "c", "a", "e", "d"]
+    assert fused[0][1] == 1 / 62 + 1 / 61
+    assert reciprocal_rank_fusion([]) == []
@@ -0,0 +1,174 @@
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from llm import RequestScheduler, estimate_tokens
+
+MESSAGES = [{"role": "user", "content": "hi"}]
+
+
+class FakeOpenAI:
+    """Local stand-in for /v1/chat/completions.
+
+    ``script`` holds ``(status, headers)`` replies used in order before
+    falling back to 200; ``delay`` is how long each request (or each
+    streamed chunk) takes.  Arrival times and the peak number of requests
+    open at once are recorded.
+    """
+
+    def __init__(self, script=(), delay=0.0):
+        self.script = list(script)
+        self.delay = delay
+        self.arrivals = []
+        self.open = self.peak = 0
+        self.lock = threading.Lock()
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def do_POST(self):
+                body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+                with fake.lock:
+                    fake.arrivals.append(time.monotonic())
+                    fake.open += 1
+                    fake.peak = max(fake.peak, fake.open)
+                    status, headers = fake.script.pop(0) if fake.script else (200, {})
+                try:
+                    if status != 200:
+                        self._send(status, headers, {"error": {"message": "slow down", "type": "rate_limit"}})
+                    elif body.get("stream"):
+                        self._stream()
+                    else:
+                        time.sleep(fake.delay)
+                        self._send(200, {}, {
+                            "id": "c", "object": "chat.completion", "created": 0, "model": body["model"],
+                            "choices": [{"index": 0, "finish_reason": "stop",
+                                         "message": {"role": "assistant", "content": "ok"}}],
+                        })
+                finally:
+                    with fake.lock:
+                        fake.open -= 1
+
+            def _send(self, status, headers, payload):
+                data = json.dumps(payload).encode()
+                self.send_response(status)
+                for key, value in headers.items():
+                    self.send_header(key, value)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def _stream(self):
+                self.send_response(200)
+                self.send_header("Content-Type", "text/event-stream")
+                self.end_headers()
+                for word in ("Hello", " world"):
+                    time.sleep(fake.delay)
+                    chunk = {"id": "c", "object": "chat.completion.chunk", "created": 0, "model": "gpt-4o",
+                             "choices": [{"index": 0, "delta": {"content": word}, "finish_reason": None}]}
+                    self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode())
+                    self.wfile.flush()
+                self.wfile.write(b"data: [DONE]\n\n")
+                self.wfile.flush()
+                self.close_connection = True
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}/v1"
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+
+@pytest.fixture
+def fake_openai(monkeypatch):
+    monkeypatch.setenv("OPENAI_API_KEY", "sk-test")
+    servers = []
+
+    def start(**kwargs):
+        servers.append(FakeOpenAI(**kwargs))
+        return servers[-1]
+    yield start
+    for s in servers:
+        s.server.shutdown()
+        s.server.server_close()
+
+
+def scheduler(url, **kwargs):
+    return RequestScheduler(base_url=url, **dict({"rpm": 10000, "tpm": 10 ** 7}, **kwargs))
+
+
+def test_429_is_retried_after_retry_after_and_pauses_other_callers(fake_openai):
+    fake = fake_openai(script=[(429, {"Retry-After": "1"})])
+    s = scheduler(fake.url)
+    start = time.monotonic()
+    first = threading.Thread(target=lambda: s.chat(MESSAGES))
+    first.start()
+    time.sleep(0.2)
+
+    second = s.chat(MESSAGES)
+    first.join(10)
+
+    assert second.choices[0].message.content == "ok"
+    assert s.stats["retries"] == 1 and s.stats["rate_limited"] == 1 and s.stats["failures"] == 0
+    # The retry and the caller that arrived during the pause both wait it out.
+    assert len(fake.arrivals) == 3
+    assert all(t - start >= 0.9 for t in fake.arrivals[1:])
+
+
+def test_requests_per_minute_are_enforced(fake_openai):
+    fake = fake_openai()
+    s = scheduler(fake.url)
+    # One request of burst, refilled at 10 per second.
+    s.requests.capacity, s.requests.tokens, s.requests.rate = 1, 1, 10.0
+
+    s.chat_many([MESSAGES] * 4)
+
+    arrivals = sorted(fake.arrivals)
+    assert arrivals[-1] - arrivals[0] >= 0.25
+
+
+def test_tokens_per_minute_are_enforced(fake_openai):
+    fake = fake_openai()
+    s = scheduler(fake.url)
+    # Room for one request's estimate, refilled at ten estimates per second.
+    need = estimate_tokens(MESSAGES)
+    s.tokens.capacity, s.tokens.tokens, s.tokens.rate = need, need, need * 10.0
+
+    s.chat_many([MESSAGES] * 4)
+
+    arrivals = sorted(fake.arrivals)
+    assert arrivals[-1] - arrivals[0] >= 0.25
+
+
+def test_concurrency_is_capped(fake_openai):
+    fake = fake_openai(delay=0.2)
+    s = scheduler(fake.url, max_concurrency=2)
+
+    s.chat_many([MESSAGES] * 6)
+
+    assert fake.peak == 2
+    assert s.stats["peak_in_flight"] == 2 and s.stats["in_flight"] == 0
+
+
+def test_a_stream_holds_its_slot_until_consumed(fake_openai):
+    fake = fake_openai(delay=0.2)
+    s = scheduler(fake.url, max_concurrency=1)
+    texts = []
+
+    def read():
+        texts.append("".join(s.chat_stream(MESSAGES)))
+    readers = [threading.Thread(target=read) for _ in range(2)]
+    for t in readers:
+        t.start()
+    for t in readers:
+        t.join(10)
+
+    assert texts == ["Hello world", "Hello world"]
+    assert fake.peak == 1
+    # The second stream only opened after the first had sent both chunks.
+    assert fake.arrivals[1] - fake.arrivals[0] >= 0.35
+    assert s.stats["in_flight"] == 0
@@ -0,0 +1,23 @@
+from rerank import LexicalReranker, make_reranker
+
+
+def test_documents_covering_the_query_move_ahead_of_retrieval_order():
+    docs = [
+        "Accountant with Tally and GST filing",            # retrieval's top hit, no query terms
+        "Python developer; some Django",
+        "Senior Django developer, Django REST framework, Python and PostgreSQL",
+    ]
+
+    scores = LexicalReranker().score("django developer", docs)
+
+    assert sorted(range(len(docs)), key=lambda i: -scores[i]) == [2, 1, 0]
+    assert all(0 <= s <= 1 for s in scores)
+
+
+def test_retrieval_order_breaks_ties():
+    docs = ["Java engineer", "Java engineer", "Java engineer"]
+
+    scores = LexicalReranker().score("java", docs)
+
+    assert scores[0] > scores[1] > scores[2]
+    assert make_reranker("none") is None
@@ -0,0 +1,76 @@
+import shutil
+import socket
+import subprocess
+import time
+
+import pytest
+
+pytest.importorskip("chromadb")
+import vectorstore  # noqa: E402
+
+pytestmark = pytest.mark.skipif(shutil.which("chroma") is None, reason="needs the `chroma` CLI")
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+@pytest.fixture
+def chroma_server(tmp_path, monkeypatch):
+    """A `chroma run` server on a free port, with vectorstore pointed at it."""
+    port = free_port()
+    proc = subprocess.Popen(
+        ["chroma", "run", "--path", str(tmp_path / "server"), "--host", "127.0.0.1", "--port", str(port)],
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    monkeypatch.setattr(vectorstore, "CHROMA_HOST", "127.0.0.1")
+    monkeypatch.setattr(vectorstore, "CHROMA_PORT", port)
+    monkeypatch.setattr(vectorstore, "CHROMA_MEMORY_FALLBACK", False)
+    try:
+        deadline = time.monotonic() + 30
+        while True:
+            try:
+                socket.create_connection(("127.0.0.1", port), timeout=0.5).close()
+                break
+            except OSError:
+                if proc.poll() is not None or time.monotonic() > deadline:
+                    pytest.skip("chroma server did not start")
+                time.sleep(0.2)
+        yield port
+    finally:
+        proc.terminate()
+        proc.wait(10)
+
+
+def test_http_mode_round_trips_an_upsert_and_a_query(chroma_server, tmp_path):
+    client, warning = vectorstore.open_client(str(tmp_path / "unused"), mode="http")
+
+    assert warning is None
+    assert vectorstore.check_health(client)["ok"]
+    collection = client.get_or_create_collection("resumes_test", embedding_function=None)
+    collection.upsert(
+        ids=["alice", "bob"],
+        documents=["Go and Kafka engineer", "SAP FICO consultant"],
+        embeddings=[[1.0, 0.0, 0.0], [0.0, 1.0, 0.0]],
+        metadatas=[{"name": "Alice"}, {"name": "Bob"}],
+    )
+
+    # A second client (another replica) sees the same data.
+    other, _ = vectorstore.open_client(str(tmp_path / "unused"), mode="http")
+    hits = other.get_collection("resumes_test", embedding_function=None).query(
+        query_embeddings=[[0.1, 0.9, 0.0]], n_results=1, include=["documents", "metadatas"]
+    )
+    assert hits["ids"] == [["bob"]]
+    assert hits["metadatas"][0][0]["name"] == "Bob"
+
+
+def test_unreachable_server_is_an_error_not_a_silent_memory_store(monkeypatch, tmp_path):
+    monkeypatch.setattr(vectorstore, "CHROMA_HOST", "127.0.0.1")
+    monkeypatch.setattr(vectorstore, "CHROMA_PORT", free_port())
+    monkeypatch.setattr(vectorstore, "CHROMA_CONNECT_RETRIES", 1)
+    monkeypatch.setattr(vectorstore, "CHROMA_MEMORY_FALLBACK", False)
+
+    with pytest.raises(vectorstore.StoreUnavailable):
+        vectorstore.open_client(str(tmp_path), mode="http")